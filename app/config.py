@@ -11,11 +11,62 @@ class Settings:
         self.MINIO_SECRET_KEY = os.environ["MINIO_SECRET_KEY"]
         self.MINIO_SECURE = os.environ["MINIO_SECURE"].lower() == "true"
         self.MINIO_BUCKET = os.environ["MINIO_BUCKET"]
+        # MinIO 업로드 thread 수 / 연결 pool 크기 / multipart 설정
+        self.MINIO_UPLOAD_WORKERS = int(os.getenv("MINIO_UPLOAD_WORKERS", 16))
+        self.MINIO_POOL_SIZE = int(os.getenv("MINIO_POOL_SIZE", 32))
+        self.MINIO_PART_SIZE = int(os.getenv("MINIO_PART_SIZE", 8 * 1024 * 1024))
+        self.MINIO_PARALLEL_PARTS = int(os.getenv("MINIO_PARALLEL_PARTS", 4))
+        # 사진 목록 조회: listing 전용 thread 수 / 한 번에 조회할 수 있는 최대 구간(시간)
+        self.MINIO_LIST_WORKERS = int(os.getenv("MINIO_LIST_WORKERS", 4))
+        self.PHOTO_LIST_MAX_HOURS = int(os.getenv("PHOTO_LIST_MAX_HOURS", 7 * 24))
+        # 이전 flat 구조(시 prefix 없음)로 저장된 마지막 날짜 YYYYMMDD - 이 날짜까지는 목록 조회 시 날짜 prefix 도 확인
+        # (비우면 모든 날짜 확인, 이전 구조 object 를 옮긴 뒤에는 옮긴 시점 이전 날짜로 설정)
+        self.PHOTO_LEGACY_LAYOUT_UNTIL = os.getenv("PHOTO_LEGACY_LAYOUT_UNTIL", "")
+        # 이미지 변환 process pool / 재인코딩 생략 정책
+        self.TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", 2))
+        self.TRANSCODE_MAX_PENDING = int(os.getenv("TRANSCODE_MAX_PENDING", 8))
+        self.TRANSCODE_PASSTHROUGH_MAX_BYTES = int(os.getenv("TRANSCODE_PASSTHROUGH_MAX_BYTES", 10 * 1024 * 1024))
+        self.TRANSCODE_MAX_DIMENSION = int(os.getenv("TRANSCODE_MAX_DIMENSION", 0))  # 0 = 제한 없음
+        self.JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", 90))
+        # 원본과 함께 저장할 축소본 "이름:긴 변 px" 목록 / 축소본 JPEG 품질
+        # 기본은 생성 안 함 - 축소본 하나마다 사진당 resize+인코딩 CPU 와 MinIO PUT 이 하나씩 늘어남
+        # (예: "thumb:256,medium:1280,infer:640" 이면 사진당 PUT 4회)
+        self.PHOTO_RENDITIONS = os.getenv("PHOTO_RENDITIONS", "")
+        self.RENDITION_QUALITY = int(os.getenv("RENDITION_QUALITY", 80))
+
+        # --- 공유 HTTP client 설정 ---
+        self.HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+        self.HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+        # 사진 다운로드 client 전체 / host 별 동시 연결 수
+        self.PHOTO_MAX_CONNECTIONS = int(os.getenv("PHOTO_MAX_CONNECTIONS", 64))
+        self.PHOTO_HOST_MAX_CONNECTIONS = int(os.getenv("PHOTO_HOST_MAX_CONNECTIONS", 16))
+        # host 별 동시 요청 제한을 유지할 최대 host 수 (LRU, 사용 중이 아닌 것부터 제거)
+        self.HTTP_HOST_LIMITS_MAX = int(os.getenv("HTTP_HOST_LIMITS_MAX", 1024))
+        # 사진 다운로드 최대 크기 / 이 크기를 넘으면 임시 파일로 spool
+        self.PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", 50 * 1024 * 1024))
+        self.PHOTO_SPOOL_THRESHOLD = int(os.getenv("PHOTO_SPOOL_THRESHOLD", 4 * 1024 * 1024))
+        self.PHOTO_SPOOL_DIR = os.getenv("PHOTO_SPOOL_DIR", None)
+        # 일괄 수집 API 에서 동시에 처리하는 사진 수
+        self.BATCH_INGEST_CONCURRENCY = int(os.getenv("BATCH_INGEST_CONCURRENCY", 16))
+        # 비동기 수집 모드 worker 수 / 작업 레코드 보관 시간 / 중단 작업 재처리 기준(초)
+        self.INGEST_ASYNC_WORKERS = int(os.getenv("INGEST_ASYNC_WORKERS", 4))
+        self.INGEST_JOB_TTL = int(os.getenv("INGEST_JOB_TTL", 24 * 3600))
+        self.INGEST_JOB_STALE_SEC = int(os.getenv("INGEST_JOB_STALE_SEC", 600))
+        # imageId 중복 요청 방지 기간(초) / 중복 요청이 원래 요청 결과를 기다리는 최대 시간(초) / 내용(sha256) 중복 제거 사용 여부
+        self.INGEST_DEDUPE_TTL = int(os.getenv("INGEST_DEDUPE_TTL", 24 * 3600))
+        self.INGEST_DEDUPE_WAIT_SEC = float(os.getenv("INGEST_DEDUPE_WAIT_SEC", 30))
+        self.INGEST_DEDUPE_CONTENT_HASH = os.getenv("INGEST_DEDUPE_CONTENT_HASH", "false").lower() == "true"
           # --- Redis 설정 ---
         self.REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
         self.REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
         self.REDIS_DB = int(os.getenv("REDIS_DB", 0))
         self.REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+        self.REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 32))
+        # 작업 큐 producer micro-batch / 장애 시 로컬 spill 설정
+        self.REDIS_FLUSH_INTERVAL_MS = float(os.getenv("REDIS_FLUSH_INTERVAL_MS", 5))
+        self.REDIS_FLUSH_MAX_BATCH = int(os.getenv("REDIS_FLUSH_MAX_BATCH", 100))
+        self.REDIS_SPILL_LIMIT = int(os.getenv("REDIS_SPILL_LIMIT", 10000))
+        self.REDIS_SPILL_RETRY_INTERVAL = float(os.getenv("REDIS_SPILL_RETRY_INTERVAL", 1.0))
 
         self.time_DB_HOST = os.getenv("time_DB_HOST")
         self.time_DB_PORT = int(os.getenv("time_DB_PORT"))
@@ -24,4 +75,66 @@ class Settings:
         self.time_DB_NAME = os.getenv("time_DB_NAME")
 
         self.time_EXTERNAL_API_KEY = os.getenv("time_EXTERNAL_API_KEY")
+
+        # --- Telemetry sync 병렬 처리 설정 ---
+        # (robot, window) 작업 단위를 동시에 처리할 worker 수
+        self.SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", 8))
+        # api.m1ucs.com 으로 동시에 나가는 최대 요청 수 (host 단위 제한)
+        self.M1UCS_MAX_CONCURRENCY = int(os.getenv("M1UCS_MAX_CONCURRENCY", 16))
+        # api.m1ucs.com 초당 요청 수 / 순간 허용량 (token bucket)
+        self.M1UCS_RATE_PER_SEC = float(os.getenv("M1UCS_RATE_PER_SEC", 20))
+        self.M1UCS_BURST = int(os.getenv("M1UCS_BURST", 20))
+        # 재시도 횟수 (timeout 은 별도 - 큰 구간은 window 분할로 처리) / backoff 기준·최대(초)
+        self.M1UCS_MAX_RETRIES = int(os.getenv("M1UCS_MAX_RETRIES", 4))
+        self.M1UCS_TIMEOUT_RETRIES = int(os.getenv("M1UCS_TIMEOUT_RETRIES", 1))
+        self.M1UCS_BACKOFF_BASE = float(os.getenv("M1UCS_BACKOFF_BASE", 0.5))
+        self.M1UCS_BACKOFF_MAX = float(os.getenv("M1UCS_BACKOFF_MAX", 30))
+        # 연속 실패 몇 번에 circuit open / open 유지 시간(초)
+        self.M1UCS_BREAKER_THRESHOLD = int(os.getenv("M1UCS_BREAKER_THRESHOLD", 8))
+        self.M1UCS_BREAKER_RESET_SEC = float(os.getenv("M1UCS_BREAKER_RESET_SEC", 30))
+        # 동기화 COPY 전용 asyncpg pool 크기 (SQLAlchemy pool 과 별도)
+        self.COPY_POOL_MIN_SIZE = int(os.getenv("COPY_POOL_MIN_SIZE", 2))
+        self.COPY_POOL_MAX_SIZE = int(os.getenv("COPY_POOL_MAX_SIZE", 8))
+        # m1ucs 목록/상세 조회 client 별 connection pool 크기
+        self.M1UCS_LIST_MAX_CONNECTIONS = int(os.getenv("M1UCS_LIST_MAX_CONNECTIONS", 8))
+        self.M1UCS_DETAIL_MAX_CONNECTIONS = int(os.getenv("M1UCS_DETAIL_MAX_CONNECTIONS", 16))
+        # 상세 조회 스트리밍 시 한 번에 COPY 하는 행 수
+        self.COPY_CHUNK_ROWS = int(os.getenv("COPY_CHUNK_ROWS", 5000))
+        # information_schema 컬럼 캐시 유지 시간(초)
+        self.SCHEMA_CACHE_TTL = int(os.getenv("SCHEMA_CACHE_TTL", 300))
+        # 동기화 window 크기 자동 조정 (상세 조회 1회 목표 행 수 / 최소·최대 크기 / 행 수 추정에 쓰는 이력 기간(시간) / timeout 분할 최소 크기(분))
+        self.ADAPTIVE_WINDOWS = os.getenv("ADAPTIVE_WINDOWS", "true").lower() == "true"
+        self.WINDOW_TARGET_ROWS = int(os.getenv("WINDOW_TARGET_ROWS", 50000))
+        self.WINDOW_MIN_MINUTES = int(os.getenv("WINDOW_MIN_MINUTES", 10))
+        self.WINDOW_MAX_HOURS = int(os.getenv("WINDOW_MAX_HOURS", 24))
+        self.WINDOW_RATE_LOOKBACK_HOURS = int(os.getenv("WINDOW_RATE_LOOKBACK_HOURS", 72))
+        self.WINDOW_SPLIT_MIN_MINUTES = int(os.getenv("WINDOW_SPLIT_MIN_MINUTES", 1))
+        # telemetry 조회 API 기본 / 최대 행 수 (페이지 크기)
+        self.TELEMETRY_QUERY_DEFAULT_LIMIT = int(os.getenv("TELEMETRY_QUERY_DEFAULT_LIMIT", 10000))
+        self.TELEMETRY_QUERY_MAX_ROWS = int(os.getenv("TELEMETRY_QUERY_MAX_ROWS", 100000))
+        # telemetry 롤업(continuous aggregate) 사용 여부 / 롤업 단위 / 동기화 후 refresh 지연(초) / policy refresh 조회 구간(일)
+        self.TELEMETRY_ROLLUPS_ENABLED = os.getenv("TELEMETRY_ROLLUPS_ENABLED", "true").lower() == "true"
+        self.ROLLUP_INTERVALS = os.getenv("ROLLUP_INTERVALS", "1m,1h")
+        self.ROLLUP_REFRESH_DELAY = float(os.getenv("ROLLUP_REFRESH_DELAY", 5))
+        self.ROLLUP_POLICY_LOOKBACK_DAYS = int(os.getenv("ROLLUP_POLICY_LOOKBACK_DAYS", 3))
+        # 원본 압축 시점(일) / 원본 보존 기간(일) / 롤업 보존 기간(일) - 0 = 정책 없음
+        # (원본 압축/삭제는 기본 꺼짐 - 보존 기간이 지난 원본은 되돌릴 수 없이 삭제되므로 필요한 환경에서만 설정)
+        self.TELEMETRY_COMPRESS_AFTER_DAYS = int(os.getenv("TELEMETRY_COMPRESS_AFTER_DAYS", 0))
+        self.TELEMETRY_RAW_RETENTION_DAYS = int(os.getenv("TELEMETRY_RAW_RETENTION_DAYS", 0))
+        self.TELEMETRY_ROLLUP_RETENTION_DAYS = int(os.getenv("TELEMETRY_ROLLUP_RETENTION_DAYS", 730))
+        # 기동 시 telemetry 테이블에 없는 (robot_id, time) 유니크 인덱스 생성 여부
+        # (기본 꺼짐 - 큰 테이블은 생성 중 쓰기가 막히므로 마이그레이션으로 생성, 없으면 기동 시 error 로그만)
+        self.TELEMETRY_CREATE_UNIQUE_INDEX = os.getenv("TELEMETRY_CREATE_UNIQUE_INDEX", "false").lower() == "true"
+        # 주기 동기화 엔진 사용 여부 / 실행 주기(초) - worker 중 leader 하나만 실행
+        # (기본 꺼짐 - 기존처럼 POST /telemetry/update 로만 동기화, 켜면 모든 로봇을 주기적으로 동기화)
+        self.SYNC_ENGINE_ENABLED = os.getenv("SYNC_ENGINE_ENABLED", "false").lower() == "true"
+        self.SYNC_ENGINE_INTERVAL = float(os.getenv("SYNC_ENGINE_INTERVAL", 60))
+        # worker 별 metrics 파일 디렉터리 (모든 uvicorn worker 가 공유) / 기록 주기(초)
+        self.METRICS_DIR = os.getenv("METRICS_DIR", "/tmp/shrc-metrics")
+        self.METRICS_FLUSH_SEC = float(os.getenv("METRICS_FLUSH_SEC", 5))
+        # robot_id 매핑 전체 재조회 주기(초) / 없는 robot_id 재조회 금지 시간(초)
+        self.ROBOT_REGISTRY_TTL = float(os.getenv("ROBOT_REGISTRY_TTL", 300))
+        self.ROBOT_REGISTRY_NEGATIVE_TTL = float(os.getenv("ROBOT_REGISTRY_NEGATIVE_TTL", 30))
+        # 기동 시 shrc.robots 변경 NOTIFY trigger 생성 여부 (기본 꺼짐 - DB 에 trigger 가 있으면 LISTEN, 없으면 TTL 재조회만)
+        self.ROBOT_REGISTRY_CREATE_TRIGGER = os.getenv("ROBOT_REGISTRY_CREATE_TRIGGER", "false").lower() == "true"
 settings = Settings()
@@ -0,0 +1,169 @@
+# app/copy_pool.py
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Sequence, Tuple
+
+import asyncpg
+
+from . import metrics
+from .config import settings
+from .database import ASYNCPG_CONNECT_ARGS
+
+logger = logging.getLogger(__name__)
+
+POOL_WAIT = metrics.histogram("copy_pool_wait_seconds", "COPY pool 연결 획득 대기 시간(초)")
+POOL_IN_USE = metrics.gauge("copy_pool_in_use", "사용 중인 COPY pool 연결 수")
+COPY_ROWS = metrics.counter("copy_rows_total", "COPY 로 보낸 행 수")
+COPY_INSERTED = metrics.counter("copy_inserted_rows_total", "병합 후 실제로 들어간 행 수")
+COPY_SECONDS = metrics.histogram("copy_transaction_seconds", "COPY 트랜잭션 1회 소요 시간(초)")
+
+# ---------------------------------------------------------
+# 대량 적재 전용 asyncpg pool
+# - ORM / 조회용 SQLAlchemy pool 과 분리 → 동기화 COPY 가 API 요청 연결을 잡아먹지 않음
+#   (크기: COPY_POOL_MIN_SIZE ~ COPY_POOL_MAX_SIZE, SQLAlchemy pool 과 별도로 DB 연결 수 계산 필요)
+# - 세션 설정은 server_settings (연결 시작 파라미터), 연결 생성 시 warm-up 은 체크포인트 INSERT prepare
+#   (PreparedStatement 를 연결(CopyConnection)에 보관 → save_checkpoint 는 parse/plan 없이 bind/execute 만)
+# - transaction(): 연결 획득 + 트랜잭션, 그 안에서 copy_merge() 를 여러 테이블에 호출하면
+#   한 트랜잭션으로 커밋됨
+# ---------------------------------------------------------
+# (COPY 컬럼, COPY tuple 목록)
+CopyGroup = Tuple[Sequence[str], List[tuple]]
+
+CHECKPOINT_SQL = """
+    INSERT INTO shrc.telemetry_sync_checkpoint
+    (robot_id, msg_id, window_from, window_to, rows_copied, committed_at)
+    VALUES ($1, $2, $3, $4, $5, NOW())
+    ON CONFLICT (robot_id, msg_id, window_from, window_to)
+    DO UPDATE SET rows_copied = EXCLUDED.rows_copied, committed_at = NOW()
+"""
+
+# 연결 시작 파라미터로 지정 → 반납 시 RESET ALL 후에도 유지 (init 의 SET 은 첫 반납 때 초기화됨)
+# - jit: 짧은 병합 쿼리에는 JIT 컴파일 비용이 더 큼
+SERVER_SETTINGS = {"jit": "off", "application_name": "shrc-copy"}
+
+_pool: asyncpg.Pool | None = None
+_pool_lock = asyncio.Lock()
+
+
+class CopyConnection(asyncpg.Connection):
+    """
+    COPY pool 연결 - 체크포인트 INSERT PreparedStatement 를 연결마다 보관
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkpoint_stmt = None
+
+    async def checkpoint_statement(self):
+        if self._checkpoint_stmt is None:
+            self._checkpoint_stmt = await self.prepare(CHECKPOINT_SQL)
+        return self._checkpoint_stmt
+
+
+async def _init_connection(conn: CopyConnection):
+    try:
+        await conn.checkpoint_statement()
+    except asyncpg.UndefinedTableError:
+        # 기동 직후 ensure_sync_tables 전 → 첫 사용 시 prepare
+        pass
+
+
+async def start():
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                **ASYNCPG_CONNECT_ARGS,
+                min_size=settings.COPY_POOL_MIN_SIZE,
+                max_size=settings.COPY_POOL_MAX_SIZE,
+                init=_init_connection,
+                connection_class=CopyConnection,
+                server_settings=SERVER_SETTINGS,
+            )
+            logger.info(
+                f"[COPY POOL] started (min={settings.COPY_POOL_MIN_SIZE}, max={settings.COPY_POOL_MAX_SIZE})"
+            )
+    return _pool
+
+
+async def close():
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[asyncpg.Connection]:
+    """
+    COPY pool 연결 (pool 이 없으면 생성) - 대기 시간 / 사용 중 연결 수 기록
+    """
+    pool = _pool or await start()
+    started = time.perf_counter()
+    async with pool.acquire() as conn:
+        POOL_WAIT.observe(time.perf_counter() - started)
+        POOL_IN_USE.inc()
+        try:
+            yield conn
+        finally:
+            POOL_IN_USE.dec()
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[asyncpg.Connection]:
+    async with acquire() as conn:
+        started = time.perf_counter()
+        async with conn.transaction():
+            yield conn
+        COPY_SECONDS.observe(time.perf_counter() - started)
+
+
+async def copy_merge(
+    conn: asyncpg.Connection,
+    table: str,
+    groups: Sequence[CopyGroup],
+    merge_columns: Sequence[str],
+) -> int:
+    """
+    staging 임시 테이블에 COPY → shrc.{table} 로 INSERT ... ON CONFLICT DO NOTHING 병합
+    - transaction() 안에서 호출 (임시 테이블은 커밋 시 삭제)
+    - 키 구성이 다른 그룹은 같은 staging 테이블에 각각 COPY
+    - 실제로 새로 들어간 행 수 반환
+    """
+    stage = f"_stage_{table}"
+    columns_sql = ", ".join(merge_columns)
+
+    await conn.execute(
+        f"CREATE TEMP TABLE {stage} (LIKE shrc.{table} INCLUDING DEFAULTS) ON COMMIT DROP"
+    )
+    for columns, records in groups:
+        await conn.copy_records_to_table(
+            table_name=stage,               # 임시 테이블 (pg_temp 스키마)
+            records=records,                # tuple 이어야 binary COPY 됨
+            columns=columns)
+        COPY_ROWS.inc(len(records))
+
+    status = await conn.execute(f"""
+        INSERT INTO shrc.{table} ({columns_sql})
+        SELECT {columns_sql} FROM {stage}
+        ON CONFLICT DO NOTHING
+    """)
+    inserted = int(status.split()[-1])   # "INSERT 0 <n>"
+    # 같은 트랜잭션에서 같은 테이블을 다시 적재할 수 있도록 바로 삭제
+    await conn.execute(f"DROP TABLE {stage}")
+    COPY_INSERTED.inc(inserted)
+    return inserted
+
+
+async def save_checkpoint(conn: asyncpg.Connection, robot_id: str, checkpoint: tuple):
+    """
+    checkpoint=(msg_id, from_ts, to_ts, rows_received) - rows_copied 에는 window 에서 받은 전체 행 수 기록
+    - 연결에 보관한 PreparedStatement 로 실행
+    """
+    msg_id, from_ts, to_ts, rows_copied = checkpoint
+    stmt = await conn.checkpoint_statement()
+    await stmt.fetch(robot_id, msg_id, from_ts, to_ts, rows_copied)
@@ -18,6 +18,15 @@ engine = create_async_engine(
     max_overflow=20,
 )
 
+# SQLAlchemy 를 거치지 않는 asyncpg 직접 연결용 (COPY pool, LISTEN)
+ASYNCPG_CONNECT_ARGS = dict(
+    host=settings.time_DB_HOST,
+    port=settings.time_DB_PORT,
+    user=settings.time_DB_USER,
+    password=settings.time_DB_PASSWORD,
+    database=settings.time_DB_NAME,
+)
+
 async_session = sessionmaker(
     bind=engine,
     class_=AsyncSession,
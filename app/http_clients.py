@@ -0,0 +1,106 @@
+# app/http_clients.py
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict
+
+import httpx
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# ---------------------------------------------------------
+# 앱 전역 httpx.AsyncClient 레지스트리
+# - 용도(name)별로 하나의 client 를 공유 → keep-alive 연결 재사용
+# - 용도별로 connection pool 예산(Limits)을 따로 가짐
+# ---------------------------------------------------------
+_SPECS: Dict[str, Dict[str, Any]] = {}
+_clients: Dict[str, httpx.AsyncClient] = {}
+_host_limits: "OrderedDict[tuple, _HostLimit]" = OrderedDict()
+
+
+def register(name: str, **client_kwargs):
+    """
+    client 설정 등록 (실제 생성은 start_clients() 또는 첫 get_client() 시점)
+    - http2=True 인데 h2 가 없으면 HTTP/1.1 로 생성
+    """
+    if client_kwargs.get("http2") and not HTTP2_AVAILABLE:
+        logger.warning(f"[HTTP CLIENT] {name}: h2 미설치 → HTTP/1.1 사용")
+        client_kwargs["http2"] = False
+    _SPECS[name] = client_kwargs
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**_SPECS[name])
+        _clients[name] = client
+    return client
+
+
+async def start_clients():
+    for name in _SPECS:
+        get_client(name)
+    logger.info(f"[HTTP CLIENT] started: {list(_SPECS)}")
+
+
+async def close_clients():
+    for name, client in list(_clients.items()):
+        await client.aclose()
+    _clients.clear()
+
+
+# ---------------------------------------------------------
+# host 별 동시 요청 수 제한
+# - 사진 URL 은 client 가 보내므로 host 종류에 상한이 없음
+#   → 최근 사용 순(LRU)으로 HTTP_HOST_LIMITS_MAX 개까지만 유지
+# - 사용 중인(획득/대기 중) 항목은 지우지 않음 (지우면 같은 host 에 새 Semaphore 가 생겨 제한이 풀림)
+# ---------------------------------------------------------
+class _HostLimit:
+    def __init__(self, limit: int):
+        self.sem = asyncio.Semaphore(limit)
+        self.users = 0   # 획득했거나 대기 중인 요청 수
+
+    async def __aenter__(self):
+        self.users += 1
+        try:
+            await self.sem.acquire()
+        except BaseException:
+            self.users -= 1
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.sem.release()
+        self.users -= 1
+
+
+def _evict_idle_hosts():
+    over = len(_host_limits) - settings.HTTP_HOST_LIMITS_MAX
+    if over <= 0:
+        return
+    for key in [k for k, v in _host_limits.items() if v.users == 0][:over]:
+        del _host_limits[key]
+
+
+def host_semaphore(url: str, limit: int) -> _HostLimit:
+    """
+    요청 대상 host 별 동시 요청 수 제한 (client 와 무관) - async with 로 사용
+    """
+    key = (httpx.URL(url).host, limit)
+    entry = _host_limits.get(key)
+    if entry is None:
+        entry = _HostLimit(limit)
+        _host_limits[key] = entry
+        _evict_idle_hosts()
+    else:
+        _host_limits.move_to_end(key)
+    return entry
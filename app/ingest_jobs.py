@@ -0,0 +1,437 @@
+# app/ingest_jobs.py
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError, WatchError
+
+from . import metrics
+from .config import settings
+from .redis_config import ar
+from .schemas import DataPayload
+from .services import process_photo, producer
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 수집 작업
+# - 중복 방지 (동기/비동기 공통): ingest_seen:{imageId} (TTL INGEST_DEDUPE_TTL)
+#     값 claimed:{획득 시각} → 처리 중, done:{object_path} → 완료 (실패 시 삭제)
+#   선택적으로 ingest_hash:{sha256} → 업로드에 성공한 imageId
+# - 작업 레코드 (mode=async 만): Redis hash ingest_job:{imageId} (TTL INGEST_JOB_TTL)
+#     대기 큐: ingest_pending_queue → worker 가 ingest_processing_queue 로 옮겨 처리
+#     진행 상태: accepted → fetching → transcoding → uploading → enqueuing → done / failed
+# - 동기 수집은 작업 레코드 없이 claim(SET NX) + 완료 기록(SET) 두 번의 Redis 호출만 사용
+#   Redis 연결이 안 되면 중복 확인 없이 처리 (추론 큐는 job_producer 의 spill buffer 로 보존)
+# ---------------------------------------------------------
+PENDING_QUEUE = "ingest_pending_queue"
+PROCESSING_QUEUE = "ingest_processing_queue"
+
+CLAIMED = "claimed:"
+DONE = "done:"
+
+JOB_SECONDS = metrics.histogram("ingest_job_seconds", "비동기 수집 작업 처리 시간(초, 접수~완료)")
+JOB_FAILED = metrics.counter("ingest_job_failed_total", "실패한 수집 작업 수")
+DEDUPED = metrics.counter("ingest_deduplicated_total", "imageId 중복으로 처리를 생략한 요청 수")
+DEDUPED_CONTENT = metrics.counter("ingest_deduplicated_content_total", "내용(sha256) 중복으로 변환/업로드를 생략한 사진 수")
+DEDUPE_UNAVAILABLE = metrics.counter("ingest_dedupe_unavailable_total", "Redis 연결 실패로 중복 확인 없이 처리한 요청 수")
+
+_workers: list[asyncio.Task] = []
+
+
+def _job_key(image_id: str) -> str:
+    return f"ingest_job:{image_id}"
+
+
+def _seen_key(image_id: str) -> str:
+    return f"ingest_seen:{image_id}"
+
+
+def _hash_key(sha256: str) -> str:
+    return f"ingest_hash:{sha256}"
+
+
+def _claimed_value() -> str:
+    return f"{CLAIMED}{time.time()}"
+
+
+# ---------------------------------------------------------
+# imageId 기반 중복 요청 방지 (TTL seen-set)
+# ---------------------------------------------------------
+async def claim(image_id: str) -> bool:
+    """
+    imageId 처리 권한 획득 (SET NX EX, 값에 획득 시각 기록)
+    - 이미 처리 중/완료된 imageId 면 False
+    - 처리 중 표시가 INGEST_JOB_STALE_SEC 보다 오래됐으면 (처리 중 프로세스 종료) 다시 획득
+    - Redis 에 연결할 수 없으면 True (중복 확인 없이 처리)
+    """
+    key = _seen_key(image_id)
+    try:
+        if await ar.set(key, _claimed_value(), nx=True, ex=settings.INGEST_DEDUPE_TTL):
+            return True
+        if await _take_over_stale(key):
+            logger.warning(f"[INGEST DEDUPE] imageId={image_id} 중단된 작업 → 다시 처리")
+            return True
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        DEDUPE_UNAVAILABLE.inc()
+        logger.warning(f"[INGEST DEDUPE] Redis 연결 실패 → 중복 확인 없이 처리 (imageId={image_id}): {e}")
+        return True
+
+    DEDUPED.inc()
+    return False
+
+
+async def _take_over_stale(key: str) -> bool:
+    """
+    오래된 처리 중 표시를 새 표시로 교체 (WATCH → 확인 → MULTI/EXEC)
+    - 확인 후 교체 전에 다른 요청이 먼저 바꾸면 실패 → 동시에 둘이 획득하지 않음
+    - 값이 사라졌으면 (실패로 해제 / 만료) SET NX 로 다시 시도
+    """
+    async with ar.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(key)
+            value = await pipe.get(key)
+            if value is not None:
+                if not value.startswith(CLAIMED):
+                    return False
+                if time.time() - float(value[len(CLAIMED):]) <= settings.INGEST_JOB_STALE_SEC:
+                    return False
+            pipe.multi()
+            pipe.set(key, _claimed_value(), nx=value is None, ex=settings.INGEST_DEDUPE_TTL)
+            [ok] = await pipe.execute()
+            return bool(ok)
+        except WatchError:
+            return False
+
+
+async def release(image_id: str):
+    """
+    실패한 imageId 는 재시도가 다시 처리할 수 있도록 seen-set 에서 제거
+    """
+    try:
+        await ar.delete(_seen_key(image_id))
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        logger.warning(f"[INGEST DEDUPE] imageId={image_id} claim 해제 실패 (TTL 만료까지 유지): {e}")
+
+
+async def mark_done(items: list[tuple[str, str]]):
+    """
+    처리 완료 기록 - items: [(imageId, object_path)] (한 번의 pipeline)
+    이후 같은 imageId 요청은 처리 없이 이 object_path 를 결과로 받음
+    """
+    if not items:
+        return
+    try:
+        async with ar.pipeline(transaction=False) as pipe:
+            for image_id, object_path in items:
+                pipe.set(_seen_key(image_id), f"{DONE}{object_path}", ex=settings.INGEST_DEDUPE_TTL)
+            await pipe.execute()
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        logger.warning(f"[INGEST DEDUPE] 완료 기록 실패 ({len(items)}건): {e}")
+
+
+async def wait_for_result(image_id: str) -> str | None:
+    """
+    같은 imageId 의 원래 요청이 끝날 때까지 (최대 INGEST_DEDUPE_WAIT_SEC) 기다렸다가 object_path 반환
+    - 원래 요청이 실패했거나 (claim 해제) 시간 안에 끝나지 않으면 None
+    """
+    deadline = time.monotonic() + settings.INGEST_DEDUPE_WAIT_SEC
+    while True:
+        value = await ar.get(_seen_key(image_id))
+        if value is None:
+            return None
+        if value.startswith(DONE):
+            return value[len(DONE):]
+        if time.monotonic() > deadline:
+            return None
+        await asyncio.sleep(0.2)
+
+
+async def _dedupe_content(image_id: str, raw) -> str | None:
+    """
+    내용(sha256)이 같은 사진이 이미 저장돼 있으면 그 object_path 반환 (변환/업로드/추론 생략)
+    - ingest_hash 는 업로드에 성공한 imageId 만 가리킴 (_remember_content)
+    """
+    try:
+        original = await ar.get(_hash_key(raw.sha256))
+        if original is None or original == image_id:
+            return None
+
+        value = await ar.get(_seen_key(original))
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        logger.warning(f"[INGEST DEDUPE] imageId={image_id} 내용 중복 확인 실패 → 그대로 처리: {e}")
+        return None
+    if value is not None and value.startswith(DONE):
+        DEDUPED_CONTENT.inc()
+        return value[len(DONE):]
+    return None
+
+
+async def _remember_content(image_id: str, sha256: str):
+    """
+    업로드 성공 후 내용 hash → imageId 기록
+    - 다운로드 직후에 기록하면 그 요청이 실패해도 hash 가 실패한 imageId 를 가리켜
+      TTL 동안 같은 내용의 사진이 중복 제거되지 않음
+    - 원래 imageId 가 이후 실패로 해제되면 다음에 성공한 imageId 가 덮어씀
+    """
+    try:
+        await ar.set(_hash_key(sha256), image_id, ex=settings.INGEST_DEDUPE_TTL)
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        logger.warning(f"[INGEST DEDUPE] imageId={image_id} 내용 hash 기록 실패: {e}")
+
+
+# ---------------------------------------------------------
+# 작업 레코드 (mode=async)
+# ---------------------------------------------------------
+async def create_job(p: DataPayload) -> Dict[str, Any]:
+    """
+    작업 레코드 저장 + 비동기 worker 대기 큐에 추가
+    """
+    image_id = str(p.imageId)
+    now = time.time()
+    record = {
+        "imageId": image_id,
+        "status": "accepted",
+        "request": p.model_dump_json(),
+        "created_at": now,
+        "updated_at": now,
+    }
+    async with ar.pipeline(transaction=True) as pipe:
+        pipe.delete(_job_key(image_id))
+        pipe.hset(_job_key(image_id), mapping=record)
+        pipe.expire(_job_key(image_id), settings.INGEST_JOB_TTL)
+        pipe.lpush(PENDING_QUEUE, image_id)
+        await pipe.execute()
+    return record
+
+
+async def submit_job(p: DataPayload) -> Dict[str, Any]:
+    """
+    비동기 수집 접수 - 이미 접수된 imageId 면 기존 작업 상태 반환 (대기 큐에 다시 넣지 않음)
+    - 동기 요청으로 처리 중/완료된 imageId 는 작업 레코드가 없으므로 seen-set 값으로 상태 반환
+    """
+    image_id = str(p.imageId)
+    if not await claim(image_id):
+        record = await get_status(image_id)
+        return record if record is not None else {"status": "accepted"}
+    return await create_job(p)
+
+
+async def get_job(image_id: str) -> Dict[str, Any] | None:
+    record = await ar.hgetall(_job_key(image_id))
+    if not record:
+        return None
+    record.pop("request", None)
+    for key in ("created_at", "updated_at"):
+        if key in record:
+            record[key] = float(record[key])
+    return record
+
+
+async def get_status(image_id: str) -> Dict[str, Any] | None:
+    """
+    imageId 처리 상태 조회
+    - mode=async: 작업 레코드 (단계별 상태)
+    - 동기/배치 수집: 작업 레코드가 없으므로 seen-set 값으로 processing / done 만 구분
+    - 둘 다 없으면 (처음 보는 imageId, 실패로 해제, TTL 만료) None
+    """
+    record = await get_job(image_id)
+    if record is not None:
+        return record
+
+    value = await ar.get(_seen_key(image_id))
+    if value is None:
+        return None
+    if value.startswith(DONE):
+        return {"imageId": image_id, "status": "done", "object_path": value[len(DONE):]}
+    return {"imageId": image_id, "status": "processing", "updated_at": float(value[len(CLAIMED):])}
+
+
+async def _set_status(image_id: str, status: str, **fields):
+    """
+    진행 상태 기록 + 처리 중 표시 갱신 (오래 걸리는 작업이 stale 로 판단되지 않도록)
+    """
+    now = time.time()
+    async with ar.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(image_id), mapping={"status": status, "updated_at": now, **fields})
+        pipe.set(_seen_key(image_id), f"{CLAIMED}{now}", ex=settings.INGEST_DEDUPE_TTL)
+        await pipe.execute()
+
+
+async def complete_job(image_id: str, object_path: str):
+    async with ar.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(image_id), mapping={
+            "status": "done", "updated_at": time.time(), "object_path": object_path,
+        })
+        pipe.set(_seen_key(image_id), f"{DONE}{object_path}", ex=settings.INGEST_DEDUPE_TTL)
+        await pipe.execute()
+
+
+async def fail_job(image_id: str, error: str):
+    JOB_FAILED.inc()
+    await ar.hset(_job_key(image_id), mapping={"status": "failed", "updated_at": time.time(), "error": error})
+    await release(image_id)
+
+
+# ---------------------------------------------------------
+# 실행
+# ---------------------------------------------------------
+async def process_claimed(p: DataPayload, on_stage=None) -> tuple[str, bool]:
+    """
+    claim 된 사진 처리: 다운로드 → 변환 → 업로드 (추론 큐 추가는 호출 측)
+    - (object_path, 내용 중복 여부) 반환 - 내용 중복이면 원본 사진의 object_path
+    """
+    duplicate = False
+    sha256 = None
+
+    async def on_fetched(raw):
+        nonlocal duplicate, sha256
+        sha256 = raw.sha256
+        existing = await _dedupe_content(str(p.imageId), raw)
+        duplicate = existing is not None
+        return existing
+
+    object_path = await process_photo(
+        p,
+        on_stage=on_stage,
+        on_fetched=on_fetched if settings.INGEST_DEDUPE_CONTENT_HASH else None,
+    )
+    if sha256 is not None and not duplicate:
+        await _remember_content(str(p.imageId), sha256)
+    return object_path, duplicate
+
+
+async def execute_job(p: DataPayload) -> str:
+    """
+    비동기 작업 실행 (worker): 다운로드 → 변환 → 업로드 → 추론 큐 추가
+    - 단계별 상태를 작업 레코드에 기록
+    - 내용 중복이면 원본 object_path 를 기록하고 추론 큐에 넣지 않음
+    - 실패 시 failed 기록 + claim 해제 후 예외 재발생
+    """
+    image_id = str(p.imageId)
+
+    async def on_stage(stage: str):
+        await _set_status(image_id, stage)
+
+    try:
+        object_path, duplicate = await process_claimed(p, on_stage=on_stage)
+        if not duplicate:
+            await _set_status(image_id, "enqueuing", object_path=object_path)
+            await producer("infer_job_queue", object_path, image_id)
+        await complete_job(image_id, object_path)
+        return object_path
+    except ValueError:
+        await fail_job(image_id, "parameter type error")
+        raise
+    except Exception as e:
+        logger.error(f"[INGEST JOB] imageId={image_id} 처리 실패: {e}")
+        await fail_job(image_id, str(e) or type(e).__name__)
+        raise
+
+
+async def ingest_once(p: DataPayload) -> str:
+    """
+    동기 수집 (imageId 멱등, 작업 레코드 없음) - object_path 반환
+    - 처음 보는 imageId: 전체 파이프라인 실행 후 완료 기록
+    - 중복 요청: 다운로드/변환 없이 원래 요청이 끝나길 기다렸다가 그 결과 반환
+    - 실패 시 claim 해제 (재시도가 다시 처리)
+    """
+    image_id = str(p.imageId)
+    if not await claim(image_id):
+        object_path = await wait_for_result(image_id)
+        if object_path is None:
+            raise RuntimeError(f"duplicate request for imageId={image_id} (original request failed or still running)")
+        return object_path
+
+    try:
+        object_path, duplicate = await process_claimed(p)
+        if not duplicate:
+            await producer("infer_job_queue", object_path, image_id)
+    except Exception:
+        await release(image_id)
+        raise
+    await mark_done([(image_id, object_path)])
+    return object_path
+
+
+# ---------------------------------------------------------
+# worker
+# ---------------------------------------------------------
+async def _run_job(image_id: str):
+    record = await ar.hgetall(_job_key(image_id))
+    if not record or "request" not in record:
+        logger.warning(f"[INGEST JOB] imageId={image_id} 작업 레코드 없음 (만료?) → 건너뜀")
+        return
+
+    if record.get("status") == "done":
+        return      # stale 로 판단돼 다시 들어왔지만 원래 worker 가 이미 완료
+
+    p = DataPayload.model_validate_json(record["request"])
+    try:
+        await execute_job(p)
+    except Exception:
+        pass    # execute_job 에서 failed 기록 완료
+    finally:
+        JOB_SECONDS.observe(time.time() - float(record.get("created_at", time.time())))
+
+
+async def _worker(n: int):
+    while True:
+        try:
+            image_id = await ar.brpoplpush(PENDING_QUEUE, PROCESSING_QUEUE, timeout=5)
+            if image_id is None:
+                continue
+            try:
+                await _run_job(image_id)
+            finally:
+                await ar.lrem(PROCESSING_QUEUE, 1, image_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[INGEST WORKER {n}] {e}")
+            await asyncio.sleep(1)
+
+
+async def requeue_stale_jobs():
+    """
+    처리 중 큐에 남아 있지만 INGEST_JOB_STALE_SEC 동안 진행이 없는 작업을 대기 큐로 되돌림
+    (처리 도중 worker 프로세스가 종료된 경우)
+    """
+    now = time.time()
+    for image_id in await ar.lrange(PROCESSING_QUEUE, 0, -1):
+        updated_at = await ar.hget(_job_key(image_id), "updated_at")
+        if updated_at is None or now - float(updated_at) > settings.INGEST_JOB_STALE_SEC:
+            if await ar.lrem(PROCESSING_QUEUE, 1, image_id):
+                await ar.lpush(PENDING_QUEUE, image_id)
+                logger.warning(f"[INGEST JOB] imageId={image_id} 재처리 대기열로 이동")
+
+
+async def _stale_sweeper(interval: float):
+    """
+    stale 작업 복구를 interval 초마다 실행
+    - 시작 시 한 번만 하면 다른 인스턴스의 worker 가 종료된 경우 재시작 전까지 복구되지 않음
+    """
+    while True:
+        try:
+            await requeue_stale_jobs()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[INGEST JOB] stale 작업 복구 실패: {e}")
+        await asyncio.sleep(interval)
+
+
+async def start_workers():
+    _workers.append(asyncio.create_task(_stale_sweeper(max(settings.INGEST_JOB_STALE_SEC / 2, 1))))
+    for n in range(settings.INGEST_ASYNC_WORKERS):
+        _workers.append(asyncio.create_task(_worker(n)))
+    logger.info(f"[INGEST JOB] {settings.INGEST_ASYNC_WORKERS} workers started")
+
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
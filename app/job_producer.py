@@ -0,0 +1,182 @@
+# app/job_producer.py
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+from . import metrics
+from .config import settings
+from .redis_config import ar
+
+logger = logging.getLogger(__name__)
+
+ENQUEUE_SECONDS = metrics.histogram("redis_enqueue_seconds", "push 호출부터 Redis LPUSH 완료(또는 spill)까지 시간(초)")
+FLUSH_BATCH = metrics.histogram("redis_flush_batch_size", "한 번의 pipeline 으로 보낸 작업 수", buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+PENDING = metrics.gauge("redis_producer_pending", "flush 대기 중인 작업 수")
+SPILLED = metrics.gauge("redis_producer_spilled", "Redis 장애로 로컬에 보관 중인 작업 수")
+DROPPED = metrics.counter("redis_producer_dropped_total", "spill 버퍼가 가득 차 버려진 작업 수")
+
+
+class JobProducer:
+    """
+    Redis 작업 큐 producer (micro-batch)
+    - push() 된 작업을 flush_interval 동안 또는 max_batch 개까지 모아 pipeline LPUSH 한 번으로 전송
+    - Redis 장애 시 spill_limit 개까지 로컬 버퍼에 보관 후 다음 flush 에서 먼저 재전송
+    - spill 버퍼도 가득 차면 push() 가 예외 발생
+    """
+
+    def __init__(self, client, flush_interval: float, max_batch: int, spill_limit: int):
+        self._client = client
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.spill_limit = spill_limit
+
+        self._pending: List[tuple] = []     # (queue, value, started, future)
+        self._spill: deque = deque()        # (queue, value, started)
+        self._wake = asyncio.Event()    # 대기 작업 생김
+        self._full = asyncio.Event()    # max_batch 도달
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._next_retry = 0.0              # Redis 장애 중 다음 재시도 시각 (monotonic)
+
+    # ---------------------------------------------------------
+    # lifecycle
+    # ---------------------------------------------------------
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        남은 작업을 한 번 더 flush 하고 종료
+        """
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    # ---------------------------------------------------------
+    # push
+    # ---------------------------------------------------------
+    async def push(self, queue: str, payload: Dict[str, Any]):
+        await self.push_many(queue, [payload])
+
+    async def push_many(self, queue: str, payloads: List[Dict[str, Any]]):
+        """
+        작업 추가 - Redis 에 기록되거나 spill 버퍼에 보관되면 반환
+        """
+        if not payloads:
+            return
+        self.start()
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        futures = []
+        for payload in payloads:
+            fut = loop.create_future()
+            self._pending.append((queue, json.dumps(payload), started, fut))
+            futures.append(fut)
+        PENDING.set(len(self._pending))
+
+        self._wake.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+
+        await asyncio.gather(*futures)
+
+    # ---------------------------------------------------------
+    # flush loop
+    # ---------------------------------------------------------
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+
+            # 첫 작업이 들어온 뒤 flush_interval 동안 더 모음 (max_batch 에 도달하면 즉시)
+            if not self._closing and len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+
+            await self._flush()
+
+            if self._closing and not self._pending:
+                if self._spill:
+                    logger.error(f"[REDIS PRODUCER] 종료 시 전송하지 못한 작업 {len(self._spill)}건 유실")
+                return
+
+    async def _flush(self):
+        if self._spill and not self._closing and time.monotonic() < self._next_retry:
+            # Redis 장애 중: 재시도 시각 전까지는 새 작업도 바로 spill (호출 측 대기 없음)
+            batch, self._pending = self._pending, []
+            PENDING.set(0)
+            self._spill_batch(batch)
+            return
+
+        batch = [(q, v, t, None) for q, v, t in self._spill] + self._pending
+        self._spill.clear()
+        self._pending = []
+        PENDING.set(0)
+        if not batch:
+            SPILLED.set(0)
+            return
+
+        by_queue: Dict[str, List[str]] = {}
+        for queue, value, _, _ in batch:
+            by_queue.setdefault(queue, []).append(value)
+
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for queue, values in by_queue.items():
+                    pipe.lpush(queue, *values)
+                lengths = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"[REDIS PRODUCER] flush 실패 → spill: {e}")
+            self._spill_batch(batch)
+            # Redis 복구를 기다리며 주기적으로 재시도
+            retry = settings.REDIS_SPILL_RETRY_INTERVAL
+            self._next_retry = time.monotonic() + retry
+            asyncio.get_running_loop().call_later(retry, self._wake.set)
+            return
+
+        FLUSH_BATCH.observe(len(batch))
+        for queue, length in zip(by_queue, lengths):
+            # LPUSH 응답 = push 후 큐 길이
+            metrics.gauge("redis_queue_length", "Redis 작업 큐 길이", labels={"queue": queue}, merge="max").set(length)
+
+        now = time.perf_counter()
+        for _, _, started, fut in batch:
+            if fut is not None:
+                ENQUEUE_SECONDS.observe(now - started)
+                if not fut.done():
+                    fut.set_result(None)
+        SPILLED.set(len(self._spill))
+
+    def _spill_batch(self, batch: List[tuple]):
+        now = time.perf_counter()
+        for queue, value, started, fut in batch:
+            if len(self._spill) < self.spill_limit:
+                self._spill.append((queue, value, started))
+                if fut is not None and not fut.done():
+                    ENQUEUE_SECONDS.observe(now - started)
+                    fut.set_result(None)
+            else:
+                DROPPED.inc()
+                if fut is not None and not fut.done():
+                    fut.set_exception(RuntimeError("Redis unavailable and spill buffer is full"))
+        SPILLED.set(len(self._spill))
+
+
+job_producer = JobProducer(
+    ar,
+    flush_interval=settings.REDIS_FLUSH_INTERVAL_MS / 1000,
+    max_batch=settings.REDIS_FLUSH_MAX_BATCH,
+    spill_limit=settings.REDIS_SPILL_LIMIT,
+)
@@ -0,0 +1,133 @@
+# app/json_stream.py
+
+import re
+from typing import Any, List
+
+import orjson
+
+# 문자열 밖에서 의미 있는 구조 문자
+_STRUCT = re.compile(rb'[\[\]{}"]')
+_WS = b" \t\r\n"
+
+
+class JsonArrayStream:
+    """
+    청크 단위로 들어오는 JSON 응답에서 최상위 원소를 완성되는 즉시 꺼내는 디코더
+    - 최상위가 배열이면 객체/배열 원소를 하나씩 반환
+    - 최상위가 객체 하나면 응답 끝에서 그 객체 하나를 반환
+    - 원소 하나가 완성될 때까지만 버퍼에 보관 → 메모리는 원소 크기에 비례
+
+    사용:
+        stream = JsonArrayStream()
+        async for chunk in res.aiter_bytes():
+            for obj in stream.feed(chunk):
+                ...
+        stream.close()
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0           # 다음 스캔 위치
+        self._root = None       # b"[" / b"{" / b"" (스칼라)
+        self._depth = 0
+        self._in_str = False
+        self._start = -1        # 현재 원소 시작 위치
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        self._buf += chunk
+        out = []
+
+        if self._root is None and not self._detect_root():
+            return out
+        if self._root == b"":
+            return out
+
+        buf = self._buf
+        pos = self._pos
+        depth = self._depth
+        in_str = self._in_str
+        start = self._start
+        elem_depth = 1 if self._root == b"[" else 0
+
+        while True:
+            if in_str:
+                # 닫는 따옴표 찾기 (앞의 역슬래시 개수가 홀수면 escape 된 따옴표)
+                q = buf.find(b'"', pos)
+                if q < 0:
+                    pos = len(buf)
+                    break
+                bs = 0
+                while q - 1 - bs >= 0 and buf[q - 1 - bs] == 0x5C:  # "\\"
+                    bs += 1
+                pos = q + 1
+                if bs % 2 == 0:
+                    in_str = False
+                continue
+
+            m = _STRUCT.search(buf, pos)
+            if m is None:
+                pos = len(buf)
+                break
+
+            ch = buf[m.start()]
+            pos = m.end()
+
+            if ch == 0x22:  # '"'
+                in_str = True
+            elif ch in (0x7B, 0x5B):  # '{' '['
+                if depth == elem_depth:
+                    start = m.start()
+                depth += 1
+            else:  # '}' ']'
+                depth -= 1
+                if depth == elem_depth and start >= 0:
+                    out.append(orjson.loads(buf[start:pos]))
+                    start = -1
+
+        # 완성된 원소 앞부분은 버림 (원소 진행 중이면 시작점부터 보관)
+        if start >= 0:
+            drop = start
+        else:
+            drop = 0 if in_str else pos
+        if drop > 0:
+            del buf[:drop]
+            pos -= drop
+            if start >= 0:
+                start = 0
+
+        self._pos = pos
+        self._depth = depth
+        self._in_str = in_str
+        self._start = start
+        return out
+
+    def close(self) -> List[Any]:
+        """
+        응답 종료 처리 - 최상위가 스칼라인 경우 그 값을 반환, 잘린 JSON 이면 ValueError
+        """
+        if self._root == b"":
+            return [orjson.loads(self._buf)]
+        if self._root is None:
+            return []
+        if self._depth != 0 or self._in_str:
+            raise ValueError("truncated JSON response")
+        return []
+
+    def _detect_root(self) -> bool:
+        stripped = self._buf.lstrip(_WS)
+        if not stripped:
+            self._buf.clear()
+            return False
+
+        first = stripped[:1]
+        self._buf = bytearray(stripped)
+        if first == b"[":
+            self._root = b"["
+            self._depth = 1
+            self._pos = 1
+        elif first == b"{":
+            self._root = b"{"
+            self._pos = 0
+        else:
+            self._root = b""
+        return True
@@ -1,9 +1,19 @@
 from fastapi import FastAPI
-from .router import router
-from .scheduler import start_scheduler
+from .router import router, get_metrics
+from .scheduler import sync_engine
 import logging
 from fastapi.middleware.cors import CORSMiddleware
-from .telemetry_service import load_uuid_to_num, UUID_TO_NUM  # ← 추가
+from .telemetry_service import ensure_sync_tables, MSG_TABLE_MAP  # ← 추가
+from .table_schema import load_table_columns
+from .telemetry_rollups import ensure_rollups, stop_refresher
+from .services import shutdown_transcode_pool
+from . import http_clients
+from .job_producer import job_producer
+from . import ingest_jobs
+from . import robot_registry
+from . import copy_pool
+from . import metrics
+from .config import settings
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,16 +32,34 @@ def create_app() -> FastAPI:
     )
 
     app.include_router(router, prefix="/v1")
+    # Prometheus scrape 기본 경로 (/v1/metrics?format=json 은 그대로)
+    app.add_api_route("/metrics", get_metrics, methods=["GET"], include_in_schema=False)
 
     @app.on_event("startup")
     async def on_startup():
-        logging.info("Start APScheduler for telemetry sync")
-        # start_scheduler()
-        global UUID_TO_NUM
-        mapping = await load_uuid_to_num()
-        UUID_TO_NUM.clear()
-        UUID_TO_NUM.update(mapping)
-        logging.info(f"UUID_TO_NUM loaded: {UUID_TO_NUM}")
+        metrics.start_exporter(settings.METRICS_DIR, settings.METRICS_FLUSH_SEC)
+        await http_clients.start_clients()
+        job_producer.start()
+        await ingest_jobs.start_workers()
+        await robot_registry.start()
+        await ensure_sync_tables()
+        await copy_pool.start()
+        await load_table_columns(list(MSG_TABLE_MAP.values()))
+        await ensure_rollups(list(MSG_TABLE_MAP.values()))
+        if settings.SYNC_ENGINE_ENABLED:
+            sync_engine.start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await sync_engine.stop()
+        await ingest_jobs.stop_workers()
+        await job_producer.stop()
+        await stop_refresher()
+        await robot_registry.stop()
+        await copy_pool.close()
+        shutdown_transcode_pool()
+        await http_clients.close_clients()
+        await metrics.stop_exporter(settings.METRICS_DIR)
 
     return app
 
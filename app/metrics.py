@@ -0,0 +1,435 @@
+# app/metrics.py
+
+import asyncio
+import bisect
+import fcntl
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 프로세스 내 경량 metrics (counter / gauge / histogram)
+# - labels: 같은 이름의 metric 을 label 값별로 구분 (예: stage_seconds{stage="put_to_minio"})
+# ---------------------------------------------------------
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_REGISTRY: Dict[str, "_Metric"] = {}
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str = "", labels: Dict[str, str] | None = None):
+        self.name = name
+        self.help = help
+        self.labels = dict(labels or {})
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "", labels: Dict[str, str] | None = None):
+        super().__init__(name, help, labels)
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0):
+        self.value += n
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "", labels: Dict[str, str] | None = None, merge: str = "sum"):
+        super().__init__(name, help, labels)
+        self.value = 0.0
+        # worker 간 합치는 방법: sum (worker 별 값의 합) / max (모든 worker 가 같은 대상을 보는 값)
+        self.merge = merge
+
+    def set(self, v: float):
+        self.value = v
+
+    def inc(self, n: float = 1.0):
+        self.value += n
+
+    def dec(self, n: float = 1.0):
+        self.value -= n
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", labels: Dict[str, str] | None = None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self):
+        return {
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+def _key(name: str, labels: Dict[str, str] | None) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _get_or_create(cls, name: str, help: str, labels: Dict[str, str] | None = None, **kwargs):
+    key = _key(name, labels)
+    metric = _REGISTRY.get(key)
+    if metric is None:
+        with _lock:
+            metric = _REGISTRY.get(key)
+            if metric is None:
+                metric = cls(name, help, labels, **kwargs)
+                _REGISTRY[key] = metric
+    return metric
+
+
+def counter(name: str, help: str = "", labels: Dict[str, str] | None = None) -> Counter:
+    return _get_or_create(Counter, name, help, labels)
+
+
+def gauge(name: str, help: str = "", labels: Dict[str, str] | None = None, merge: str = "sum") -> Gauge:
+    return _get_or_create(Gauge, name, help, labels, merge=merge)
+
+
+def histogram(name: str, help: str = "", buckets=DEFAULT_BUCKETS, labels: Dict[str, str] | None = None) -> Histogram:
+    return _get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+
+def snapshot() -> Dict[str, dict]:
+    """
+    현재 프로세스의 모든 metric 값 {name{labels}: {"type", "help", "value"}}
+    """
+    return {
+        key: {"type": m.kind, "help": m.help, "value": m.snapshot()}
+        for key, m in sorted(_REGISTRY.items())
+    }
+
+
+# ---------------------------------------------------------
+# 처리 단계별 소요 시간 / 처리량
+# - stage_seconds{stage}       : 1회 소요 시간 histogram
+# - stage_errors_total{stage}  : 예외로 끝난 횟수
+# - stage_items_total{stage}   : 처리한 항목 수 (행 수, 바이트 수 등 - add() 로 기록)
+# ---------------------------------------------------------
+class Stage:
+    def __init__(self, name: str):
+        labels = {"stage": name}
+        self.seconds = histogram("stage_seconds", "처리 단계별 소요 시간(초)", labels=labels)
+        self.errors = counter("stage_errors_total", "처리 단계별 실패 수", labels=labels)
+        self.items = counter("stage_items_total", "처리 단계별 처리 항목 수 (행/바이트 등)", labels=labels)
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield self
+        except Exception:
+            self.errors.inc()
+            raise
+        finally:
+            self.seconds.observe(time.perf_counter() - started)
+
+    def add(self, n: float):
+        self.items.inc(n)
+
+
+_STAGES: Dict[str, Stage] = {}
+
+
+def stage(name: str) -> Stage:
+    s = _STAGES.get(name)
+    if s is None:
+        s = _STAGES.setdefault(name, Stage(name))
+    return s
+
+
+# ---------------------------------------------------------
+# uvicorn worker 간 집계
+# - worker 마다 METRICS_FLUSH_SEC 초마다 METRICS_DIR/w-{pid}-{시작 시각}.json 에 자기 값을 기록
+#   (PID 만으로는 재사용된 PID 의 다른 프로세스와 구분되지 않으므로 /proc 의 프로세스 시작 시각을 같이 사용)
+# - /metrics 요청을 받은 worker 가 디렉터리의 파일을 모두 읽어 합산
+#   (counter/histogram: 합, gauge: merge 방식에 따라 합 또는 최댓값)
+# - 종료된 worker 의 counter/histogram 은 retired-{master}.json 에 더해 둠 → 합산 값이 줄어들지 않음
+#   (gauge 는 버림, master = worker 의 부모 프로세스 - master 가 바뀌면(재기동) 이전 retired 파일은 삭제)
+# - 정리/합산은 디렉터리 lock 안에서 실행 (여러 worker 가 동시에 같은 파일을 옮기지 않도록)
+# ---------------------------------------------------------
+_exporter: asyncio.Task | None = None
+
+
+def _records() -> List[dict]:
+    records = []
+    for m in list(_REGISTRY.values()):
+        record = {"name": m.name, "labels": m.labels, "type": m.kind, "help": m.help, "value": m.snapshot()}
+        if m.kind == "gauge":
+            record["merge"] = m.merge
+        records.append(record)
+    return records
+
+
+def _proc_start(pid: int) -> str | None:
+    """
+    /proc/{pid}/stat 의 starttime (부팅 후 clock tick), 프로세스가 없으면 None
+    - /proc 가 없는 OS 에서는 "0" (PID 생존 여부만 확인)
+    """
+    if not os.path.isdir("/proc/self"):
+        return "0" if _pid_alive(pid) else None
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # "pid (comm) state ppid ..." - comm 에 공백/괄호가 있을 수 있으므로 마지막 ')' 뒤부터 셈
+    return stat[stat.rindex(b")") + 2:].split()[19].decode()
+
+
+def _proc_id(pid: int) -> str:
+    return f"{pid}-{_proc_start(pid) or 0}"
+
+
+def _alive(proc_id: str) -> bool:
+    pid, _, started = proc_id.partition("-")
+    return pid.isdigit() and _proc_start(int(pid)) == started
+
+
+def _snapshot_path(directory: str) -> str:
+    return os.path.join(directory, f"w-{_proc_id(os.getpid())}.json")
+
+
+def _retired_path(directory: str) -> str:
+    return os.path.join(directory, f"retired-{_proc_id(os.getppid())}.json")
+
+
+def _write_json(path: str, records: List[dict]):
+    # 임시 파일에 쓴 뒤 rename → 읽는 쪽이 반쯤 쓴 파일을 보지 않음
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(orjson.dumps(records))
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> List[dict] | None:
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+@contextmanager
+def _dir_lock(directory: str):
+    with open(os.path.join(directory, "metrics.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_snapshot(directory: str):
+    """
+    이 worker 의 값을 파일로 기록
+    """
+    os.makedirs(directory, exist_ok=True)
+    _write_json(_snapshot_path(directory), _records())
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(merged: Dict[str, dict], records: List[dict], monotonic_only: bool = False):
+    """
+    records 를 merged 에 (name, labels) 별로 더함 (monotonic_only 면 gauge 제외)
+    """
+    for r in records:
+        if monotonic_only and r["type"] == "gauge":
+            continue
+        key = _key(r["name"], r["labels"])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = r
+        elif r["type"] == "histogram":
+            value, other = current["value"], r["value"]
+            if value["buckets"] == other["buckets"]:
+                value["counts"] = [a + b for a, b in zip(value["counts"], other["counts"])]
+                value["sum"] += other["sum"]
+                value["count"] += other["count"]
+        elif r["type"] == "gauge" and r.get("merge") == "max":
+            current["value"] = max(current["value"], r["value"])
+        else:
+            current["value"] += r["value"]
+
+
+def _retire(directory: str, path: str):
+    """
+    종료된 worker 파일의 counter/histogram 을 retired 파일에 더한 뒤 삭제 (_dir_lock 안에서 호출)
+    """
+    records = _read_json(path)
+    if records:
+        retired_path = _retired_path(directory)
+        merged: Dict[str, dict] = {}
+        _merge(merged, _read_json(retired_path) or [])
+        _merge(merged, records, monotonic_only=True)
+        _write_json(retired_path, list(merged.values()))
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def collect(directory: str) -> List[dict]:
+    """
+    모든 worker 파일 + retired 파일을 읽어 (name, labels) 별로 합산한 record 목록
+    """
+    write_snapshot(directory)
+
+    merged: Dict[str, dict] = {}
+    with _dir_lock(directory):
+        filenames = os.listdir(directory)
+        # 1) 종료된 worker → retired 로 옮김, 이전 master 의 retired → 삭제
+        live = []
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename.startswith("w-") and filename.endswith(".json"):
+                if _alive(filename[2:-5]):
+                    live.append(path)
+                else:
+                    _retire(directory, path)
+            elif filename.startswith("retired-") and filename.endswith(".json"):
+                if not _alive(filename[8:-5]):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+        # 2) 살아 있는 worker + retired 합산
+        for path in live + [_retired_path(directory)]:
+            records = _read_json(path)
+            if records:
+                _merge(merged, records)
+    # 같은 이름의 metric 은 붙어 있어야 함 (exposition format)
+    return sorted(merged.values(), key=lambda r: (r["name"], _key(r["name"], r["labels"])))
+
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels: Dict[str, str], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+def render_prometheus(records: List[dict]) -> str:
+    """
+    Prometheus text exposition format (0.0.4)
+    """
+    lines = []
+    described = set()
+    for r in records:
+        name = _NAME_RE.sub("_", r["name"])
+        if name not in described:
+            described.add(name)
+            help_text = r["help"].replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {r['type']}")
+
+        labels = r["labels"]
+        if r["type"] == "histogram":
+            value = r["value"]
+            cumulative = 0
+            for bound, count in zip(list(value["buckets"]) + [float("inf")], value["counts"]):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{name}_bucket{_labels_text(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels_text(labels)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels_text(labels)} {value['count']}")
+        else:
+            lines.append(f"{name}{_labels_text(labels)} {_number(r['value'])}")
+    return "\n".join(lines) + "\n"
+
+
+async def _export_loop(directory: str, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            write_snapshot(directory)
+        except OSError as e:
+            logger.warning(f"[METRICS] snapshot 기록 실패: {e}")
+
+
+def start_exporter(directory: str, interval: float):
+    global _exporter
+    if _exporter is None or _exporter.done():
+        _exporter = asyncio.create_task(_export_loop(directory, interval))
+
+
+async def stop_exporter(directory: str):
+    """
+    종료 시 마지막 값을 기록한 뒤 retired 파일로 옮김 (종료된 worker 의 counter 도 합산에 남음)
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.cancel()
+        await asyncio.gather(_exporter, return_exceptions=True)
+        _exporter = None
+    try:
+        write_snapshot(directory)
+        with _dir_lock(directory):
+            _retire(directory, _snapshot_path(directory))
+    except OSError as e:
+        logger.warning(f"[METRICS] 종료 시 snapshot 정리 실패: {e}")
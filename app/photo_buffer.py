@@ -0,0 +1,107 @@
+# app/photo_buffer.py
+
+import hashlib
+import io
+import os
+import tempfile
+from typing import BinaryIO, List
+
+
+class PhotoBuffer:
+    """
+    사진 한 장의 바이트를 담는 버퍼
+    - spool_threshold 이하: 메모리(bytes) 에 보관
+    - 넘으면 임시 파일로 옮겨 쓰고 이후 chunk 도 파일에 기록
+    - 변환/업로드 단계는 source(bytes 또는 파일 경로) / open() 으로 같은 버퍼를 그대로 사용
+    - hash_content=True 면 쓰는 동안 sha256 을 함께 계산 (finish() 후 sha256 속성)
+    - 사용 후 close() (임시 파일 삭제)
+    """
+
+    def __init__(self, spool_threshold: int, spool_dir: str | None = None, hash_content: bool = False):
+        self.size = 0
+        self.path: str | None = None
+        self.sha256: str | None = None
+        self._hash = hashlib.sha256() if hash_content else None
+        self._threshold = spool_threshold
+        self._dir = spool_dir
+        self._chunks: List[bytes] = []
+        self._data: bytes | None = None
+        self._file = None
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PhotoBuffer":
+        buf = cls(spool_threshold=len(data))
+        buf._data = data
+        buf.size = len(data)
+        return buf
+
+    # ---------------------------------------------------------
+    # 쓰기
+    # ---------------------------------------------------------
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self._hash is not None:
+            self._hash.update(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+
+        self._chunks.append(chunk)
+        if self.size > self._threshold:
+            fd, self.path = tempfile.mkstemp(prefix="photo_", suffix=".bin", dir=self._dir)
+            self._file = os.fdopen(fd, "wb")
+            for c in self._chunks:
+                self._file.write(c)
+            self._chunks = []
+
+    def finish(self) -> "PhotoBuffer":
+        if self._hash is not None:
+            self.sha256 = self._hash.hexdigest()
+            self._hash = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self._data is None:
+            self._data = b"".join(self._chunks)
+            self._chunks = []
+        return self
+
+    # ---------------------------------------------------------
+    # 읽기
+    # ---------------------------------------------------------
+    @property
+    def source(self) -> bytes | str:
+        """
+        메모리 버퍼면 bytes, 임시 파일이면 파일 경로 (process pool 에 경로만 넘기면 복사 없음)
+        """
+        return self.path if self.path is not None else self._data
+
+    def head(self, n: int) -> bytes:
+        if self.path is None:
+            return self._data[:n]
+        with open(self.path, "rb") as f:
+            return f.read(n)
+
+    def open(self) -> BinaryIO:
+        if self.path is not None:
+            return open(self.path, "rb")
+        return io.BytesIO(self._data)   # bytes 를 복사하지 않고 공유
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self._data = None
+        self._chunks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,4 +1,5 @@
 import redis
+import redis.asyncio as aioredis
 from .config import settings
 
 # config.py에서 불러온 환경 변수로 Redis 연결
@@ -9,3 +10,17 @@ r = redis.StrictRedis(
     password=settings.REDIS_PASSWORD,
     decode_responses=True
 )
+
+# async 핸들러용 asyncio Redis 클라이언트 (connection pool 공유)
+ar = aioredis.Redis(
+    connection_pool=aioredis.ConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=5,
+        socket_connect_timeout=3,
+    )
+)
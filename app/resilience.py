@@ -0,0 +1,248 @@
+# app/resilience.py
+
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+from . import http_clients, metrics
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_REQUESTS = metrics.counter("upstream_requests_total", "외부 API 요청 수 (재시도 포함)")
+UPSTREAM_RETRIES = metrics.counter("upstream_retries_total", "외부 API 재시도 수")
+UPSTREAM_THROTTLED = metrics.counter("upstream_throttled_total", "외부 API 가 429/302 로 제한한 응답 수")
+UPSTREAM_RATE_WAIT = metrics.histogram("upstream_rate_wait_seconds", "token bucket 대기 시간(초)")
+
+
+class CircuitOpenError(Exception):
+    """
+    circuit breaker 가 열려 있어 요청을 보내지 않음
+    """
+
+
+class ThrottledError(Exception):
+    """
+    외부 API 가 요청을 제한함 (429 또는 302 차단), 재시도 후에도 계속될 때
+    """
+
+
+# ---------------------------------------------------------
+# token bucket (초당 rate 개, 최대 burst 개까지 누적)
+# ---------------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """
+        Retry-After 등으로 받은 시간 동안 모든 요청을 멈춤
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        UPSTREAM_RATE_WAIT.observe(time.monotonic() - started)
+
+
+# ---------------------------------------------------------
+# circuit breaker
+# - 연속 failure_threshold 번 실패 → open (reset_timeout 초 동안 즉시 실패)
+# - 이후 half-open: 요청 하나만 통과시켜 성공하면 close, 실패하면 다시 open
+#   (probe 가 취소되면 다음 요청이 다시 probe)
+# ---------------------------------------------------------
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._gauge = metrics.gauge("circuit_open", "circuit breaker 열림 여부 (1=open)", labels={"name": name}, merge="max")
+
+    def before_call(self) -> bool:
+        """
+        요청 전 확인 - 이 요청이 half-open probe 면 True (결과 없이 끝나면 release_probe 호출)
+        """
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} circuit open")
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpenError(f"{self.name} circuit half-open (probe in flight)")
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """
+        probe 가 성공/실패 기록 없이 끝남 (취소 등) → 다음 요청이 다시 probe 할 수 있게
+        - 이미 결과가 기록돼 closed / open 이면 아무것도 안 함
+        """
+        if self.state == "half_open":
+            self._probing = False
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"[CIRCUIT] {self.name} closed")
+        self.state = "closed"
+        self._failures = 0
+        self._probing = False
+        self._gauge.set(0)
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"[CIRCUIT] {self.name} open ({self._failures} consecutive failures)")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self._gauge.set(1)
+
+
+# ---------------------------------------------------------
+# 재시도 / rate limit / circuit breaker 를 적용한 요청
+# - 재시도 대상: 연결 오류, timeout, 5xx, 429, 302(차단)
+#   지수 backoff + full jitter, Retry-After 가 있으면 그만큼 bucket 전체를 멈춤
+# - 4xx(429 제외) 는 바로 실패
+# - 재시도를 다 쓰면 마지막 예외를 그대로 올림 (timeout 이면 httpx.TimeoutException)
+# ---------------------------------------------------------
+def _retry_after(res: httpx.Response) -> float | None:
+    value = res.headers.get("retry-after")
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientClient:
+    def __init__(
+        self,
+        client_name: str,
+        bucket: TokenBucket,
+        breaker: CircuitBreaker,
+        max_retries: int,
+        timeout_retries: int,
+        base_delay: float,
+        max_delay: float,
+        concurrency: int,
+    ):
+        self.client_name = client_name
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.timeout_retries = timeout_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.concurrency = concurrency
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _check(self, res: httpx.Response):
+        """
+        응답 상태 확인 - 재시도할 응답이면 (예외, 대기 시간) 반환, 아니면 raise_for_status
+        """
+        if res.status_code in (302, 429):
+            UPSTREAM_THROTTLED.inc()
+            wait = _retry_after(res)
+            if wait is not None:
+                self.bucket.pause(wait)
+            return ThrottledError(f"{res.status_code} from {res.url}"), wait
+        if res.status_code >= 500:
+            return httpx.HTTPStatusError(f"{res.status_code} from {res.url}", request=res.request, response=res), _retry_after(res)
+        res.raise_for_status()
+        return None, None
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, read_body: bool = False, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        재시도는 응답을 넘기기 전까지의 실패만 (넘긴 뒤 본문 수신 중 오류는 호출 측으로)
+        - read_body=True: 본문까지 받은 뒤 넘김 → 본문 수신 중 오류도 재시도
+        """
+        client = http_clients.get_client(self.client_name)
+        attempt = timeouts = 0
+        while True:
+            probe = self.breaker.before_call()
+            try:
+                await self.bucket.acquire()
+                UPSTREAM_REQUESTS.inc()
+
+                error, wait, yielded = None, None, False
+                async with http_clients.host_semaphore(url, self.concurrency):
+                    try:
+                        async with client.stream(method, url, **kwargs) as res:
+                            error, wait = self._check(res)
+                            if error is None:
+                                if read_body:
+                                    await res.aread()
+                                self.breaker.record_success()
+                                yielded = True
+                                yield res
+                                return
+                    except (httpx.TimeoutException, httpx.TransportError) as e:
+                        if yielded:
+                            raise
+                        error = e
+                    except httpx.HTTPStatusError:
+                        if not yielded:
+                            # 4xx: upstream 은 정상 → breaker 에 실패로 세지 않음
+                            self.breaker.record_success()
+                        raise
+            finally:
+                # 취소 등으로 결과 없이 끝난 probe 가 half-open 을 계속 막지 않도록
+                if probe:
+                    self.breaker.release_probe()
+
+            self.breaker.record_failure()
+            is_timeout = isinstance(error, httpx.TimeoutException)
+            timeouts += is_timeout
+            if attempt >= self.max_retries or (is_timeout and timeouts > self.timeout_retries):
+                raise error
+
+            delay = wait if wait is not None else self._backoff(attempt)
+            if isinstance(error, ThrottledError):
+                # 제한 응답이면 다른 요청도 같이 늦춤
+                self.bucket.pause(delay)
+            attempt += 1
+            UPSTREAM_RETRIES.inc()
+            logger.warning(f"[UPSTREAM RETRY] {method} {url} ({error!r}) → {delay:.1f}s 후 재시도 {attempt}/{self.max_retries}")
+            await asyncio.sleep(delay)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        본문까지 모두 받은 응답 반환
+        """
+        async with self.stream(method, url, read_body=True, **kwargs) as res:
+            return res
@@ -0,0 +1,235 @@
+# app/robot_registry.py
+
+import asyncio
+import logging
+import time
+from typing import Dict
+
+import asyncpg
+from sqlalchemy import text
+
+from . import metrics
+from .config import settings
+from .database import ASYNCPG_CONNECT_ARGS, async_session, engine
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_REFRESHES = metrics.counter("robot_registry_refreshes_total", "robot_id 매핑 전체 재조회 수")
+REGISTRY_MISSES = metrics.counter("robot_registry_misses_total", "캐시에 없어 DB 에서 단건 조회한 robot_id 수")
+REGISTRY_SIZE = metrics.gauge("robot_registry_size", "캐시된 robot_id 수", merge="max")
+
+# ---------------------------------------------------------
+# robot_id(UUID 문자열) → robot_num 매핑 캐시
+# - UUID_TO_NUM dict 를 그대로 조회 (hot path 는 dict lookup 한 번)
+#   전체 재조회 시에도 dict 객체를 바꾸지 않고 내용만 갱신 → import 해 둔 모듈도 항상 최신
+# - 갱신 경로
+#   1) ROBOT_REGISTRY_TTL 초마다 전체 재조회
+#   2) shrc.robots 변경 trigger → NOTIFY robots_changed → 모든 worker 가 즉시 재조회
+#      (LISTEN 은 pool 밖의 전용 asyncpg 연결, 끊기면 TTL 주기에 다시 연결)
+#      trigger 는 기본적으로 만들지 않음 - DB 에 이미 있을 때만 LISTEN (없으면 TTL 갱신만)
+#      ROBOT_REGISTRY_CREATE_TRIGGER=true 면 기동 시 생성 (shrc.robots 에 trigger 를 만들 권한 필요)
+#      나중에 trigger 가 생기면 TTL 주기에 확인해서 LISTEN 시작
+#   3) 캐시에 없는 robot_id → 단건 조회 (같은 robot_id 동시 요청은 한 번만 조회)
+#      없는 robot_id 는 ROBOT_REGISTRY_NEGATIVE_TTL 초 동안 다시 조회하지 않음
+# ---------------------------------------------------------
+CHANNEL = "robots_changed"
+TRIGGER_NAME = "robots_changed_notify"
+# 여러 worker 가 동시에 trigger 를 만들 때 직렬화
+TRIGGER_LOCK_KEY = 0x5348524303   # 'SHRC' 03
+
+UUID_TO_NUM: Dict[str, int] = {}
+
+_missing: Dict[str, float] = {}
+_inflight: Dict[str, asyncio.Future] = {}
+_refreshing: asyncio.Task | None = None
+_refresh_again = False
+_listener: asyncpg.Connection | None = None
+_ttl_task: asyncio.Task | None = None
+
+
+async def load_uuid_to_num() -> Dict[str, int]:
+    async with async_session() as session:
+        result = await session.execute(text("""
+            SELECT robot_id, robot_num FROM shrc.robots
+        """))
+        rows = result.fetchall()
+    return {str(r.robot_id): r.robot_num for r in rows}
+
+
+async def refresh():
+    """
+    전체 재조회 후 UUID_TO_NUM 내용 교체 (await 없이 한 번에 바꾸므로 중간 상태가 보이지 않음)
+    """
+    mapping = await load_uuid_to_num()
+    for robot_id in [r for r in UUID_TO_NUM if r not in mapping]:
+        del UUID_TO_NUM[robot_id]
+    UUID_TO_NUM.update(mapping)
+    _missing.clear()
+    REGISTRY_REFRESHES.inc()
+    REGISTRY_SIZE.set(len(UUID_TO_NUM))
+    logger.info(f"[ROBOT REGISTRY] {len(UUID_TO_NUM)} robots loaded")
+
+
+def _schedule_refresh():
+    """
+    재조회 예약 - 실행 중이면 끝난 뒤 한 번 더 (NOTIFY 가 몰려도 동시에 하나만)
+    """
+    global _refreshing, _refresh_again
+    if _refreshing is not None and not _refreshing.done():
+        _refresh_again = True
+        return
+    _refreshing = asyncio.create_task(_refresh_loop())
+
+
+async def _refresh_loop():
+    global _refresh_again
+    while True:
+        _refresh_again = False
+        try:
+            await refresh()
+        except Exception as e:
+            logger.warning(f"[ROBOT REGISTRY] 재조회 실패: {e}")
+        if not _refresh_again:
+            return
+
+
+async def get_robot_num(robot_id: str) -> int | None:
+    """
+    robot_id → robot_num (캐시에 없으면 DB 단건 조회, 없는 robot 이면 None)
+    """
+    robot_num = UUID_TO_NUM.get(robot_id)
+    if robot_num is not None:
+        return robot_num
+    if time.monotonic() < _missing.get(robot_id, 0.0):
+        return None
+
+    future = _inflight.get(robot_id)
+    if future is None:
+        future = asyncio.ensure_future(_lookup(robot_id))
+        _inflight[robot_id] = future
+        future.add_done_callback(lambda _: _inflight.pop(robot_id, None))
+    return await asyncio.shield(future)
+
+
+async def _lookup(robot_id: str) -> int | None:
+    REGISTRY_MISSES.inc()
+    async with async_session() as session:
+        result = await session.execute(
+            text("SELECT robot_num FROM shrc.robots WHERE robot_id::text = :robot_id"),
+            {"robot_id": robot_id},
+        )
+        robot_num = result.scalar()
+
+    if robot_num is None:
+        _missing[robot_id] = time.monotonic() + settings.ROBOT_REGISTRY_NEGATIVE_TTL
+        return None
+    UUID_TO_NUM[robot_id] = robot_num
+    REGISTRY_SIZE.set(len(UUID_TO_NUM))
+    logger.info(f"[ROBOT REGISTRY] new robot: {robot_id} → {robot_num}")
+    return robot_num
+
+
+# ---------------------------------------------------------
+# 변경 알림 (trigger + LISTEN)
+# ---------------------------------------------------------
+async def notify_trigger_exists() -> bool:
+    try:
+        async with async_session() as session:
+            result = await session.execute(text("""
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = :name
+                  AND tgrelid = 'shrc.robots'::regclass
+            """), {"name": TRIGGER_NAME})
+            return result.first() is not None
+    except Exception as e:
+        logger.warning(f"[ROBOT REGISTRY] NOTIFY trigger 확인 실패: {e}")
+        return False
+
+
+async def ensure_notify_trigger():
+    """
+    shrc.robots 변경 시 NOTIFY 하는 trigger 생성 (ROBOT_REGISTRY_CREATE_TRIGGER 일 때만 호출)
+    - 권한 등으로 실패하면 TTL 갱신만 사용
+    """
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": TRIGGER_LOCK_KEY})
+            await conn.execute(text(f"""
+                CREATE OR REPLACE FUNCTION shrc.notify_robots_changed() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM pg_notify('{CHANNEL}', '');
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            """))
+            exists = (await conn.execute(text("""
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = :name
+                  AND tgrelid = 'shrc.robots'::regclass
+            """), {"name": TRIGGER_NAME})).first()
+            if exists is None:
+                await conn.execute(text(f"""
+                    CREATE TRIGGER {TRIGGER_NAME}
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON shrc.robots
+                    FOR EACH STATEMENT EXECUTE FUNCTION shrc.notify_robots_changed()
+                """))
+    except Exception as e:
+        logger.warning(f"[ROBOT REGISTRY] NOTIFY trigger 생성 실패 → TTL 갱신만 사용: {e}")
+
+
+def _on_notify(conn, pid, channel, payload):
+    _schedule_refresh()
+
+
+async def _listen():
+    """
+    NOTIFY trigger 가 있을 때만 LISTEN 연결 (없으면 알림이 오지 않으므로 연결하지 않음)
+    """
+    global _listener
+    if _listener is not None and not _listener.is_closed():
+        return
+    if not await notify_trigger_exists():
+        return
+    try:
+        _listener = await asyncpg.connect(**ASYNCPG_CONNECT_ARGS)
+        await _listener.add_listener(CHANNEL, _on_notify)
+    except Exception as e:
+        _listener = None
+        logger.warning(f"[ROBOT REGISTRY] LISTEN 연결 실패: {e}")
+
+
+async def _ttl_loop():
+    while True:
+        await asyncio.sleep(settings.ROBOT_REGISTRY_TTL)
+        # LISTEN 연결이 끊겼으면 다시 연결 (끊긴 동안 놓친 변경은 이어지는 재조회로 반영)
+        await _listen()
+        _schedule_refresh()
+
+
+# ---------------------------------------------------------
+# lifecycle
+# ---------------------------------------------------------
+async def start():
+    global _ttl_task
+    await refresh()
+    if settings.ROBOT_REGISTRY_CREATE_TRIGGER:
+        await ensure_notify_trigger()
+    await _listen()
+    if _listener is None:
+        logger.info(f"[ROBOT REGISTRY] NOTIFY 없음 → {settings.ROBOT_REGISTRY_TTL:.0f}초 주기 재조회만 사용")
+    _ttl_task = asyncio.create_task(_ttl_loop())
+
+
+async def stop():
+    global _ttl_task, _listener
+    for task in (_ttl_task, _refreshing):
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    _ttl_task = None
+    if _listener is not None:
+        try:
+            await _listener.close()
+        except Exception:
+            pass
+        _listener = None
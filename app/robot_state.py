@@ -0,0 +1,94 @@
+# app/robot_state.py
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+import orjson
+
+from . import metrics
+from .redis_config import ar
+
+logger = logging.getLogger(__name__)
+
+STATE_UPDATES = metrics.counter("robot_state_updates_total", "최신 상태 캐시 갱신 수")
+STATE_ERRORS = metrics.counter("robot_state_errors_total", "최신 상태 캐시 갱신 실패 수")
+
+# ---------------------------------------------------------
+# 로봇별 최신 telemetry 상태 캐시
+# - Redis hash robot_state:{robot_id}
+#   field {msgId}   → {"table", "time", "values": {컬럼: 값}} (JSON)
+#   field {msgId}:t → time (epoch 초, 최신 여부 비교용)
+# - 동기화 커밋마다 해당 배치의 가장 최근 행으로 갱신 (더 새로운 경우에만)
+#   과거 구간 재동기화 / worker 간 경쟁에도 뒤로 가지 않도록 Lua 로 비교 후 기록
+# - 프로세스 안에서도 마지막 기록 시각을 기억해 오래된 배치는 Redis 호출 없이 건너뜀
+# ---------------------------------------------------------
+_UPDATE_IF_NEWER = ar.register_script("""
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1] .. ':t') or '-1')
+if tonumber(ARGV[2]) > current then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[3], ARGV[1] .. ':t', ARGV[2])
+    return 1
+end
+return 0
+""")
+
+# (robot_id, msg_id) → 이 프로세스가 마지막으로 기록한 time (epoch 초)
+_last_written: Dict[tuple, float] = {}
+
+
+def _state_key(robot_id: str) -> str:
+    return f"robot_state:{robot_id}"
+
+
+async def update_latest(robot_id: str, msg_id: int, table: str, columns: Sequence[str], record: Sequence[Any]):
+    """
+    (robot, msgId) 최신 상태 갱신 - record 는 COPY tuple (time, robot_num, 값...)
+    - 캐시 갱신 실패는 동기화를 실패시키지 않음 (경고만)
+    """
+    ts: datetime = record[0]
+    epoch = ts.timestamp()
+    if epoch <= _last_written.get((robot_id, msg_id), float("-inf")):
+        return
+
+    value = {
+        "table": table,
+        "time": ts.isoformat(),
+        "values": {c: v for c, v in zip(columns, record) if c not in ("time", "robot_id")},
+    }
+    try:
+        updated = await _UPDATE_IF_NEWER(
+            keys=[_state_key(robot_id)],
+            args=[str(msg_id), repr(epoch), orjson.dumps(value, default=str).decode()],
+        )
+        _last_written[(robot_id, msg_id)] = epoch
+        if updated:
+            STATE_UPDATES.inc()
+    except Exception as e:
+        STATE_ERRORS.inc()
+        logger.warning(f"[ROBOT STATE] robot_id={robot_id}, msgId={msg_id} 갱신 실패: {e}")
+
+
+def _decode(raw: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        field: orjson.loads(value)
+        for field, value in raw.items()
+        if not field.endswith(":t")
+    }
+
+
+async def get_robot_state(robot_id: str) -> Dict[str, Any]:
+    """
+    {msgId: {"table", "time", "values"}} (캐시만 조회, 없으면 {})
+    """
+    return _decode(await ar.hgetall(_state_key(robot_id)))
+
+
+async def get_fleet_state(robot_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    여러 로봇의 최신 상태를 pipeline 한 번으로 조회
+    """
+    async with ar.pipeline(transaction=False) as pipe:
+        for robot_id in robot_ids:
+            pipe.hgetall(_state_key(robot_id))
+        results = await pipe.execute()
+    return {robot_id: _decode(raw) for robot_id, raw in zip(robot_ids, results)}
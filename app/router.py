@@ -1,58 +1,155 @@
-from fastapi import APIRouter
-from .schemas import IngestRequest, IngestResponse
-from .services import (
-    parse_iso_utc, build_object_path,
-    fetch_image_bytes, to_jpeg_bytes, put_to_minio,
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from uuid import UUID
+from .schemas import (
+    IngestRequest, IngestResponse, DataPayload,
+    BatchIngestRequest, BatchIngestResponse, BatchIngestItem, IngestJobStatus,
+)
+from .services import producer_many, list_robot_images
+from .ingest_jobs import (
+    submit_job, get_status, ingest_once, claim, process_claimed, wait_for_result, mark_done, release,
+)
+from .telemetry_service import (
+    sync_telemetry_range, sync_recent_telemetry, get_last_update_history,
+    plan_sync_units, run_sync_units, UUID_TO_NUM,
 )
-from .telemetry_service import sync_telemetry_range,sync_recent_telemetry,get_last_update_history,run_full_update
 from datetime import datetime
 from .config import settings
-from .redis_config import r
+from .table_schema import get_unknown_fields
+from .robot_state import get_robot_state, get_fleet_state
+from .scheduler import sync_engine, run_update_exclusive, SyncUpdateBusy
+from .telemetry_query import resolve_table, parse_bucket, build_series_query, stream_series, query_limit
+from . import metrics
 import json
+import asyncio
+import logging
 from datetime import datetime, timedelta
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-def producer(queue_name: str, object_path: str, image_id: str):
-    r.lpush(queue_name, json.dumps({"object_path": object_path,
-                                     "imageId": image_id}))
-    print(f"Redis 큐에 작업 추가됨 → {queue_name}: {object_path}")
-
-@router.post("/drone/photos", response_model=IngestResponse)
-async def ingest_drone_photo(body: IngestRequest):
+@router.post("/drone/photos", response_model=IngestResponse, response_model_exclude_none=True)
+async def ingest_drone_photo(body: IngestRequest, mode: str = Query("sync", pattern="^(sync|async)$")):
+    """
+    사진 수집
+    - mode=sync (기본): 다운로드/변환/업로드/큐 추가까지 끝난 뒤 응답
+    - mode=async: 작업 레코드만 저장하고 바로 "accepted" 응답,
+      진행 상태는 GET /drone/photos/{imageId} 로 조회
+    - 같은 imageId 재요청(재시도)은 다시 처리하지 않고 원래 요청의 결과/상태를 반환
+    """
     try:
         p = body.data
 
-        # 1) 시간 변환
-        ts = parse_iso_utc(p.capturedAt)
-
-        # 2) 이미지 가져오고 JPEG로 변환
-        raw = await fetch_image_bytes(str(p.photo_Url))
-        jpg = to_jpeg_bytes(raw)
-
-        # 3) 파일명/경로 생성
-        object_path, filename = build_object_path(p.robot_id, ts)
-
-        # 4) 메타데이터 구성
-        meta = {
-            "robot_id": p.robot_id,
-            "capturedAt": p.capturedAt,
-            "latitude": str(p.position.latitude),
-            "longitude": str(p.position.longitude),
-            "altitude": "" if p.position.altitude is None else str(p.position.altitude),
-        }
+        if mode == "async":
+            record = await submit_job(p)
+            return IngestResponse(message="accepted", imageId=p.imageId, status=record["status"])
 
-        # 5) MinIO 업로드
-        put_to_minio(jpg, object_path, meta)
-
-        producer("infer_job_queue", object_path, str(p.imageId))
+        await ingest_once(p)
 
         return IngestResponse(message="success")
     except ValueError:
         return IngestResponse(message="parameter type error")
     except Exception as e:
-        print(f"❌ 서버 내부 오류 발생: {e}")
+        logger.error(f"[INGEST] imageId={body.data.imageId} 서버 내부 오류: {e}", exc_info=True)
         return IngestResponse(message="server internal error")
-    
+
+@router.get("/drone/photos/{image_id}", response_model=IngestJobStatus, response_model_exclude_none=True)
+async def get_ingest_job(image_id: UUID):
+    """
+    수집 상태 조회
+    - mode=async 로 접수한 imageId: 작업 레코드의 단계별 상태
+    - sync/batch 로 처리한 imageId: 작업 레코드가 없으므로 processing / done (object_path) 만 반환
+    - 처음 보는 imageId, 실패한 sync/batch 요청, TTL 이 지난 imageId 는 404
+    """
+    record = await get_status(str(image_id))
+    if record is None:
+        raise HTTPException(404, "ingest job not found")
+    return record
+
+@router.get("/drone/robots/{robot_id}/photos")
+async def list_drone_photos(robot_id: str, from_ts: str, to_ts: str):
+    """
+    로봇의 사진 목록 조회
+    - from_ts, to_ts: 'YYYYMMDDhhmmss' 형식 (UTC), [from_ts, to_ts) 구간 (최대 PHOTO_LIST_MAX_HOURS 시간)
+    """
+    fmt = "%Y%m%d%H%M%S"
+    try:
+        start_dt = datetime.strptime(from_ts, fmt)
+        end_dt = datetime.strptime(to_ts, fmt)
+    except ValueError:
+        raise HTTPException(400, "from_ts/to_ts must be YYYYMMDDhhmmss")
+
+    try:
+        images = await list_robot_images(robot_id, start_dt, end_dt)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"robot_id": robot_id, "from": from_ts, "to": to_ts, "count": len(images), "images": images}
+
+@router.post("/drone/photos/batch", response_model=BatchIngestResponse)
+async def ingest_drone_photo_batch(body: BatchIngestRequest):
+    """
+    사진 여러 장 일괄 수집
+    - BATCH_INGEST_CONCURRENCY 장씩 동시에 처리
+    - 성공한 항목의 Redis 작업은 한 번의 LPUSH 로 추가
+    - 이미 처리됐거나 처리 중인 imageId (배치 내 중복 포함) 는 다시 처리하지 않고 원래 결과 사용
+    - 동기 수집과 같이 작업 레코드 없이 처리 (완료 기록은 한 번의 pipeline)
+    - 항목별 처리 결과 반환 (순서 유지)
+    """
+    sem = asyncio.Semaphore(settings.BATCH_INGEST_CONCURRENCY)
+
+    # 반환: (메시지, object_path, 추론 큐 추가 여부)
+    async def run_one(p: DataPayload):
+        image_id = str(p.imageId)
+        if not await claim(image_id):
+            ok = await wait_for_result(image_id) is not None
+            return ("success" if ok else "server internal error"), None, False
+
+        async with sem:
+            try:
+                object_path, duplicate = await process_claimed(p)
+                return "success", object_path, not duplicate
+            except ValueError:
+                await release(image_id)
+                return "parameter type error", None, False
+            except Exception as e:
+                await release(image_id)
+                logger.error(f"[INGEST BATCH] imageId={p.imageId} 서버 내부 오류: {e}", exc_info=True)
+                return "server internal error", None, False
+
+    # 배치 안에서 같은 imageId 는 한 번만 처리
+    unique = list({str(p.imageId): p for p in reversed(body.data)}.values())[::-1]
+    outcome_by_id = dict(zip(
+        (str(p.imageId) for p in unique),
+        await asyncio.gather(*(run_one(p) for p in unique)),
+    ))
+
+    jobs = [
+        (object_path, image_id)
+        for image_id, (message, object_path, enqueue) in outcome_by_id.items()
+        if enqueue
+    ]
+    try:
+        await producer_many("infer_job_queue", jobs)
+    except Exception as e:
+        logger.error(f"[INGEST BATCH] Redis 일괄 추가 실패 ({len(jobs)}건): {e}")
+        await asyncio.gather(*(release(image_id) for _, image_id in jobs))
+        for _, image_id in jobs:
+            outcome_by_id[image_id] = ("server internal error", None, False)
+
+    await mark_done([
+        (image_id, object_path)
+        for image_id, (message, object_path, _) in outcome_by_id.items()
+        if object_path is not None and message == "success"
+    ])
+
+    results = [
+        BatchIngestItem(imageId=p.imageId, message=outcome_by_id[str(p.imageId)][0])
+        for p in body.data
+    ]
+    return BatchIngestResponse(
+        message="success" if all(r.message == "success" for r in results) else "partial",
+        results=results,
+    )
+
 
 
 @router.post("/telemetry/sync")
@@ -61,42 +158,29 @@ async def telemetry_sync(robot_id: str, from_ts: str, to_ts: str):
     수동 Telemetry 동기화 API
     - robot_id: 로봇 ID (UUID)
     - from_ts, to_ts: 'YYYYMMDDhhmmss' 형식
-    - 1시간 단위로 자르기
+    - 로봇의 최근 데이터 양에 맞춰 구간을 자르고 구간별 병렬 실행
     """
 
     fmt = "%Y%m%d%H%M%S"
     start_dt = datetime.strptime(from_ts, fmt)
     end_dt = datetime.strptime(to_ts, fmt)
 
-    total_rows = 0
-    cur_start = start_dt
-
-    while cur_start < end_dt:
-        # 1시간 뒤
-        cur_end = cur_start + timedelta(hours=1)
-        if cur_end > end_dt:
-            cur_end = end_dt
-
-        # 문자열로 변환
-        cur_from = cur_start.strftime(fmt)
-        cur_to   = cur_end.strftime(fmt)
+    # 구간들을 worker pool 로 병렬 처리
+    units = await plan_sync_units({robot_id: start_dt}, end_dt)
+    results = await run_sync_units(units)
 
-        print(f"Sync window: {cur_from} → {cur_to}")
-
-        try:
-            rows = await sync_recent_telemetry(robot_id, cur_from, cur_to)
-            total_rows += rows
-        except Exception as e:
-            print(f"❌ Error in window {cur_from} → {cur_to}: {e}")
-
-        # 다음 구간으로 이동
-        cur_start = cur_end
+    total_rows = sum(r["rows"] for r in results)
+    failed_windows = [
+        {"from": r["from_ts"], "to": r["to_ts"], "error": r["error"]}
+        for r in results if r["error"]
+    ]
 
     return {
         "robot_id": robot_id,
         "from": from_ts,
         "to": to_ts,
         "rows_upserted": total_rows,
+        "failed_windows": failed_windows,
     }
 
 @router.get("/telemetry/update/last")
@@ -116,6 +200,85 @@ async def get_last_update():
         "rows_upserted": last["rows_upserted"]
     }
 
+@router.get("/telemetry/{table}/series")
+async def get_telemetry_series(
+    table: str,
+    robot_id: str,
+    from_ts: str,
+    to_ts: str,
+    columns: str | None = None,
+    bucket: str | None = None,
+    agg: str = "avg",
+    limit: int | None = None,
+    cursor: str | None = None,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+):
+    """
+    Telemetry 시계열 조회
+    - table: msgId(예: 24) 또는 테이블명(예: gps_raw_int_24)
+    - from_ts, to_ts: 'YYYYMMDDhhmmss' 형식 (UTC), [from_ts, to_ts) 구간
+    - columns: 쉼표 구분 컬럼 목록 (생략 시 전체)
+    - bucket: 30s / 1m / 1h / 1d 등 → time_bucket 집계 (agg: avg / min / max / last), 생략 시 원본 행
+    - limit / cursor: 페이지 크기 / 이전 응답의 next_cursor
+    - format: json (columns + rows 배열) 또는 ndjson (행마다 한 줄)
+    """
+    fmt_ts = "%Y%m%d%H%M%S"
+    try:
+        start_dt = datetime.strptime(from_ts, fmt_ts)
+        end_dt = datetime.strptime(to_ts, fmt_ts)
+    except ValueError:
+        raise HTTPException(400, "from_ts/to_ts must be YYYYMMDDhhmmss")
+
+    table_name = resolve_table(table)
+    page_size = query_limit(limit)
+    sql, params, out_columns = await build_series_query(
+        table_name, robot_id, start_dt, end_dt,
+        [c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+        parse_bucket(bucket), agg, page_size, cursor,
+    )
+
+    header = {"robot_id": robot_id, "table": table_name, "bucket": bucket, "agg": agg if bucket else None}
+    return StreamingResponse(
+        stream_series(sql, params, out_columns, header, fmt),
+        media_type="application/json" if fmt == "json" else "application/x-ndjson",
+    )
+
+@router.get("/robots/state")
+async def get_robots_state():
+    """
+    전체 로봇 최신 상태 (캐시만 조회, hypertable 조회 없음)
+    """
+    return {"robots": await get_fleet_state(list(UUID_TO_NUM))}
+
+@router.get("/robots/{robot_id}/state")
+async def get_robot_latest_state(robot_id: str):
+    """
+    로봇 최신 상태 - msgId 별 마지막 수신 행 (캐시만 조회)
+    """
+    state = await get_robot_state(robot_id)
+    if not state:
+        raise HTTPException(404, "no state cached for robot")
+    return {"robot_id": robot_id, "state": state}
+
+@router.get("/metrics")
+async def get_metrics(format: str = Query("prometheus", pattern="^(prometheus|json)$")):
+    """
+    전체 uvicorn worker 합산 metrics (/metrics 로도 등록 - main.py)
+    - prometheus: text exposition format (scrape 용)
+    - json: 합산한 record 목록
+    """
+    records = await asyncio.to_thread(metrics.collect, settings.METRICS_DIR)
+    if format == "json":
+        return records
+    return PlainTextResponse(metrics.render_prometheus(records), media_type="text/plain; version=0.0.4")
+
+@router.get("/telemetry/schema/unknown-fields")
+async def get_schema_drift():
+    """
+    테이블에 없어 저장하지 않은 payload 필드 집계 (schema drift 확인용)
+    """
+    return {"unknown_fields": get_unknown_fields()}
+
 @router.post("/telemetry/update")
 async def run_update():
     """
@@ -124,6 +287,17 @@ async def run_update():
     - 최근 업데이트 이력 불러옴
     - sync_recent_telemetry 반복 실행
     - 업데이트 이력 저장
+    - 주기 동기화 엔진 등 다른 worker 가 실행 중이면 409
+    """
+    try:
+        result = await run_update_exclusive()
+    except SyncUpdateBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return result
+
+@router.get("/telemetry/sync/engine")
+async def get_sync_engine_status():
+    """
+    주기 동기화 엔진 상태 (leader 가 기록한 최근 실행 결과 + 이 worker 의 leader 여부)
     """
-    result = await run_full_update()
-    return result
\ No newline at end of file
+    return await sync_engine.status()
\ No newline at end of file
@@ -0,0 +1,124 @@
+# app/row_encoder.py
+
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from dateutil import parser
+
+# ---------------------------------------------------------
+# 고정 포맷 timestamp 파싱
+# ---------------------------------------------------------
+def parse_ts_fast(s: str) -> datetime:
+    """
+    "2025-08-05T05:42:33.390Z" 형식을 datetime.fromisoformat (C 구현) 으로 파싱
+    - python 3.10 의 fromisoformat 은 "Z" 를 모르므로 떼고 UTC 지정
+    - 형식이 다르면 dateutil isoparse 로 fallback
+    """
+    try:
+        if s[-1] == "Z":
+            return datetime.fromisoformat(s[:-1]).replace(tzinfo=timezone.utc)
+        return datetime.fromisoformat(s)
+    except (ValueError, IndexError):
+        return parser.isoparse(s)
+
+
+def flatten_key(key: str) -> str:
+    """
+    "voltages[0]" → "voltages_0" (flatten_payload 와 동일 규칙)
+    """
+    if "[" in key and "]" in key:
+        base = key.split("[")[0]
+        idx = key.split("[")[1].replace("]", "")
+        return f"{base}_{idx}"
+    return key
+
+
+# ---------------------------------------------------------
+# (table, key-set) 별 COPY tuple 인코더
+# ---------------------------------------------------------
+class RowEncoder:
+    """
+    payload 키 순서가 같은 행들을 COPY tuple 로 변환
+    - 컬럼 순서/flatten 결과는 생성 시 한 번만 계산
+    - table_columns 가 주어지면 테이블 컬럼 순서에 맞춰 정렬하고,
+      테이블에 없는 필드는 unknown 으로 분리 (COPY 대상에서 제외)
+    - 행마다 하는 일: time 파싱 + itemgetter 로 값 추출
+    """
+
+    __slots__ = ("table", "columns", "unknown", "_values")
+
+    def __init__(self, table: str, keys: Tuple[str, ...], table_columns: Tuple[str, ...] = ()):
+        by_column = {flatten_key(k).lower(): k for k in keys if k != "time"}
+
+        if table_columns:
+            known = set(table_columns)
+            self.unknown = tuple(k for c, k in by_column.items() if c not in known)
+            value_columns = [c for c in table_columns if c in by_column and c not in ("time", "robot_id")]
+        else:
+            self.unknown = ()
+            value_columns = list(by_column)
+
+        value_keys = [by_column[c] for c in value_columns]
+
+        self.table = table
+        self.columns = ["time", "robot_id"] + value_columns
+
+        if len(value_keys) == 1:
+            only = value_keys[0]
+            self._values = lambda p: (p[only],)
+        elif value_keys:
+            self._values = itemgetter(*value_keys)
+        else:
+            self._values = lambda p: ()
+
+    def encode(self, payloads: Iterable[Dict[str, Any]], robot_num: int) -> List[tuple]:
+        values = self._values
+        parse = parse_ts_fast
+        return [(parse(p["time"]), robot_num, *values(p)) for p in payloads]
+
+
+_ENCODERS: Dict[tuple, RowEncoder] = {}
+
+
+def get_encoder(table: str, keys: Tuple[str, ...], table_columns: Tuple[str, ...] = ()) -> RowEncoder:
+    cache_key = (table, keys, table_columns)
+    enc = _ENCODERS.get(cache_key)
+    if enc is None:
+        enc = RowEncoder(table, keys, table_columns)
+        _ENCODERS[cache_key] = enc
+    return enc
+
+
+def encode_rows(
+    table: str,
+    payloads: List[Dict[str, Any]],
+    robot_num: int,
+    table_columns: Iterable[str] = (),
+) -> List[Tuple[List[str], List[tuple], Tuple[str, ...]]]:
+    """
+    payload 목록을 키 구성이 같은 연속 구간별 (columns, records, unknown) 으로 인코딩
+    - 대부분의 응답은 키 구성이 하나라 결과도 한 그룹
+    - table_columns: 테이블 컬럼 순서 (information_schema 기준), 비어 있으면 payload 키 순서 사용
+    """
+    table_columns = tuple(table_columns)
+    groups = []
+    run_keys = None
+    run_start = 0
+
+    def flush(end):
+        enc = get_encoder(table, run_keys, table_columns)
+        groups.append((enc.columns, enc.encode(payloads[run_start:end], robot_num), enc.unknown))
+
+    for i, p in enumerate(payloads):
+        keys = tuple(p)
+        if keys != run_keys:
+            if run_keys is not None:
+                flush(i)
+            run_keys = keys
+            run_start = i
+
+    if run_keys is not None:
+        flush(len(payloads))
+
+    return groups
@@ -1,40 +1,232 @@
 # app/scheduler.py
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import datetime, timedelta
-from .telemetry_service import sync_recent_telemetry
+import asyncio
+import logging
+import os
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
 
-ROBOT_IDS = [
-    "01fb056f-a3fb-4c38-9f97-ff11b9dea241",
-    "163c4473-d37b-4bec-a293-208a69bd2b0d",
-    "f6024fc0-e542-4858-9ff4-f7365ef914de",
-    "37e05a23-0c44-4384-b48b-031ce0e33e38",
-    "dce87884-1065-41f9-b50c-8f6656a8313e",
-]
+import orjson
+from sqlalchemy import text
 
+from . import metrics
+from .config import settings
+from .database import engine
+from .redis_config import ar
+from .telemetry_service import run_full_update
 
-def _fmt(dt: datetime) -> str:
-    return dt.strftime("%Y%m%d%H%M%S")
+logger = logging.getLogger(__name__)
 
+SYNC_RUNS = metrics.counter("sync_engine_runs_total", "주기 동기화 실행 수")
+SYNC_RUN_ERRORS = metrics.counter("sync_engine_run_errors_total", "주기 동기화 실행 실패 수")
+SYNC_RUN_SECONDS = metrics.histogram("sync_engine_run_seconds", "주기 동기화 1회 소요 시간(초)")
+SYNC_LEADER = metrics.gauge("sync_engine_leader", "이 worker 가 동기화 leader 인지 (1=leader)")
 
-async def _job():
-    now = datetime.utcnow()
-    from_dt = now - timedelta(hours=3)
+# ---------------------------------------------------------
+# 주기 telemetry 동기화 엔진 (APScheduler 대체)
+# - uvicorn worker 여러 개 중 Postgres advisory lock 을 잡은 하나만 leader 로 실행
+#   (lock 을 잡은 connection 을 계속 유지 → 프로세스가 죽으면 연결 종료와 함께 자동 해제)
+# - leader 는 SYNC_ENGINE_INTERVAL 초마다 run_full_update 실행
+#   (로봇 목록: get_robot_ids, 구간: 로봇별 watermark ~ 현재)
+# - 수동 POST /telemetry/update 와 겹치지 않도록 실행 자체도 별도 advisory lock 으로 보호
+# - 실행 상태는 Redis sync_engine:state 에 기록 → 어느 worker 에서든 조회 가능
+# ---------------------------------------------------------
+LEADER_LOCK_KEY = 0x5348524301   # 'SHRC' 01
+RUN_LOCK_KEY = 0x5348524302      # 'SHRC' 02
+STATE_KEY = "sync_engine:state"
 
-    from_ts = _fmt(from_dt)
-    to_ts = _fmt(now)
 
-    print(f"🔁 Telemetry scheduler run: {from_ts} → {to_ts}")
+class SyncUpdateBusy(Exception):
+    """
+    다른 worker 가 전체 업데이트를 실행 중
+    """
 
-    for rid in ROBOT_IDS:
+
+@asynccontextmanager
+async def _advisory_lock(key: int):
+    """
+    실행 동안만 잡는 advisory lock (못 잡으면 SyncUpdateBusy)
+    """
+    async with engine.connect() as conn:
+        locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})).scalar()
+        await conn.commit()
+        if not locked:
+            raise SyncUpdateBusy("telemetry update already running")
         try:
-            rows = await sync_recent_telemetry(rid, from_ts, to_ts)
-            print(f"✅ {rid}: {rows} rows upserted")
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+            await conn.commit()
+
+
+async def run_update_exclusive() -> Dict[str, Any]:
+    """
+    run_full_update 를 전체 worker 중 하나만 실행되도록 실행 (실행 중이면 SyncUpdateBusy)
+    """
+    async with _advisory_lock(RUN_LOCK_KEY):
+        return await run_full_update()
+
+
+class SyncEngine:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self._lease_conn = None
+        self._task: asyncio.Task | None = None
+        self._state: Dict[str, Any] = {
+            "leader": None,
+            "running": False,
+            "runs": 0,
+            "consecutive_failures": 0,
+            "last_started_at": None,
+            "last_finished_at": None,
+            "last_duration": None,
+            "last_rows": None,
+            "last_units": None,
+            "last_failed_units": None,
+            "last_error": None,
+            "next_run_at": None,
+        }
+
+    # ---------------------------------------------------------
+    # lifecycle
+    # ---------------------------------------------------------
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"[SYNC ENGINE] started (worker={self.worker}, interval={self.interval}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._release_lease()
+
+    # ---------------------------------------------------------
+    # leader lease
+    # ---------------------------------------------------------
+    async def _ensure_leader(self) -> bool:
+        """
+        lease 확인 (없으면 획득 시도) - lease connection 이 끊기면 leader 상실
+        """
+        if self._lease_conn is not None:
+            try:
+                await self._lease_conn.execute(text("SELECT 1"))
+                await self._lease_conn.commit()
+                return True
+            except Exception as e:
+                logger.warning(f"[SYNC ENGINE] lease connection 끊김 → leader 상실: {e}")
+                await self._release_lease()
+
+        conn = await engine.connect()
+        try:
+            locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LEADER_LOCK_KEY})).scalar()
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+        if not locked:
+            await conn.close()
+            return False
+
+        self._lease_conn = conn
+        self.is_leader = True
+        SYNC_LEADER.set(1)
+        logger.info(f"[SYNC ENGINE] leader 획득 (worker={self.worker})")
+        return True
+
+    async def _release_lease(self):
+        conn, self._lease_conn = self._lease_conn, None
+        self.is_leader = False
+        SYNC_LEADER.set(0)
+        if conn is not None:
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LEADER_LOCK_KEY})
+                await conn.commit()
+            except Exception:
+                # 연결이 이미 끊긴 경우 → pool 로 돌려보내지 않고 폐기 (session lock 은 서버에서 해제됨)
+                await conn.invalidate()
+            finally:
+                await conn.close()
+
+    # ---------------------------------------------------------
+    # 실행 루프
+    # ---------------------------------------------------------
+    async def _loop(self):
+        while True:
+            started = time.monotonic()
+            try:
+                if await self._ensure_leader():
+                    await self._run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[SYNC ENGINE] {e}", exc_info=True)
+
+            delay = max(1.0, self.interval - (time.monotonic() - started))
+            if self.is_leader:
+                self._state["next_run_at"] = time.time() + delay
+                await self._publish()
+            await asyncio.sleep(delay)
+
+    async def _run_once(self):
+        state = self._state
+        state.update(leader=self.worker, running=True, last_started_at=time.time(), last_error=None)
+        await self._publish()
+
+        started = time.monotonic()
+        try:
+            result = await run_update_exclusive()
+            state.update(
+                last_rows=result["rows_upserted"],
+                last_units=len(result["units"]),
+                last_failed_units=result["failed_units"],
+            )
+            state["consecutive_failures"] = state["consecutive_failures"] + 1 if result["failed_units"] else 0
+            SYNC_RUNS.inc()
+        except SyncUpdateBusy:
+            logger.info("[SYNC ENGINE] 수동 업데이트 실행 중 → 이번 주기 건너뜀")
         except Exception as e:
-            print(f"❌ {rid} sync error: {e}")
+            SYNC_RUN_ERRORS.inc()
+            state["consecutive_failures"] += 1
+            state["last_error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            SYNC_RUN_SECONDS.observe(time.monotonic() - started)
+            state.update(
+                running=False,
+                runs=state["runs"] + 1,
+                last_finished_at=time.time(),
+                last_duration=round(time.monotonic() - started, 3),
+            )
+            await self._publish()
+
+    # ---------------------------------------------------------
+    # 상태
+    # ---------------------------------------------------------
+    async def _publish(self):
+        try:
+            await ar.set(STATE_KEY, orjson.dumps(self._state), ex=int(self.interval * 3) + 60)
+        except Exception as e:
+            logger.warning(f"[SYNC ENGINE] 상태 기록 실패: {e}")
+
+    async def status(self) -> Dict[str, Any]:
+        """
+        leader 가 기록한 최근 실행 상태 + 이 worker 의 역할
+        """
+        raw = await ar.get(STATE_KEY)
+        shared = orjson.loads(raw) if raw else None
+        return {
+            "enabled": settings.SYNC_ENGINE_ENABLED,
+            "interval": self.interval,
+            "worker": self.worker,
+            "is_leader": self.is_leader,
+            "state": shared,
+        }
 
 
-def start_scheduler():
-    scheduler = AsyncIOScheduler()
-    scheduler.add_job(_job, "interval", hours=3)
-    scheduler.start()
+sync_engine = SyncEngine(settings.SYNC_ENGINE_INTERVAL)
@@ -29,8 +29,29 @@ class DataPayload(BaseModel):
 class IngestRequest(BaseModel):
     data: DataPayload
 
+class BatchIngestRequest(BaseModel):
+    data: list[DataPayload] = Field(..., min_length=1, max_length=1000)
+
 # ---------------------------
 # ✅ 응답 스키마
 # ---------------------------
 class IngestResponse(BaseModel):
-    message: str = Field(..., description="응답 메시지 (success / parameter type error / server internal error)")
+    message: str = Field(..., description="응답 메시지 (success / accepted / parameter type error / server internal error)")
+    imageId: UUID | None = Field(None, description="비동기 모드(mode=async)에서 상태 조회용 imageId")
+    status: str | None = Field(None, description="비동기 모드 작업 상태")
+
+class IngestJobStatus(BaseModel):
+    imageId: UUID
+    status: str = Field(..., description="accepted / fetching / transcoding / uploading / enqueuing / done / failed (sync/batch: processing / done)")
+    object_path: str | None = None
+    error: str | None = None
+    created_at: float | None = Field(None, description="접수 시각 (mode=async 만)")
+    updated_at: float | None = None
+
+class BatchIngestItem(BaseModel):
+    imageId: UUID
+    message: str = Field(..., description="항목별 처리 결과 (success / parameter type error / server internal error)")
+
+class BatchIngestResponse(BaseModel):
+    message: str = Field(..., description="전체 결과 (success / partial)")
+    results: list[BatchIngestItem]
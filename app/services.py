@@ -1,30 +1,70 @@
 import io
+import asyncio
 import hashlib
-from datetime import datetime, timezone
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
 import httpx
+import urllib3
 from fastapi import HTTPException
-from PIL import Image
 from minio import Minio
 from minio.error import S3Error
+from PIL import Image, UnidentifiedImageError
 from .config import settings
+from . import metrics, http_clients
+from .transcode import is_passthrough_jpeg, transcode_with_renditions
+from .photo_buffer import PhotoBuffer
+from .job_producer import job_producer
+from .schemas import DataPayload
+
+logger = logging.getLogger(__name__)
 
 # --- MinIO 클라이언트 생성 ---
 _minio: Minio | None = None
+_minio_lock = threading.Lock()
+
+# MinIO 호출은 동기 API → 전용 thread pool 에서 실행해 event loop 를 막지 않음
+_minio_executor = ThreadPoolExecutor(
+    max_workers=settings.MINIO_UPLOAD_WORKERS,
+    thread_name_prefix="minio-upload",
+)
+
+# 사진 목록 조회 (list_objects) 전용 - 긴 구간 조회가 업로드 thread 를 차지하지 않도록 분리
+_minio_list_executor = ThreadPoolExecutor(
+    max_workers=settings.MINIO_LIST_WORKERS,
+    thread_name_prefix="minio-list",
+)
+
+UPLOAD_BYTES = metrics.counter("minio_upload_bytes_total", "MinIO 업로드 바이트 수")
+UPLOAD_INFLIGHT = metrics.gauge("minio_upload_inflight", "진행 중인 MinIO 업로드 수")
 
 def minio_client() -> Minio:
     global _minio
     if _minio is None:
-        _minio = Minio(
-            settings.MINIO_ENDPOINT,
-            access_key=settings.MINIO_ACCESS_KEY,
-            secret_key=settings.MINIO_SECRET_KEY,
-            secure=settings.MINIO_SECURE,
-        )
-        _ensure_bucket(settings.MINIO_BUCKET)
+        with _minio_lock:
+            if _minio is None:
+                # 업로드 worker 수만큼 keep-alive 연결을 유지하도록 pool 크기 지정
+                http_client = urllib3.PoolManager(
+                    maxsize=settings.MINIO_POOL_SIZE,
+                    block=True,
+                    timeout=urllib3.Timeout(connect=10, read=60),
+                    retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+                )
+                client = Minio(
+                    settings.MINIO_ENDPOINT,
+                    access_key=settings.MINIO_ACCESS_KEY,
+                    secret_key=settings.MINIO_SECRET_KEY,
+                    secure=settings.MINIO_SECURE,
+                    http_client=http_client,
+                )
+                _ensure_bucket(client, settings.MINIO_BUCKET)
+                _minio = client
     return _minio
 
-def _ensure_bucket(bucket: str):
-    c = minio_client()
+def _ensure_bucket(c: Minio, bucket: str):
     if not c.bucket_exists(bucket):
         c.make_bucket(bucket)
 
@@ -38,45 +78,373 @@ def yyyymmdd(dt: datetime) -> str:
 def hhmmss(dt: datetime) -> str:
     return dt.strftime("%H%M%S")
 
+def hhmmssmmm(dt: datetime) -> str:
+    return f"{dt:%H%M%S}{dt.microsecond // 1000:03d}"
+
 # --- 파일명/경로 ---
-def build_object_path(robot_id: str, dt: datetime) -> tuple[str, str]:
-    date_str = yyyymmdd(dt)
-    time_str = hhmmss(dt)
-    filename = f"{date_str}_{time_str}.jpg"
-    object_path = f"DRONE/{robot_id}/{date_str}/Image/{filename}"
+# DRONE/{robot_id}/{YYYYMMDD}/Image/{HH}/{YYYYMMDD}_{HHMMSSmmm}_{imageId}.jpg
+# - 밀리초 + imageId 포함 → 같은 초에 찍힌 사진끼리 덮어쓰지 않음
+# - 시(hour) 단위 prefix → 시간 범위 조회 시 해당 시간대 prefix 만 listing
+# - 파일명이 시간순으로 정렬됨
+def _image_prefix(robot_id: str, dt: datetime) -> str:
+    return f"DRONE/{robot_id}/{yyyymmdd(dt)}/Image/{dt:%H}/"
+
+def build_object_path(robot_id: str, dt: datetime, image_id: str) -> tuple[str, str]:
+    filename = f"{yyyymmdd(dt)}_{hhmmssmmm(dt)}_{image_id}.jpg"
+    object_path = _image_prefix(robot_id, dt) + filename
     return object_path, filename
 
+def _legacy_prefix(robot_id: str, dt: datetime) -> str:
+    # 이전 구조: DRONE/{robot_id}/{YYYYMMDD}/Image/{YYYYMMDD}_{HHMMSS}.jpg (시 prefix / imageId 없음)
+    return f"DRONE/{robot_id}/{yyyymmdd(dt)}/Image/"
+
+def parse_object_name(object_path: str) -> tuple[datetime, str | None] | None:
+    """
+    원본 object 경로 → (촬영 시각(UTC), imageId), 형식이 다르거나 rendition 이면 None
+    - 이전 구조의 {YYYYMMDD}_{HHMMSS}.jpg 는 imageId 없이 (촬영 시각, None)
+    """
+    stem = object_path.rsplit("/", 1)[-1].removesuffix(".jpg")
+    parts = stem.split("_", 2)
+    if len(parts) == 2 and len(parts[1]) == 6:
+        try:
+            return datetime.strptime(stem, "%Y%m%d_%H%M%S").replace(tzinfo=timezone.utc), None
+        except ValueError:
+            return None
+    if len(parts) != 3 or len(parts[1]) != 9 or "." in parts[2]:
+        return None
+    try:
+        ts = datetime.strptime(f"{parts[0]}{parts[1]}000", "%Y%m%d%H%M%S%f").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return ts, parts[2]
+
+# 축소본(rendition): 원본 옆에 {원본 이름}.{rendition}.jpg 로 저장
+def _parse_renditions(spec: str) -> list[tuple[str, int]]:
+    renditions = []
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, edge = item.split(":")
+        renditions.append((name.strip(), int(edge)))
+    return renditions
+
+RENDITIONS = _parse_renditions(settings.PHOTO_RENDITIONS)
+
+def rendition_path(object_path: str, name: str) -> str:
+    return f"{object_path.removesuffix('.jpg')}.{name}.jpg"
+
+def rendition_paths(object_path: str) -> dict[str, str]:
+    return {name: rendition_path(object_path, name) for name, _ in RENDITIONS}
+
 # --- 이미지 다운로드 ---
-async def fetch_image_bytes(url: str) -> bytes:
-    timeout = httpx.Timeout(20, connect=10)
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-        r = await client.get(url)
-        if r.status_code != 200:
-            raise HTTPException(400, f"Failed to fetch image: {r.status_code}")
-        return r.content
+# 사진 요청마다 새 연결을 만들지 않도록 앱 전역 client 공유 (keep-alive / HTTP/2)
+http_clients.register(
+    "photo",
+    timeout=httpx.Timeout(20, connect=10),
+    follow_redirects=True,
+    http2=settings.HTTP2_ENABLED,
+    limits=httpx.Limits(
+        max_connections=settings.PHOTO_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.PHOTO_MAX_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    ),
+)
+
+# 사진 처리 단계별 소요 시간 (stage_seconds{stage=...})
+FETCH_STAGE = metrics.stage("fetch_image_bytes")
+TRANSCODE_STAGE = metrics.stage("to_jpeg_bytes")
+UPLOAD_STAGE = metrics.stage("put_to_minio")
+PRODUCER_STAGE = metrics.stage("producer")
+
+async def fetch_image_bytes(url: str, hash_content: bool = False) -> PhotoBuffer:
+    """
+    사진 스트리밍 다운로드
+    - PHOTO_MAX_BYTES 를 넘으면 즉시 중단 (Content-Length 가 있으면 받기 전에 거절)
+    - PHOTO_SPOOL_THRESHOLD 를 넘으면 임시 파일로 spool → 요청당 메모리 상한 고정
+    - hash_content=True 면 받는 동안 sha256 계산 (buf.sha256)
+    - 호출 측에서 사용 후 close() 필요
+    """
+    client = http_clients.get_client("photo")
+    max_bytes = settings.PHOTO_MAX_BYTES
+    buf = PhotoBuffer(settings.PHOTO_SPOOL_THRESHOLD, settings.PHOTO_SPOOL_DIR, hash_content=hash_content)
 
-# --- 이미지 JPEG 변환 ---
-def to_jpeg_bytes(raw: bytes) -> bytes:
     try:
-        img = Image.open(io.BytesIO(raw))
-        rgb = img.convert("RGB")
-        out = io.BytesIO()
-        rgb.save(out, format="JPEG", quality=90, optimize=True)
-        return out.getvalue()
-    except Exception as e:
-        raise HTTPException(400, f"Invalid image data: {e}")
+        with FETCH_STAGE.time():
+            async with http_clients.host_semaphore(url, settings.PHOTO_HOST_MAX_CONNECTIONS):
+                async with client.stream("GET", url) as r:
+                    if r.status_code != 200:
+                        raise HTTPException(400, f"Failed to fetch image: {r.status_code}")
+
+                    length = r.headers.get("content-length")
+                    if length and length.isdigit() and int(length) > max_bytes:
+                        raise HTTPException(400, f"Image too large: {length} bytes > {max_bytes}")
+
+                    async for chunk in r.aiter_bytes():
+                        buf.write(chunk)
+                        if buf.size > max_bytes:
+                            raise HTTPException(400, f"Image too large: > {max_bytes} bytes")
+            FETCH_STAGE.add(buf.size)
+        return buf.finish()
+    except BaseException:
+        buf.close()
+        raise
+
+# --- 이미지 JPEG 변환 ---
+# Pillow decode/encode 는 CPU 작업 → 별도 프로세스 pool 에서 실행
+_transcode_pool: ProcessPoolExecutor | None = None
+# pool 에 넘길 수 있는 최대 작업 수 (넘으면 대기 → 메모리/CPU backpressure)
+_transcode_slots = asyncio.Semaphore(settings.TRANSCODE_MAX_PENDING)
+
+TRANSCODE_QUEUE_DEPTH = metrics.gauge("transcode_queue_depth", "변환 대기 + 실행 중인 이미지 수")
+TRANSCODE_PASSTHROUGH = metrics.counter("transcode_passthrough_total", "재인코딩 없이 통과한 JPEG 수")
+
+def transcode_pool() -> ProcessPoolExecutor:
+    global _transcode_pool
+    if _transcode_pool is None:
+        # fork 는 부모의 thread(MinIO pool 등) 상태를 복제하므로 spawn 사용
+        _transcode_pool = ProcessPoolExecutor(
+            max_workers=settings.TRANSCODE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _transcode_pool
+
+def _reset_broken_pool(pool: ProcessPoolExecutor):
+    global _transcode_pool
+    # 같은 pool 에서 실패한 다른 요청이 이미 새 pool 을 만들었으면 그대로 둠
+    if _transcode_pool is pool:
+        logger.error("[TRANSCODE] process pool broken → 다음 요청에서 다시 생성")
+        _transcode_pool.shutdown(wait=False, cancel_futures=True)
+        _transcode_pool = None
+
+def shutdown_transcode_pool():
+    global _transcode_pool
+    if _transcode_pool is not None:
+        _transcode_pool.shutdown(wait=False, cancel_futures=True)
+        _transcode_pool = None
+
+async def to_jpeg_bytes(photo: PhotoBuffer, renditions: list[tuple[str, int]] = ()) -> tuple[PhotoBuffer, dict[str, bytes]]:
+    """
+    JPEG 변환 + 축소본 생성 (한 번의 decode)
+    - 이미 정책에 맞는 baseline RGB JPEG 이면 재인코딩 없이 같은 버퍼를 그대로 반환
+      (축소본만 필요한 해상도까지 축소 decode 해서 생성, 축소본이 없으면 pool 도 사용 안 함)
+    - 그 외에는 process pool 에서 변환 (동시 작업 수는 TRANSCODE_MAX_PENDING 으로 제한)
+      spool 된 큰 이미지는 파일 경로만 넘기므로 프로세스 간 복사 없음
+    - 이미지 decode 실패만 400, 변환 worker 가 죽은 경우 등 pool 오류는 500 (pool 은 다음 요청에서 다시 생성)
+    반환: (원본 JPEG 버퍼, {rendition 이름: JPEG bytes})
+    """
+    with TRANSCODE_STAGE.time():
+        passthrough = is_passthrough_jpeg(photo.source, photo.size, settings.TRANSCODE_PASSTHROUGH_MAX_BYTES, settings.TRANSCODE_MAX_DIMENSION)
+        if passthrough:
+            TRANSCODE_PASSTHROUGH.inc()
+            if not renditions:
+                return photo, {}
+
+        loop = asyncio.get_running_loop()
+        TRANSCODE_QUEUE_DEPTH.inc()
+        pool = None
+        try:
+            async with _transcode_slots:
+                pool = transcode_pool()
+                jpg, rendered = await loop.run_in_executor(
+                    pool, transcode_with_renditions, photo.source, settings.JPEG_QUALITY,
+                    list(renditions), settings.RENDITION_QUALITY, not passthrough,
+                )
+            return (photo if passthrough else PhotoBuffer.from_bytes(jpg)), rendered
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise HTTPException(400, f"Invalid image data: {e}")
+        except BrokenProcessPool as e:
+            _reset_broken_pool(pool)
+            raise HTTPException(500, f"Transcode worker error: {e}")
+        finally:
+            TRANSCODE_QUEUE_DEPTH.dec()
 
 # --- MinIO 업로드 ---
-def put_to_minio(jpg_bytes: bytes, object_path: str, metadata: dict):
-    try:
-        c = minio_client()
+def _put_object_sync(jpg: PhotoBuffer, object_path: str, metadata: dict):
+    c = minio_client()
+    with jpg.open() as data:
         c.put_object(
             bucket_name=settings.MINIO_BUCKET,
             object_name=object_path,
-            data=io.BytesIO(jpg_bytes),
-            length=len(jpg_bytes),
+            data=data,
+            length=jpg.size,
             content_type="image/jpeg",
             metadata=metadata,
+            part_size=settings.MINIO_PART_SIZE,               # 이보다 크면 multipart 업로드
+            num_parallel_uploads=settings.MINIO_PARALLEL_PARTS,
         )
-    except S3Error as e:
-        raise HTTPException(500, f"MinIO upload error: {e}")
+
+async def put_to_minio(jpg: PhotoBuffer | bytes, object_path: str, metadata: dict):
+    """
+    MinIO 업로드 (전용 thread pool 에서 실행 → event loop 비차단)
+    - PhotoBuffer 는 메모리/임시 파일에서 바로 스트리밍 (추가 복사 없음)
+    """
+    if isinstance(jpg, (bytes, bytearray)):
+        jpg = PhotoBuffer.from_bytes(bytes(jpg))
+
+    loop = asyncio.get_running_loop()
+    UPLOAD_INFLIGHT.inc()
+    try:
+        with UPLOAD_STAGE.time():
+            try:
+                await loop.run_in_executor(_minio_executor, _put_object_sync, jpg, object_path, metadata)
+            except S3Error as e:
+                raise HTTPException(500, f"MinIO upload error: {e}")
+        UPLOAD_BYTES.inc(jpg.size)
+    finally:
+        UPLOAD_INFLIGHT.dec()
+
+async def put_many_to_minio(items: list[tuple[PhotoBuffer | bytes, str, dict]]):
+    """
+    여러 객체 병렬 업로드 - items: [(jpg, object_path, metadata), ...]
+    - 동시 실행 수는 thread pool 크기(MINIO_UPLOAD_WORKERS)로 제한됨
+    """
+    await asyncio.gather(*(put_to_minio(data, path, meta) for data, path, meta in items))
+
+# --- 사진 조회 ---
+def _list_prefix_sync(prefix: str, recursive: bool = True) -> list:
+    objects = minio_client().list_objects(settings.MINIO_BUCKET, prefix=prefix, recursive=recursive)
+    return [obj for obj in objects if not obj.is_dir]
+
+def _legacy_days(start: datetime, end: datetime) -> list[datetime]:
+    """
+    이전 flat 구조도 조회할 날짜 목록 (PHOTO_LEGACY_LAYOUT_UNTIL 이후 날짜는 제외)
+    """
+    until = settings.PHOTO_LEGACY_LAYOUT_UNTIL
+    days = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        if not until or yyyymmdd(day) <= until:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+async def list_robot_images(robot_id: str, start: datetime, end: datetime) -> list[dict]:
+    """
+    로봇의 [start, end) 구간 사진 목록 (촬영 시각순)
+    - 구간에 걸친 시(hour) prefix 만 병렬로 listing (하루 전체를 훑지 않음)
+    - 이전 flat 구조로 저장된 날짜는 날짜 prefix 바로 아래도 listing (하위 prefix 는 내려가지 않음)
+    - 경계 시간대는 파일명의 밀리초 시각으로 다시 거름
+    - start/end 가 naive 면 UTC 로 간주
+    - 구간이 PHOTO_LIST_MAX_HOURS 를 넘으면 ValueError (listing 호출 수 제한)
+    - listing 은 목록 조회 전용 thread pool (MINIO_LIST_WORKERS) 에서 실행 → 업로드와 경쟁하지 않음
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    start, end = start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+    if end - start > timedelta(hours=settings.PHOTO_LIST_MAX_HOURS):
+        raise ValueError(f"range too long: max {settings.PHOTO_LIST_MAX_HOURS} hours")
+
+    prefixes = []
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        prefixes.append(_image_prefix(robot_id, hour))
+        hour += timedelta(hours=1)
+
+    loop = asyncio.get_running_loop()
+    listings = await asyncio.gather(*(
+        loop.run_in_executor(_minio_list_executor, _list_prefix_sync, prefix) for prefix in prefixes
+    ), *(
+        loop.run_in_executor(_minio_list_executor, _list_prefix_sync, _legacy_prefix(robot_id, day), False)
+        for day in _legacy_days(start, end)
+    ))
+
+    images = []
+    renditions: dict[str, dict[str, str]] = {}
+    for objects in listings:
+        for obj in objects:
+            parsed = parse_object_name(obj.object_name)
+            if parsed is None:
+                # {원본}.{rendition}.jpg → 원본 항목에 붙임
+                base, _, name = obj.object_name.removesuffix(".jpg").rpartition(".")
+                if base:
+                    renditions.setdefault(f"{base}.jpg", {})[name] = obj.object_name
+                continue
+            ts, image_id = parsed
+            if start <= ts < end:
+                images.append({
+                    "object_path": obj.object_name,
+                    "imageId": image_id,
+                    "capturedAt": ts.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+                    "size": obj.size,
+                })
+    for image in images:
+        image["renditions"] = renditions.get(image["object_path"], {})
+    images.sort(key=lambda i: (i["capturedAt"], i["object_path"]))
+    return images
+
+# --- 추론 작업 큐 ---
+def _job_message(object_path: str, image_id: str) -> dict:
+    message = {"object_path": object_path, "imageId": image_id}
+    if RENDITIONS:
+        message["renditions"] = rendition_paths(object_path)
+    return message
+
+async def producer(queue_name: str, object_path: str, image_id: str):
+    with PRODUCER_STAGE.time():
+        await job_producer.push(queue_name, _job_message(object_path, image_id))
+    PRODUCER_STAGE.add(1)
+    logger.debug(f"Redis 큐에 작업 추가됨 → {queue_name}: {object_path}")
+
+async def producer_many(queue_name: str, jobs: list[tuple[str, str]]):
+    """
+    여러 작업을 한 번에 추가 - jobs: [(object_path, image_id), ...]
+    (job_producer 가 같은 flush 의 pipeline LPUSH 로 묶어서 전송)
+    """
+    with PRODUCER_STAGE.time():
+        await job_producer.push_many(queue_name, [
+            _job_message(object_path, image_id) for object_path, image_id in jobs
+        ])
+    PRODUCER_STAGE.add(len(jobs))
+    logger.debug(f"Redis 큐에 작업 {len(jobs)}건 추가됨 → {queue_name}")
+
+# --- 사진 수집 파이프라인 ---
+async def process_photo(p: DataPayload, on_stage=None, on_fetched=None) -> str:
+    """
+    사진 한 장 처리: 다운로드 → JPEG 변환(+축소본) → MinIO 업로드, 원본 업로드 경로 반환
+    - on_stage: 단계가 바뀔 때 호출되는 async 콜백 (수집 작업의 진행 상태 기록용)
+    - on_fetched: 다운로드 직후 호출되는 async 콜백 (sha256 계산된 버퍼 전달)
+      이미 저장된 object_path 를 반환하면 변환/업로드 없이 그 경로를 반환 (내용 중복 제거)
+    """
+    async def stage(name: str):
+        if on_stage is not None:
+            await on_stage(name)
+
+    raw = jpg = None
+    try:
+        # 1) 시간 변환
+        ts = parse_iso_utc(p.capturedAt)
+
+        # 2) 이미지 가져오고 JPEG로 변환
+        await stage("fetching")
+        raw = await fetch_image_bytes(str(p.photo_Url), hash_content=on_fetched is not None)
+        if on_fetched is not None:
+            existing = await on_fetched(raw)
+            if existing:
+                return existing
+        await stage("transcoding")
+        jpg, rendered = await to_jpeg_bytes(raw, RENDITIONS)
+
+        # 3) 파일명/경로 생성
+        object_path, filename = build_object_path(p.robot_id, ts, str(p.imageId))
+
+        # 4) 메타데이터 구성
+        meta = {
+            "robot_id": p.robot_id,
+            "capturedAt": p.capturedAt,
+            "latitude": str(p.position.latitude),
+            "longitude": str(p.position.longitude),
+            "altitude": "" if p.position.altitude is None else str(p.position.altitude),
+        }
+
+        # 5) MinIO 업로드 (원본 + 축소본 병렬)
+        await stage("uploading")
+        await put_many_to_minio([(jpg, object_path, meta)] + [
+            (data, rendition_path(object_path, name), {**meta, "rendition": name})
+            for name, data in rendered.items()
+        ])
+        return object_path
+    finally:
+        # 다운로드/변환 버퍼 정리 (spool 임시 파일 삭제)
+        for buf in (raw, jpg):
+            if buf is not None:
+                buf.close()
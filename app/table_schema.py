@@ -0,0 +1,102 @@
+# app/table_schema.py
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+from .config import settings
+from .database import async_session
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "shrc"
+
+# table → (컬럼 목록(ordinal 순서), 조회 시각)
+_TABLE_COLUMNS: Dict[str, Tuple[List[str], float]] = {}
+# table → {컬럼: data_type}
+_COLUMN_TYPES: Dict[str, Dict[str, str]] = {}
+_lock = asyncio.Lock()
+
+# (table, field) → 테이블에 없는 필드로 버려진 행 수
+UNKNOWN_FIELDS: Counter = Counter()
+
+
+# ---------------------------------------------------------
+# information_schema 기반 컬럼 카탈로그
+# ---------------------------------------------------------
+async def load_table_columns(tables: List[str]) -> Dict[str, List[str]]:
+    """
+    shrc.{table} 들의 컬럼 목록을 ordinal_position 순서로 조회해 캐시에 저장 (data_type 포함)
+    """
+    query = """
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = :schema AND table_name = ANY(:tables)
+        ORDER BY table_name, ordinal_position
+    """
+    async with async_session() as session:
+        result = await session.execute(text(query), {"schema": SCHEMA, "tables": list(tables)})
+        rows = result.fetchall()
+
+    loaded: Dict[str, List[str]] = {t: [] for t in tables}
+    types: Dict[str, Dict[str, str]] = {t: {} for t in tables}
+    for table_name, column_name, data_type in rows:
+        loaded[table_name].append(column_name)
+        types[table_name][column_name] = data_type
+
+    now = time.monotonic()
+    for table, columns in loaded.items():
+        _TABLE_COLUMNS[table] = (columns, now)
+        _COLUMN_TYPES[table] = types[table]
+
+    return loaded
+
+
+async def get_table_columns(table: str) -> List[str]:
+    """
+    캐시된 컬럼 목록 반환 (SCHEMA_CACHE_TTL 초가 지나면 다시 조회)
+    - 테이블이 없거나 조회 결과가 비면 [] → 호출 측은 payload 키를 그대로 사용
+    """
+    cached = _TABLE_COLUMNS.get(table)
+    if cached and time.monotonic() - cached[1] < settings.SCHEMA_CACHE_TTL:
+        return cached[0]
+
+    async with _lock:
+        cached = _TABLE_COLUMNS.get(table)
+        if cached and time.monotonic() - cached[1] < settings.SCHEMA_CACHE_TTL:
+            return cached[0]
+
+        previous = cached[0] if cached else None
+        columns = (await load_table_columns([table]))[table]
+        if previous is not None and columns != previous:
+            logger.warning(f"[SCHEMA] shrc.{table} 컬럼 변경 감지: {previous} → {columns}")
+        return columns
+
+
+async def get_column_types(table: str) -> Dict[str, str]:
+    """
+    {컬럼: data_type} (get_table_columns 와 같은 캐시/TTL)
+    """
+    await get_table_columns(table)
+    return _COLUMN_TYPES.get(table, {})
+
+
+# ---------------------------------------------------------
+# 테이블에 없는 필드 (schema drift) 집계
+# ---------------------------------------------------------
+def record_unknown_fields(table: str, fields: Tuple[str, ...], rows: int):
+    for field in fields:
+        if (table, field) not in UNKNOWN_FIELDS:
+            logger.warning(f"[SCHEMA DRIFT] shrc.{table} 에 없는 필드 '{field}' → 저장하지 않음")
+        UNKNOWN_FIELDS[(table, field)] += rows
+
+
+def get_unknown_fields() -> List[Dict]:
+    return [
+        {"table": table, "field": field, "rows": count}
+        for (table, field), count in sorted(UNKNOWN_FIELDS.items())
+    ]
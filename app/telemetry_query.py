@@ -0,0 +1,277 @@
+# app/telemetry_query.py
+
+import base64
+import binascii
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from . import metrics
+from .config import settings
+from .database import engine
+from .row_encoder import parse_ts_fast
+from .table_schema import get_column_types
+from .telemetry_rollups import pick_rollup
+from .telemetry_service import MSG_TABLE_MAP
+from .robot_registry import get_robot_num
+
+logger = logging.getLogger(__name__)
+
+QUERY_ROWS = metrics.counter("telemetry_query_rows_total", "telemetry 조회 API 로 내보낸 행 수")
+QUERY_SECONDS = metrics.histogram("telemetry_query_seconds", "telemetry 조회 응답 스트리밍 소요 시간(초)")
+QUERY_ROLLUP = metrics.counter("telemetry_query_rollup_total", "롤업(continuous aggregate)에서 읽은 bucket 집계 조회 수")
+
+# ---------------------------------------------------------
+# 시계열 조회 (time_bucket 다운샘플링 + keyset pagination)
+# - bucket 없음: 원본 행 (time 순)
+# - bucket 지정: time_bucket(bucket, time) 별 avg / min / max / last
+#   맞는 롤업(shrc.{table}_1m 등)이 있으면 롤업에서 읽음 (없거나 경계가 안 맞으면 원본 집계)
+#   - 롤업 bucket == 요청 bucket: 롤업 컬럼 그대로
+#   - 요청 bucket 이 더 큼: min/max/last 는 다시 집계, avg 는 samples 가중 평균
+#     (컬럼에 NULL 이 섞인 bucket 은 samples 에 NULL 행도 포함되므로 원본 avg 와 조금 다를 수 있음)
+# - 다음 페이지: 응답의 next_cursor 를 cursor 로 다시 요청
+#   (원본: time > cursor, 집계: time >= cursor + bucket → (robot_id, time) 인덱스 범위 조회)
+#   cursor 는 마지막 행 time(ISO 8601)의 URL-safe base64 ('+09:00' 의 '+' 가 query string 에서 공백이 되지 않도록)
+# ---------------------------------------------------------
+NUMERIC_TYPES = {"smallint", "integer", "bigint", "numeric", "real", "double precision"}
+
+AGGREGATES = {
+    "avg": 'avg("{col}")::double precision',
+    "min": 'min("{col}")',
+    "max": 'max("{col}")',
+    "last": 'last("{col}", time)',
+}
+
+_BUCKET_RE = re.compile(r"^(\d+)(s|m|h|d)$")
+_BUCKET_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+# partition 단위로 직렬화해서 한 번에 내보낼 행 수
+_STREAM_CHUNK_ROWS = 1000
+
+
+def resolve_table(name: str) -> str:
+    """
+    msgId('24') 또는 테이블명('gps_raw_int_24') → 테이블명 (MSG_TABLE_MAP 에 있는 테이블만 허용)
+    """
+    if name.isdigit() and int(name) in MSG_TABLE_MAP:
+        return MSG_TABLE_MAP[int(name)]
+    if name in MSG_TABLE_MAP.values():
+        return name
+    raise HTTPException(404, f"Unknown telemetry table: {name}")
+
+
+def parse_bucket(bucket: str | None) -> timedelta | None:
+    """
+    '30s' / '1m' / '15m' / '1h' / '1d' → timedelta
+    """
+    if not bucket:
+        return None
+    m = _BUCKET_RE.match(bucket)
+    if m is None or int(m.group(1)) == 0:
+        raise HTTPException(400, f"Invalid bucket: {bucket} (e.g. 30s, 1m, 1h, 1d)")
+    return timedelta(**{_BUCKET_UNITS[m.group(2)]: int(m.group(1))})
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def encode_cursor(last_time: datetime) -> str:
+    return base64.urlsafe_b64encode(last_time.isoformat().encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> datetime:
+    """
+    encode_cursor 의 역 - 형식이 맞지 않으면 400
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return _utc(parse_ts_fast(raw.decode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(400, f"Invalid cursor: {cursor}")
+
+
+async def build_series_query(
+    table: str,
+    robot_id: str,
+    start: datetime,
+    end: datetime,
+    columns: List[str] | None,
+    bucket: timedelta | None,
+    agg: str,
+    limit: int,
+    cursor: str | None,
+) -> tuple[str, Dict[str, Any], List[str]]:
+    """
+    요청 검증 후 (SQL, 파라미터, 응답 컬럼 목록) 반환
+    - 컬럼은 information_schema 카탈로그에 있는 것만 허용 (SQL 식별자로 직접 사용하므로)
+    - avg 는 숫자 컬럼만 가능 (컬럼 생략 시 숫자 컬럼만 선택)
+    """
+    robot_num = await get_robot_num(robot_id)
+    if robot_num is None:
+        raise HTTPException(404, f"Unknown robot_id: {robot_id}")
+    if agg not in AGGREGATES:
+        raise HTTPException(400, f"Invalid agg: {agg} ({', '.join(AGGREGATES)})")
+
+    types = await get_column_types(table)
+    value_columns = [c for c in types if c not in ("time", "robot_id")]
+    needs_numeric = bucket is not None and agg == "avg"
+
+    if columns:
+        unknown = [c for c in columns if c not in value_columns]
+        if unknown:
+            raise HTTPException(400, f"Unknown columns for {table}: {unknown}")
+        if needs_numeric:
+            non_numeric = [c for c in columns if types[c] not in NUMERIC_TYPES]
+            if non_numeric:
+                raise HTTPException(400, f"agg={agg} needs numeric columns: {non_numeric}")
+    else:
+        columns = [c for c in value_columns if not needs_numeric or types[c] in NUMERIC_TYPES]
+
+    start, end = _utc(start), _utc(end)
+    params: Dict[str, Any] = {"robot_num": robot_num, "start": start, "end": end, "limit": limit}
+
+    if bucket is None:
+        select = ", ".join(f'"{c}"' for c in columns)
+        after = ""
+        if cursor:
+            params["after"] = decode_cursor(cursor)
+            after = "AND time > :after"
+        sql = f"""
+            SELECT time{', ' + select if select else ''}
+            FROM shrc.{table}
+            WHERE robot_id = :robot_num AND time >= :start AND time < :end {after}
+            ORDER BY time
+            LIMIT :limit
+        """
+    else:
+        if cursor:
+            params["start"] = max(start, decode_cursor(cursor) + bucket)
+        params["bucket"] = bucket
+        sql = await _rollup_query(table, columns, bucket, agg, params)
+        if sql is not None:
+            return sql, params, ["time"] + columns
+
+        select = ", ".join(f'{AGGREGATES[agg].format(col=c)} AS "{c}"' for c in columns)
+        sql = f"""
+            SELECT time_bucket(:bucket, time) AS time{', ' + select if select else ''}
+            FROM shrc.{table}
+            WHERE robot_id = :robot_num AND time >= :start AND time < :end
+            GROUP BY 1
+            ORDER BY 1
+            LIMIT :limit
+        """
+
+    return sql, params, ["time"] + columns
+
+
+async def _rollup_query(
+    table: str,
+    columns: List[str],
+    bucket: timedelta,
+    agg: str,
+    params: Dict[str, Any],
+) -> str | None:
+    """
+    롤업에서 읽는 bucket 집계 SQL, 쓸 수 있는 롤업이 없으면 None
+    - 롤업 뷰에 {col}_{agg} 컬럼이 없으면 (숫자가 아닌 컬럼의 min/max, 뷰 생성 뒤 추가된 컬럼) 원본 집계
+    """
+    picked = pick_rollup(table, bucket, params["start"], params["end"])
+    if picked is None:
+        return None
+    view, view_bucket = picked
+    view_columns = await get_column_types(view)
+    if any(f"{c}_{agg}" not in view_columns for c in columns):
+        return None
+
+    QUERY_ROLLUP.inc()
+    where = "WHERE robot_id = :robot_num AND bucket >= :start AND bucket < :end"
+    if view_bucket == bucket:
+        select = ", ".join(f'"{c}_{agg}" AS "{c}"' for c in columns)
+        return f"""
+            SELECT bucket AS time{', ' + select if select else ''}
+            FROM shrc.{view}
+            {where}
+            ORDER BY 1
+            LIMIT :limit
+        """
+
+    if agg == "avg":
+        exprs = [
+            f'(sum("{c}_avg" * samples) / nullif(sum(samples) FILTER (WHERE "{c}_avg" IS NOT NULL), 0))'
+            for c in columns
+        ]
+    elif agg == "last":
+        exprs = [f'last("{c}_last", bucket)' for c in columns]
+    else:
+        exprs = [f'{agg}("{c}_{agg}")' for c in columns]
+    select = ", ".join(f'{expr} AS "{c}"' for expr, c in zip(exprs, columns))
+    return f"""
+        SELECT time_bucket(:bucket, bucket) AS time{', ' + select if select else ''}
+        FROM shrc.{view}
+        {where}
+        GROUP BY 1
+        ORDER BY 1
+        LIMIT :limit
+    """
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=_default)
+
+
+async def stream_series(
+    sql: str,
+    params: Dict[str, Any],
+    columns: List[str],
+    header: Dict[str, Any],
+    fmt: str = "json",
+) -> AsyncIterator[bytes]:
+    """
+    서버 측 cursor 로 읽으면서 바로 직렬화해 내보냄 (전체 결과를 메모리에 올리지 않음)
+    - json  : {...header, "columns": [...], "rows": [[...], ...], "count": n, "next_cursor": ...}
+    - ndjson: 행마다 {"time": ..., 컬럼: 값} 한 줄, 마지막 줄 {"count": n, "next_cursor": ...}
+    next_cursor 는 limit 만큼 채웠을 때 마지막 행의 time (encode_cursor, 아니면 null)
+    """
+    with QUERY_SECONDS.time():
+        count = 0
+        last_time = None
+
+        if fmt == "json":
+            yield _dumps({**header, "columns": columns})[:-1] + b',"rows":['
+
+        async with engine.connect() as conn:
+            result = await conn.stream(text(sql), params)
+            async for partition in result.partitions(_STREAM_CHUNK_ROWS):
+                if fmt == "json":
+                    body = b",".join(_dumps(tuple(row)) for row in partition)
+                    yield (b"," if count else b"") + body
+                else:
+                    yield b"".join(_dumps(dict(zip(columns, row))) + b"\n" for row in partition)
+                count += len(partition)
+                last_time = partition[-1][0]
+
+        QUERY_ROWS.inc(count)
+        next_cursor = encode_cursor(last_time) if last_time is not None and count >= params["limit"] else None
+        if fmt == "json":
+            yield b'],"count":' + _dumps(count) + b',"next_cursor":' + _dumps(next_cursor) + b"}"
+        else:
+            yield _dumps({"count": count, "next_cursor": next_cursor}) + b"\n"
+
+
+def query_limit(limit: int | None) -> int:
+    if limit is None:
+        return settings.TELEMETRY_QUERY_DEFAULT_LIMIT
+    return max(1, min(limit, settings.TELEMETRY_QUERY_MAX_ROWS))
@@ -0,0 +1,298 @@
+# app/telemetry_rollups.py
+
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+from . import metrics
+from .config import settings
+from .database import engine
+from .table_schema import get_column_types
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "shrc"
+NUMERIC_TYPES = {"smallint", "integer", "bigint", "numeric", "real", "double precision"}
+
+REFRESH_SECONDS = metrics.histogram("rollup_refresh_seconds", "continuous aggregate refresh 소요 시간(초)")
+REFRESH_ERRORS = metrics.counter("rollup_refresh_errors_total", "continuous aggregate refresh 실패 수")
+
+# ---------------------------------------------------------
+# telemetry hypertable 롤업 / 압축 / 보존 정책 관리
+# - 테이블마다 ROLLUP_INTERVALS 별 continuous aggregate: shrc.{table}_{1m|1h|...}
+#   (bucket, robot_id) 별 숫자 컬럼 {col}_avg / {col}_min / {col}_max, 모든 컬럼 {col}_last, samples
+#   materialized_only = false → 아직 refresh 안 된 최근 구간도 조회 결과에 포함
+# - 동기화 커밋 후 mark_dirty() 로 변경 구간 기록 → ROLLUP_REFRESH_DELAY 초 모아서 해당 구간만 refresh
+#   (백그라운드 refresh policy 는 놓친 구간을 위한 안전망)
+# - 조회 API 의 bucket 집계는 pick_rollup() 으로 고른 롤업에서 읽음 (telemetry_query 참고)
+# - 원본 테이블: TELEMETRY_COMPRESS_AFTER_DAYS 이후 압축 (segmentby robot_id),
+#   TELEMETRY_RAW_RETENTION_DAYS 이후 삭제 / 롤업: TELEMETRY_ROLLUP_RETENTION_DAYS 이후 삭제
+#   (0 = 사용 안 함, 원본 압축/삭제는 기본 꺼짐 - 필요한 환경에서만 명시적으로 설정)
+#   (압축된 chunk 에 다시 동기화(ON CONFLICT)하려면 TimescaleDB 2.11 이상 필요)
+# - refresh policy 조회 구간(ROLLUP_POLICY_LOOKBACK_DAYS)은 원본 보존 기간보다 짧아야 함
+#   (원본이 삭제된 구간을 refresh 하면 롤업도 비워짐)
+# - 원본 테이블 컬럼이 바뀌어도 이미 만든 롤업 뷰는 다시 만들지 않음 (뷰 drop 후 재시작 시 재생성)
+# ---------------------------------------------------------
+_INTERVAL_RE = re.compile(r"^(\d+)(m|h|d)$")
+_INTERVAL_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+
+# table → [(view 이름, bucket)]
+_VIEWS: Dict[str, List[Tuple[str, timedelta]]] = {}
+# table → 아직 refresh 하지 않은 (최소 time, 최대 time)
+_dirty: Dict[str, Tuple[datetime, datetime]] = {}
+_refresher: asyncio.Task | None = None
+
+
+def parse_intervals(spec: str) -> List[Tuple[str, timedelta]]:
+    """
+    "1m,1h" → [("1m", 1분), ("1h", 1시간)]
+    """
+    intervals = []
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        m = _INTERVAL_RE.match(item)
+        if m is None:
+            raise ValueError(f"Invalid rollup interval: {item}")
+        intervals.append((item, timedelta(**{_INTERVAL_UNITS[m.group(2)]: int(m.group(1))})))
+    return intervals
+
+
+def _interval_sql(td: timedelta) -> str:
+    return f"INTERVAL '{int(td.total_seconds())} seconds'"
+
+
+def _aggregate_columns(types: Dict[str, str]) -> List[str]:
+    select = []
+    for col, data_type in types.items():
+        if col in ("time", "robot_id"):
+            continue
+        if data_type in NUMERIC_TYPES:
+            select += [
+                f'avg("{col}")::double precision AS "{col}_avg"',
+                f'min("{col}") AS "{col}_min"',
+                f'max("{col}") AS "{col}_max"',
+            ]
+        select.append(f'last("{col}", time) AS "{col}_last"')
+    return select
+
+
+async def _is_hypertable(conn, table: str) -> bool:
+    result = await conn.execute(text("""
+        SELECT 1 FROM timescaledb_information.hypertables
+        WHERE hypertable_schema = :schema AND hypertable_name = :table
+    """), {"schema": SCHEMA, "table": table})
+    return result.first() is not None
+
+
+async def _view_exists(conn, view: str) -> bool:
+    result = await conn.execute(text("""
+        SELECT 1 FROM timescaledb_information.continuous_aggregates
+        WHERE view_schema = :schema AND view_name = :view
+    """), {"schema": SCHEMA, "view": view})
+    return result.first() is not None
+
+
+# ---------------------------------------------------------
+# 생성 / 정책 (기동 시 1회, 이미 있으면 건너뜀)
+# ---------------------------------------------------------
+async def ensure_rollups(tables: List[str]):
+    """
+    테이블별 continuous aggregate + 압축/보존 정책 생성, 이후 있는 뷰를 조회해 _VIEWS 에 등록
+    - DDL 은 트랜잭션 밖에서 실행해야 하므로 AUTOCOMMIT 연결 사용
+    - 테이블 단위로 실패를 격리 (hypertable 아님 / TimescaleDB 미설치 등 → 경고만)
+    - 생성/정책이 실패해도 이미 있는 뷰는 조회/refresh 에 사용
+    """
+    if not settings.TELEMETRY_ROLLUPS_ENABLED:
+        return
+
+    intervals = parse_intervals(settings.ROLLUP_INTERVALS)
+    for table in tables:
+        try:
+            await _ensure_table_rollups(table, intervals)
+        except Exception as e:
+            logger.warning(f"[ROLLUP] table={table} 롤업/정책 생성 실패 → 건너뜀: {e}")
+        try:
+            await _discover_views(table, intervals)
+        except Exception as e:
+            logger.warning(f"[ROLLUP] table={table} 롤업 조회 실패 → 원본 집계 사용: {e}")
+
+
+async def _discover_views(table: str, intervals: List[Tuple[str, timedelta]]):
+    """
+    실제로 있는 롤업 뷰로 _VIEWS 채움 (조회 / refresh 대상)
+    - 생성/정책 단계와 분리: 정책 추가가 실패해도 이미 있는 뷰는 사용
+    """
+    async with engine.connect() as conn:
+        views = [
+            (f"{table}_{suffix}", bucket)
+            for suffix, bucket in intervals
+            if await _view_exists(conn, f"{table}_{suffix}")
+        ]
+    if views:
+        _VIEWS[table] = views
+    else:
+        _VIEWS.pop(table, None)
+
+
+async def _ensure_table_rollups(table: str, intervals: List[Tuple[str, timedelta]]):
+    types = await get_column_types(table)
+    if not types:
+        logger.warning(f"[ROLLUP] shrc.{table} 없음 → 건너뜀")
+        return
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+        if not await _is_hypertable(conn, table):
+            logger.warning(f"[ROLLUP] shrc.{table} 는 hypertable 이 아님 → 건너뜀")
+            return
+
+        for suffix, bucket in intervals:
+            view = f"{table}_{suffix}"
+            if not await _view_exists(conn, view):
+                select = ", ".join(["count(*) AS samples"] + _aggregate_columns(types))
+                await conn.execute(text(f"""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS {SCHEMA}.{view}
+                    WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+                    SELECT time_bucket({_interval_sql(bucket)}, time) AS bucket, robot_id, {select}
+                    FROM {SCHEMA}.{table}
+                    GROUP BY bucket, robot_id
+                    WITH NO DATA
+                """))
+                logger.info(f"[ROLLUP] continuous aggregate 생성: {SCHEMA}.{view}")
+
+            try:
+                await _ensure_view_policies(conn, view, bucket)
+            except Exception as e:
+                logger.warning(f"[ROLLUP] view={view} 정책 추가 실패 (뷰는 사용): {e}")
+
+        if settings.TELEMETRY_COMPRESS_AFTER_DAYS > 0:
+            await conn.execute(text(f"""
+                ALTER TABLE {SCHEMA}.{table} SET (
+                    timescaledb.compress,
+                    timescaledb.compress_segmentby = 'robot_id',
+                    timescaledb.compress_orderby = 'time DESC'
+                )
+            """))
+            await conn.execute(text(f"""
+                SELECT add_compression_policy('{SCHEMA}.{table}',
+                    INTERVAL '{settings.TELEMETRY_COMPRESS_AFTER_DAYS} days', if_not_exists => true)
+            """))
+        if settings.TELEMETRY_RAW_RETENTION_DAYS > 0:
+            await conn.execute(text(f"""
+                SELECT add_retention_policy('{SCHEMA}.{table}',
+                    INTERVAL '{settings.TELEMETRY_RAW_RETENTION_DAYS} days', if_not_exists => true)
+            """))
+
+
+async def _ensure_view_policies(conn, view: str, bucket: timedelta):
+    await conn.execute(text(f"""
+        SELECT add_continuous_aggregate_policy('{SCHEMA}.{view}',
+            start_offset => {_interval_sql(max(bucket * 3, timedelta(days=settings.ROLLUP_POLICY_LOOKBACK_DAYS)))},
+            end_offset => {_interval_sql(bucket)},
+            schedule_interval => {_interval_sql(max(bucket, timedelta(minutes=30)))},
+            if_not_exists => true)
+    """))
+    if settings.TELEMETRY_ROLLUP_RETENTION_DAYS > 0:
+        await conn.execute(text(f"""
+            SELECT add_retention_policy('{SCHEMA}.{view}',
+                INTERVAL '{settings.TELEMETRY_ROLLUP_RETENTION_DAYS} days', if_not_exists => true)
+        """))
+
+
+# ---------------------------------------------------------
+# 동기화 후 변경 구간 refresh
+# ---------------------------------------------------------
+def mark_dirty(table: str, start: datetime, end: datetime):
+    """
+    table 에 [start, end] 구간 행이 커밋됐음을 기록 → 잠시 모았다가 해당 구간만 refresh
+    """
+    if table not in _VIEWS:
+        return
+    if table in _dirty:
+        prev_start, prev_end = _dirty[table]
+        start, end = min(start, prev_start), max(end, prev_end)
+    _dirty[table] = (start, end)
+
+    global _refresher
+    if _refresher is None or _refresher.done():
+        _refresher = asyncio.create_task(_refresh_later())
+
+
+async def _refresh_later():
+    await asyncio.sleep(settings.ROLLUP_REFRESH_DELAY)
+    await refresh_dirty()
+
+
+# time_bucket() 기본 origin (월요일) - 이 기준으로 bucket 경계를 맞춤
+_BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+
+
+def _floor(dt: datetime, bucket: timedelta) -> datetime:
+    return _BUCKET_ORIGIN + (dt.astimezone(timezone.utc) - _BUCKET_ORIGIN) // bucket * bucket
+
+
+def pick_rollup(table: str, bucket: timedelta, start: datetime, end: datetime) -> Tuple[str, timedelta] | None:
+    """
+    bucket 집계 조회에 쓸 롤업 (view 이름, 롤업 bucket), 없으면 None → 원본 조회
+    - 롤업 bucket 이 요청 bucket 을 나눠떨어지게 하고 start/end 가 롤업 bucket 경계인 것 중 가장 큰 것
+      (경계가 안 맞으면 구간 밖 행이 섞인 롤업 bucket 을 읽게 되므로 제외)
+    """
+    best = None
+    for view, view_bucket in _VIEWS.get(table, []):
+        if bucket % view_bucket or _floor(start, view_bucket) != start or _floor(end, view_bucket) != end:
+            continue
+        if best is None or view_bucket > best[1]:
+            best = (view, view_bucket)
+    return best
+
+
+async def refresh_dirty():
+    """
+    모아 둔 변경 구간을 bucket 경계로 넓혀서 refresh_continuous_aggregate 호출
+    """
+    dirty = dict(_dirty)
+    _dirty.clear()
+    if not dirty:
+        return
+
+    async with engine.connect() as conn:
+        # refresh_continuous_aggregate 는 트랜잭션 안에서 실행 불가
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table, (start, end) in dirty.items():
+            for view, bucket in _VIEWS.get(table, []):
+                window = (_floor(start, bucket), _floor(end, bucket) + bucket)
+                started = time.perf_counter()
+                try:
+                    await conn.execute(
+                        text(
+                            f"CALL refresh_continuous_aggregate('{SCHEMA}.{view}', "
+                            f"CAST(:start AS timestamptz), CAST(:end AS timestamptz))"
+                        ),
+                        {"start": window[0], "end": window[1]},
+                    )
+                    logger.debug(f"[ROLLUP] refresh {view}: {window[0]} → {window[1]}")
+                except Exception as e:
+                    REFRESH_ERRORS.inc()
+                    logger.warning(f"[ROLLUP] refresh 실패 view={view}: {e}")
+                finally:
+                    REFRESH_SECONDS.observe(time.perf_counter() - started)
+
+
+async def stop_refresher():
+    """
+    종료 시 대기 중인 refresh 를 바로 실행
+    """
+    global _refresher
+    if _refresher is not None and not _refresher.done():
+        _refresher.cancel()
+        await asyncio.gather(_refresher, return_exceptions=True)
+    _refresher = None
+    try:
+        await refresh_dirty()
+    except Exception as e:
+        logger.warning(f"[ROLLUP] 종료 시 refresh 실패: {e}")
@@ -10,10 +10,21 @@ from .database import async_session
 from .config import settings
 import orjson
 import logging
+from . import http_clients, metrics
+from .json_stream import JsonArrayStream
+from .row_encoder import encode_rows
+from .table_schema import get_table_columns, record_unknown_fields
+from .telemetry_rollups import mark_dirty
+from .robot_state import update_latest
+from .robot_registry import UUID_TO_NUM, get_robot_num, load_uuid_to_num
+from . import window_planner
+from .resilience import CircuitBreaker, ResilientClient, TokenBucket
+from . import copy_pool
 from collections import defaultdict
 from app.database import engine
 import asyncpg
 import time
+from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__) 
 
@@ -25,28 +36,72 @@ HEADERS = {
 }
 
 
-client_list = httpx.AsyncClient(
+# ---------------------------------------------------------
+# 공유 HTTP client (목록/상세 조회는 pool 예산을 따로 가짐)
+# ---------------------------------------------------------
+http_clients.register(
+    "m1ucs_list",
     headers=HEADERS,
     timeout=60.0,
-    follow_redirects=False
+    follow_redirects=False,
+    http2=settings.HTTP2_ENABLED,
+    limits=httpx.Limits(
+        max_connections=settings.M1UCS_LIST_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.M1UCS_LIST_MAX_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    ),
 )
 
-client_detail = httpx.AsyncClient(
+http_clients.register(
+    "m1ucs_detail",
     headers=HEADERS,
     timeout=120.0,
     follow_redirects=False,
-    verify=False
+    verify=False,
+    http2=settings.HTTP2_ENABLED,
+    limits=httpx.Limits(
+        max_connections=settings.M1UCS_DETAIL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.M1UCS_DETAIL_MAX_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    ),
 )
 
 
+# ---------------------------------------------------------
+# m1ucs 요청 공통 정책 (목록/상세가 같은 한도를 공유)
+# - token bucket: 초당 M1UCS_RATE_PER_SEC 요청 (차단(302/429) 전에 스스로 속도 제한)
+# - host 당 동시 요청 M1UCS_MAX_CONCURRENCY 이하
+# - 연결 오류 / timeout / 5xx / 429 / 302 는 jitter backoff 로 재시도, Retry-After 준수
+# - 연속 실패 시 circuit breaker 로 잠시 요청 중단
+# ---------------------------------------------------------
+_m1ucs_bucket = TokenBucket(settings.M1UCS_RATE_PER_SEC, settings.M1UCS_BURST)
+_m1ucs_breaker = CircuitBreaker("m1ucs", settings.M1UCS_BREAKER_THRESHOLD, settings.M1UCS_BREAKER_RESET_SEC)
+
+
+def _m1ucs(client_name: str) -> ResilientClient:
+    return ResilientClient(
+        client_name,
+        bucket=_m1ucs_bucket,
+        breaker=_m1ucs_breaker,
+        max_retries=settings.M1UCS_MAX_RETRIES,
+        timeout_retries=settings.M1UCS_TIMEOUT_RETRIES,
+        base_delay=settings.M1UCS_BACKOFF_BASE,
+        max_delay=settings.M1UCS_BACKOFF_MAX,
+        concurrency=settings.M1UCS_MAX_CONCURRENCY,
+    )
+
+
+m1ucs_list = _m1ucs("m1ucs_list")
+m1ucs_detail = _m1ucs("m1ucs_detail")
 
+
+@asynccontextmanager
 async def get_asyncpg_connection():
     """
-    SQLAlchemy 엔진에서 asyncpg 원본 connection을 추출
+    COPY 전용 pool 의 asyncpg connection (블록을 벗어나면 pool 로 반환)
     """
-    async with engine.begin() as conn:
-        raw = await conn.get_raw_connection()
-        return raw.driver_connection
+    async with copy_pool.acquire() as conn:
+        yield conn
 
 
 # ---------------------------------------------------------
@@ -61,6 +116,8 @@ MSG_TABLE_MAP = {
     33: "global_position_int_33"
 }
 
+TABLE_MSG_MAP = {table: msg_id for msg_id, table in MSG_TABLE_MAP.items()}
+
 # ---------------------------------------------------------
 # 날짜 처리 함수
 # ---------------------------------------------------------
@@ -79,6 +136,16 @@ def _iter_dates(start: date, end: date):
         cur += timedelta(days=1)
 
 
+# ---------------------------------------------------------
+# 동기화 단계별 소요 시간 / 처리량 (stage_seconds{stage=...})
+# ---------------------------------------------------------
+LIST_STAGE = metrics.stage("fetch_message_list")
+DETAIL_STAGE = metrics.stage("fetch_message_detail")
+FLATTEN_STAGE = metrics.stage("flatten_payload")
+ENCODE_STAGE = metrics.stage("encode_rows")
+COPY_STAGE = metrics.stage("save_batch_copy_preprocessed")
+
+
 # ---------------------------------------------------------
 # JSON payload → DB 컬럼 flatten
 # ---------------------------------------------------------
@@ -89,26 +156,19 @@ def flatten_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     row = {}
 
-    for key, value in payload.items():
-        if "[" in key and "]" in key:
-            base = key.split("[")[0]
-            idx = key.split("[")[1].replace("]", "")
-            new_key = f"{base}_{idx}"
-            row[new_key] = value
-        else:
-            row[key] = value
+    with FLATTEN_STAGE.time():
+        for key, value in payload.items():
+            if "[" in key and "]" in key:
+                base = key.split("[")[0]
+                idx = key.split("[")[1].replace("]", "")
+                new_key = f"{base}_{idx}"
+                row[new_key] = value
+            else:
+                row[key] = value
+    FLATTEN_STAGE.add(1)
 
     return row
 
-UUID_TO_NUM = {}
-
-async def load_uuid_to_num():
-    async with async_session() as session:
-        result = await session.execute(text("""
-            SELECT robot_id, robot_num FROM shrc.robots
-        """))
-        rows = result.fetchall()
-    return {str(r.robot_id): r.robot_num for r in rows}
 # ---------------------------------------------------------
 # 메시지 목록 조회
 # ---------------------------------------------------------
@@ -116,12 +176,8 @@ async def fetch_message_list(robot_id: str, from_ts: str, to_ts: str):
     url = f"{API_BASE}/ext/robots/{robot_id}/telemetries"
     params = {"from": from_ts, "to": to_ts}
 
-    res = await client_list.get(url, params=params)
-
-    if res.status_code == 302:
-        raise ValueError("🚫 302 Redirect → 서버가 요청을 차단했습니다.")
-
-    res.raise_for_status()
+    with LIST_STAGE.time():
+        res = await m1ucs_list.request("GET", url, params=params)
     data = orjson.loads(res.content)
     return data if isinstance(data, list) else [data]
 
@@ -133,13 +189,50 @@ async def fetch_message_detail(robot_id: str, msg_id: int, from_ts: str, to_ts:
     url = f"{API_BASE}/ext/robots/{robot_id}/telemetries/{msg_id}"
     params = {"from": from_ts, "to": to_ts}
 
-    res = await client_detail.get(url, params=params)
+    with DETAIL_STAGE.time():
+        res = await m1ucs_detail.request("GET", url, params=params)
+    data = orjson.loads(res.content)
+    DETAIL_STAGE.add(len(data) if isinstance(data, list) else 1)
+    return data
 
-    if res.status_code == 302:
-        raise ValueError("🚫 상세 조회에서 302 Redirect 발생")
 
-    res.raise_for_status()
-    return orjson.loads(res.content)
+async def stream_message_detail(robot_id: str, msg_id: int, from_ts: str, to_ts: str):
+    """
+    상세 조회 스트리밍 버전
+    - 응답 전체를 메모리에 올리지 않고 payload 가 완성되는 대로 하나씩 yield
+    - 단계 소요 시간은 응답/청크를 기다린 시간만 (yield 후 소비 측이 COPY 하는 시간 제외)
+    """
+    url = f"{API_BASE}/ext/robots/{robot_id}/telemetries/{msg_id}"
+    params = {"from": from_ts, "to": to_ts}
+
+    waited = 0.0
+    received = 0
+    started = time.perf_counter()
+    try:
+        async with m1ucs_detail.stream("GET", url, params=params) as res:
+            waited += time.perf_counter() - started
+            decoder = JsonArrayStream()
+            chunks = res.aiter_bytes()
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = await anext(chunks)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    waited += time.perf_counter() - started
+                for payload in decoder.feed(chunk):
+                    received += 1
+                    yield payload
+            for payload in decoder.close():
+                received += 1
+                yield payload
+    except Exception:
+        DETAIL_STAGE.errors.inc()
+        raise
+    finally:
+        DETAIL_STAGE.seconds.observe(waited)
+        DETAIL_STAGE.add(received)
 
 # ---------------------------------------------------------
 # Timescale Hypertable 저장
@@ -162,7 +255,7 @@ async def save_message_to_table(table: str, robot_id: str, payload: Dict[str, An
         dt = parser.isoparse(raw_time)
 
 
-        mapped_robot_id = UUID_TO_NUM.get(robot_id)
+        mapped_robot_id = await get_robot_num(robot_id)
         if mapped_robot_id is None:
             raise ValueError(f"Unknown robot_id: {robot_id}")
         
@@ -182,55 +275,275 @@ async def save_message_to_table(table: str, robot_id: str, payload: Dict[str, An
         INSERT INTO shrc.{table} ({columns_sql})
         VALUES ({placeholders});
         """
-        print(sql)
+        logger.debug(f"[TELEMETRY] {sql.strip()}")
         await session.execute(text(sql), values)
         await session.commit()
 
 
 
-async def save_batch_copy_preprocessed(table: str, rows: list[dict], robot_id: str):
+async def save_batch_copy_preprocessed(
+    table: str,
+    rows: list[dict],
+    robot_id: str,
+    checkpoint: tuple | None = None,
+) -> int:
+    """
+    COPY → staging 테이블 → INSERT ... ON CONFLICT DO NOTHING 병합
+    - rows 는 원본 payload ("voltages[0]" 형태 키) / flatten_payload 결과 모두 가능
+    - 같은 구간을 다시 동기화해도 (robot_id, time) 중복 행은 무시됨
+    - checkpoint=(msg_id, from_ts, to_ts, rows_received) 가 주어지면 같은 트랜잭션에서 체크포인트 기록
+      (rows_received: 해당 window 에서 그 msgId 로 받은 전체 행 수)
+    - 실제로 새로 들어간 행 수 반환
+    """
+    with COPY_STAGE.time():
+        [inserted] = await save_batches_copy_preprocessed(robot_id, [(table, rows, checkpoint)])
+    COPY_STAGE.add(len(rows))
+    return inserted
 
-    if not rows:
-        return
 
-    batch_columns = None
-    batch_values = []   # tuple 형태로 적용해야 binary COPY 됨
+async def save_batches_copy_preprocessed(
+    robot_id: str,
+    batches: List[tuple],
+) -> List[int]:
+    """
+    여러 테이블 배치를 COPY pool 연결 하나, 한 트랜잭션으로 저장
+    - batches: [(table, rows, checkpoint | None)] → 배치별 새로 들어간 행 수 목록
+    - 하나라도 실패하면 전체 롤백 (체크포인트 포함)
+    """
+    mapped_robot_id = None
+    if any(rows for _, rows, _ in batches):
+        mapped_robot_id = await get_robot_num(robot_id)
+        if mapped_robot_id is None:
+            raise ValueError(f"Unknown robot_id: {robot_id}")
 
     # ------------------------
-    # 1) 기존 전처리와 동일하게 처리
+    # 1) (table, key 구성) 별로 캐시된 인코더로 COPY tuple 생성
+    #    - 테이블 컬럼 순서에 맞춰 정렬, 없는 필드는 NULL
+    #    - 테이블에 없는 필드는 COPY 에서 빼고 schema drift 로 집계
+    #    - 키 구성이 다른 행은 별도 그룹 → 같은 staging 테이블에 각각 COPY
     # ------------------------
-    for payload in rows:
-        cols = ["time", "robot_id"] + [key.lower() for key in payload.keys() if key != "time"]
-
-        if batch_columns is None:
-            batch_columns = cols
+    encoded = []
+    for table, rows, checkpoint in batches:
+        groups, merge_columns = [], []
+        if rows:
+            table_columns = await get_table_columns(table)
+            with ENCODE_STAGE.time():
+                for columns, records, unknown in encode_rows(table, rows, mapped_robot_id, table_columns):
+                    groups.append((columns, records))
+                    merge_columns.extend(c for c in columns if c not in merge_columns)
+                    if unknown:
+                        record_unknown_fields(table, unknown, len(records))
+            ENCODE_STAGE.add(len(rows))
+        encoded.append((table, groups, merge_columns, checkpoint))
 
-        dt = parser.isoparse(payload["time"])
+    # ------------------------
+    # 2) COPY 전용 asyncpg pool
+    #    staging COPY → 본 테이블 merge → 체크포인트 (한 트랜잭션)
+    # ------------------------
+    results = []
+    async with copy_pool.transaction() as conn:
+        for table, groups, merge_columns, checkpoint in encoded:
+            inserted = await copy_pool.copy_merge(conn, table, groups, merge_columns) if groups else 0
+            if checkpoint is not None:
+                await copy_pool.save_checkpoint(conn, robot_id, checkpoint)
+            results.append(inserted)
+
+    for (table, groups, _, _), inserted in zip(encoded, results):
+        if not groups:
+            continue
+        records = [r for _, recs in groups for r in recs]
 
-        mapped_robot_id = UUID_TO_NUM.get(robot_id)
-        if mapped_robot_id is None:
-            raise ValueError(f"Unknown robot_id: {robot_id}")
+        # 커밋된 구간의 롤업 refresh 예약
+        if inserted:
+            times = [r[0] for r in records]
+            mark_dirty(table, min(times), max(times))
 
-        row_values = [dt, mapped_robot_id]
+        # 배치에서 가장 최근 행으로 로봇 최신 상태 캐시 갱신
+        latest_columns, latest = max(
+            ((columns, r) for columns, recs in groups for r in recs),
+            key=lambda item: item[1][0],
+        )
+        await update_latest(robot_id, TABLE_MSG_MAP[table], table, latest_columns, latest)
 
-        for key, value in payload.items():
-            if key != "time":
-                row_values.append(value)
+    return results
 
-        batch_values.append(tuple(row_values))  # <-- tuple 이어야 함
 
-    # ------------------------
-    # 2) SQLAlchemy raw → asyncpg connection
-    # ------------------------
+# ---------------------------------------------------------
+# 동기화 체크포인트 / 로봇별 watermark
+# ---------------------------------------------------------
+async def ensure_sync_tables():
+    """
+    체크포인트/워터마크 테이블 생성 (없을 때만) + hypertable 중복 방지 인덱스 확인
+    """
     async with engine.begin() as conn:
-        raw = await conn.get_raw_connection()
-        asyncpg_conn = raw.driver_connection
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS shrc.telemetry_sync_checkpoint (
+                robot_id     TEXT        NOT NULL,
+                msg_id       INTEGER     NOT NULL,
+                window_from  TEXT        NOT NULL,
+                window_to    TEXT        NOT NULL,
+                rows_copied  INTEGER     NOT NULL,
+                committed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (robot_id, msg_id, window_from, window_to)
+            )
+        """))
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS shrc.telemetry_sync_watermark (
+                robot_id   TEXT        PRIMARY KEY,
+                last_to_ts TEXT        NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """))
 
-        await asyncpg_conn.copy_records_to_table(
-        table_name=table,               # "gps_raw_int_24"
-        schema_name="shrc",             # ← 스키마를 여기에 분리해서 적어야 함
-        records=batch_values,
-        columns=batch_columns)
+    await check_unique_indexes(list(MSG_TABLE_MAP.values()))
+
+
+# ---------------------------------------------------------
+# ON CONFLICT 중복 제거용 (robot_id, time) 유니크 인덱스
+# - 기동 시 테이블별로 있는지만 확인, 없으면 error 로그 (병합 시 중복 행이 그대로 들어감)
+# - 생성은 기본 꺼짐: 큰 테이블에서는 생성하는 동안 쓰기가 막히므로 마이그레이션으로 만드는 것을 권장
+#   TELEMETRY_CREATE_UNIQUE_INDEX=true 면 worker 하나(advisory lock)가 중복 행 확인 후 생성
+#   (hypertable: chunk 별 트랜잭션으로 생성, 일반 테이블: CONCURRENTLY)
+# ---------------------------------------------------------
+UNIQUE_INDEX_LOCK_KEY = 0x5348524304   # 'SHRC' 04
+
+
+async def _tables_with_unique_index(conn, tables: List[str]) -> set:
+    result = await conn.execute(text("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'shrc' AND c.relname = ANY(:tables)
+          AND i.indisunique AND i.indisvalid
+          AND (
+              SELECT array_agg(a.attname::text ORDER BY a.attname)
+              FROM pg_attribute a
+              WHERE a.attrelid = c.oid AND a.attnum = ANY(i.indkey)
+          ) = ARRAY['robot_id', 'time']
+    """), {"tables": tables})
+    return {row[0] for row in result}
+
+
+async def _is_hypertable(conn, table: str) -> bool:
+    try:
+        result = await conn.execute(text("""
+            SELECT 1 FROM timescaledb_information.hypertables
+            WHERE hypertable_schema = 'shrc' AND hypertable_name = :table
+        """), {"table": table})
+    except Exception:
+        return False
+    return result.first() is not None
+
+
+async def _create_unique_index(conn, table: str):
+    duplicate = (await conn.execute(text(f"""
+        SELECT robot_id, time FROM shrc.{table}
+        GROUP BY robot_id, time HAVING count(*) > 1
+        LIMIT 1
+    """))).first()
+    if duplicate is not None:
+        logger.error(
+            f"[DEDUP INDEX] shrc.{table} 에 중복 (robot_id, time) 행이 있어 유니크 인덱스를 만들 수 없음 "
+            f"(예: robot_id={duplicate[0]}, time={duplicate[1]}) → 중복 행 정리 후 재기동"
+        )
+        return
+
+    if await _is_hypertable(conn, table):
+        option = "WITH (timescaledb.transaction_per_chunk)"
+        concurrently = ""
+    else:
+        option = ""
+        concurrently = "CONCURRENTLY "
+    logger.info(f"[DEDUP INDEX] shrc.{table} 유니크 인덱스 생성 시작")
+    await conn.execute(text(
+        f"CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS {table}_robot_time_uq "
+        f"ON shrc.{table} (robot_id, time) {option}"
+    ))
+    logger.info(f"[DEDUP INDEX] shrc.{table} 유니크 인덱스 생성 완료")
+
+
+async def check_unique_indexes(tables: List[str]):
+    """
+    테이블별 (robot_id, time) 유니크 인덱스 확인 (TELEMETRY_CREATE_UNIQUE_INDEX 면 없는 것 생성)
+    """
+    try:
+        async with engine.connect() as conn:
+            # CONCURRENTLY / transaction_per_chunk 는 트랜잭션 밖에서만 가능
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            missing = [t for t in tables if t not in await _tables_with_unique_index(conn, tables)]
+
+            if missing and settings.TELEMETRY_CREATE_UNIQUE_INDEX:
+                locked = (await conn.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": UNIQUE_INDEX_LOCK_KEY}
+                )).scalar()
+                if locked:
+                    try:
+                        for table in missing:
+                            try:
+                                await _create_unique_index(conn, table)
+                            except Exception as e:
+                                logger.error(
+                                    f"[DEDUP INDEX] shrc.{table} 유니크 인덱스 생성 실패 "
+                                    f"(invalid 인덱스가 남았으면 DROP INDEX shrc.{table}_robot_time_uq 후 재시도): {e}"
+                                )
+                    finally:
+                        await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": UNIQUE_INDEX_LOCK_KEY})
+                    existing = await _tables_with_unique_index(conn, tables)
+                    missing = [t for t in missing if t not in existing]
+                else:
+                    logger.info("[DEDUP INDEX] 다른 worker 가 유니크 인덱스 생성 중 → 확인만")
+    except Exception as e:
+        logger.error(f"[DEDUP INDEX] 유니크 인덱스 확인 실패: {e}")
+        return
+
+    for table in missing:
+        logger.error(
+            f"[DEDUP INDEX] shrc.{table} 에 (robot_id, time) 유니크 인덱스 없음 → 재동기화 시 중복 행이 저장됨 "
+            f"(마이그레이션으로 {table}_robot_time_uq 생성 또는 TELEMETRY_CREATE_UNIQUE_INDEX=true)"
+        )
+
+
+async def get_committed_msg_ids(robot_id: str, from_ts: str, to_ts: str) -> set:
+    """
+    해당 (robot, window) 에서 이미 커밋된 msgId 집합
+    """
+    query = """
+        SELECT msg_id FROM shrc.telemetry_sync_checkpoint
+        WHERE robot_id = :robot_id AND window_from = :from_ts AND window_to = :to_ts
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            text(query), {"robot_id": robot_id, "from_ts": from_ts, "to_ts": to_ts}
+        )
+        return {row[0] for row in result.fetchall()}
+
+
+async def get_robot_watermarks() -> Dict[str, str]:
+    """
+    로봇별 마지막 연속 동기화 완료 시점 {robot_id: 'YYYYMMDDhhmmss'}
+    """
+    async with async_session() as session:
+        result = await session.execute(text(
+            "SELECT robot_id, last_to_ts FROM shrc.telemetry_sync_watermark"
+        ))
+        return {row[0]: row[1] for row in result.fetchall()}
+
+
+async def save_robot_watermark(robot_id: str, to_ts: str):
+    """
+    로봇 watermark 전진 (뒤로 가지 않음)
+    """
+    query = """
+        INSERT INTO shrc.telemetry_sync_watermark (robot_id, last_to_ts, updated_at)
+        VALUES (:robot_id, :to_ts, NOW())
+        ON CONFLICT (robot_id) DO UPDATE
+        SET last_to_ts = GREATEST(shrc.telemetry_sync_watermark.last_to_ts, EXCLUDED.last_to_ts),
+            updated_at = NOW()
+    """
+    async with async_session() as session:
+        await session.execute(text(query), {"robot_id": robot_id, "to_ts": to_ts})
+        await session.commit()
 
 
 # ---------------------------------------------------------
@@ -247,7 +560,7 @@ async def sync_telemetry_range(robot_id: str, from_ts: str, to_ts: str) -> int:
         day_from = day.strftime("%Y%m%d000000")
         day_to   = day.strftime("%Y%m%d235959")
 
-        print(f"\n===== {day} 목록 조회 =====")
+        logger.info(f"[TELEMETRY RANGE] robot_id={robot_id} {day} 목록 조회")
 
         msg_list = await fetch_message_list(robot_id, day_from, day_to)
 
@@ -256,10 +569,10 @@ async def sync_telemetry_range(robot_id: str, from_ts: str, to_ts: str) -> int:
             msg_name = item.get("msgName")
 
             if msg_id not in MSG_TABLE_MAP:
-                print(f"⚠ msgId={msg_id} ({msg_name}) → 저장 테이블 없음")
+                logger.warning(f"[TELEMETRY RANGE] msgId={msg_id} ({msg_name}) → 저장 테이블 없음")
                 continue
 
-            print(f" → 상세 조회 msgId={msg_id} ({msg_name})")
+            logger.info(f"[TELEMETRY RANGE] 상세 조회 msgId={msg_id} ({msg_name})")
 
             detail = await fetch_message_detail(robot_id, msg_id, day_from, day_to)
 
@@ -269,10 +582,8 @@ async def sync_telemetry_range(robot_id: str, from_ts: str, to_ts: str) -> int:
             table = MSG_TABLE_MAP[msg_id]
 
             for payload in detail_list:
-                print(payload)
-
                 flat = flatten_payload(payload)
-                print(flat)
+                logger.debug(f"[TELEMETRY RANGE] msgId={msg_id} {flat}")
 
                 await save_message_to_table(table, robot_id, flat)
                 total += 1
@@ -280,74 +591,118 @@ async def sync_telemetry_range(robot_id: str, from_ts: str, to_ts: str) -> int:
     return total
 
 
+async def _sync_message_stream(robot_id: str, msg_id: int, from_ts: str, to_ts: str) -> int:
+    """
+    msgId 하나를 스트리밍으로 받아 COPY_CHUNK_ROWS 단위로 저장
+    - 네트워크 수신(reader)과 DB COPY(writer)를 겹쳐서 실행
+    - 대기 청크 수를 제한해 메모리 사용량을 일정하게 유지
+    - 마지막 청크와 함께 체크포인트 기록 (중간 청크는 ON CONFLICT 로 재시도 안전)
+      체크포인트의 rows_copied 는 window 전체에서 받은 행 수 (재동기화로 새로 들어간 행이 0 이어도 같은 값)
+    - 반환값은 실제로 새로 들어간 행 수
+    """
+    table = MSG_TABLE_MAP[msg_id]
+    chunk_size = settings.COPY_CHUNK_ROWS
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    inserted = 0
+
+    async def writer():
+        nonlocal inserted
+        while True:
+            chunk, total = await queue.get()   # total: 마지막 청크에만 window 전체 수신 행 수
+            last = total is not None
+            checkpoint = (msg_id, from_ts, to_ts, total) if last else None
+            inserted += await save_batch_copy_preprocessed(table, chunk, robot_id, checkpoint=checkpoint)
+            logger.debug(f"[COPY CHUNK] table={table}, rows={len(chunk)}, last={last}")
+            if last:
+                return
+
+    writer_task = asyncio.create_task(writer())
+    received = 0
+    try:
+        chunk = []
+        async for payload in stream_message_detail(robot_id, msg_id, from_ts, to_ts):
+            chunk.append(payload)  # flatten 은 RowEncoder 가 컬럼 단위로 한 번만 수행
+            if len(chunk) >= chunk_size:
+                received += len(chunk)
+                await _put_or_fail(queue, (chunk, None), writer_task)
+                chunk = []
+        received += len(chunk)
+        await _put_or_fail(queue, (chunk, received), writer_task)
+        await writer_task
+    finally:
+        if not writer_task.done():
+            writer_task.cancel()
+
+    logger.info(f"[COPY SUCCESS] table={table}, rows={received}, inserted={inserted}")
+    return inserted
+
+
+async def _put_or_fail(queue: asyncio.Queue, item, writer_task: asyncio.Task):
+    """
+    queue 가 가득 찬 동안 writer 가 실패하면 그 예외를 바로 올림 (무한 대기 방지)
+    """
+    put = asyncio.ensure_future(queue.put(item))
+    done, _ = await asyncio.wait({put, writer_task}, return_when=asyncio.FIRST_COMPLETED)
+    if put not in done:
+        put.cancel()
+        writer_task.result()  # writer 예외 재발생
+        raise RuntimeError("COPY writer stopped unexpectedly")
+    if writer_task.done() and writer_task.exception():
+        raise writer_task.exception()
+
+
 async def sync_recent_telemetry(robot_id: str, from_ts: str, to_ts: str) -> int:
     start_time = time.time()
     logger.info(f"[SYNC START] robot_id={robot_id}, range={from_ts} → {to_ts}")
 
-    total = 0
     msg_list = await fetch_message_list(robot_id, from_ts, to_ts)
     logger.info(f"[MSG LIST] robot_id={robot_id}, count={len(msg_list)} received")
 
+    # 이전 실행에서 이미 커밋된 msgId 는 다시 받지 않음
+    committed = await get_committed_msg_ids(robot_id, from_ts, to_ts)
+
     tasks = []
-    msg_ids = []
+    task_msg_ids = []
 
     for item in msg_list:
         msg_id = item.get("msgId")
         if msg_id not in MSG_TABLE_MAP:
             logger.debug(f"[SKIP] msgId={msg_id} (not in MSG_TABLE_MAP)")
             continue
+        if msg_id in committed:
+            logger.debug(f"[SKIP] msgId={msg_id} (checkpoint exists)")
+            continue
 
-        tasks.append(fetch_message_detail(robot_id, msg_id, from_ts, to_ts))
-        msg_ids.append(msg_id)
+        tasks.append(_sync_message_stream(robot_id, msg_id, from_ts, to_ts))
+        task_msg_ids.append(msg_id)
 
     if not tasks:
         logger.warning(f"[NO VALID DATA] robot_id={robot_id} - No messages to process")
         return 0
 
-    logger.info(f"[DETAIL REQUEST] total={len(tasks)} messages, starting async fetch")
-
-    # 병렬 실행
-    try:
-        details = await asyncio.gather(*tasks)
-    except Exception as e:
-        logger.error(f"[DETAIL FETCH ERROR] robot_id={robot_id}, error={e}", exc_info=True)
-        raise
-
-    # -------------------------------------------------------
-    # 2) 테이블별로 payload를 버퍼링
-    # -------------------------------------------------------
-    # buffer[table_name] = [payload, payload, ...]
-    buffer = defaultdict(list)
-
-    for msg_id, detail in zip(msg_ids, details):
-        table = MSG_TABLE_MAP[msg_id]
-
-        detail_list = detail if isinstance(detail, list) else [detail]
-
-        logger.debug(f"[PROCESS] msgId={msg_id}, rows={len(detail_list)}")
-
-        for payload in detail_list:
-            flat = flatten_payload(payload)  # 기존 flatten 유지
-            buffer[table].append(flat)
-            total += 1
+    logger.info(f"[DETAIL REQUEST] total={len(tasks)} messages, starting streaming fetch/COPY")
+
+    # msgId 별 스트리밍 수신 + 청크 COPY 병렬 실행
+    # - msgId 하나가 실패해도 나머지는 끝까지 진행 → 성공한 msgId 는 체크포인트 커밋
+    # - 실패한 msgId 가 있으면 구간 전체를 실패로 올림 (다음 실행에서 실패한 msgId 만 다시 받음)
+    #   상세 조회 timeout 이 하나라도 있으면 그 예외를 올림 → run_sync_units 가 구간을 나눠 재시도
+    #   (다른 msgId 의 오류가 먼저 끝났다고 timeout 이 가려지지 않도록)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    errors = [(msg_id, r) for msg_id, r in zip(task_msg_ids, results) if isinstance(r, BaseException)]
+    total = sum(r for r in results if not isinstance(r, BaseException))
+
+    if errors:
+        for msg_id, e in errors:
+            logger.error(f"[SYNC ERROR] robot_id={robot_id}, msgId={msg_id}, error={e!r}")
+        logger.warning(
+            f"[SYNC PARTIAL] robot_id={robot_id}, range={from_ts} → {to_ts}, "
+            f"{len(errors)}/{len(tasks)} msgIds failed, committed_rows={total}"
+        )
+        timeouts = [e for _, e in errors if isinstance(e, httpx.TimeoutException)]
+        raise timeouts[0] if timeouts else errors[0][1]
 
-    # -------------------------------------------------------
-    # 3) COPY 기반 대량 insert 수행
-    # -------------------------------------------------------
-    for table, rows in buffer.items():
-        logger.info(f"[COPY INSERT] table={table}, rows={len(rows)}")
-        try:
-            await save_batch_copy_preprocessed(table, rows, robot_id)
-            logger.info(f"[COPY SUCCESS] table={table}, rows={len(rows)}")
-        except Exception as e:
-            logger.error(
-                f"[COPY ERROR] table={table}, rows={len(rows)}, error={e}",
-                exc_info=True
-            )
-            raise
-        
     elapsed = time.time() - start_time
-    logger.info(f"[SYNC DONE] robot_id={robot_id}, total_rows={total}, elapsed={elapsed:.2f}s")       
+    logger.info(f"[SYNC DONE] robot_id={robot_id}, total_rows={total}, elapsed={elapsed:.2f}s")
 
     return total
 
@@ -414,63 +769,173 @@ async def get_robot_ids():
         # rows = [('abc123',), ('def456',)...] 이므로 첫 번째 컬럼만 추출
         return [str(row[0]) for row in rows]
     
+# ---------------------------------------------------------
+# (robot, window) 작업 단위 병렬 실행
+# ---------------------------------------------------------
+TS_FMT = "%Y%m%d%H%M%S"
+
+
+def split_windows(from_dt: datetime, to_dt: datetime, step: timedelta = timedelta(hours=1)):
+    """
+    from_dt ~ to_dt 구간을 step 단위 (from_ts, to_ts) 문자열 목록으로 분할
+    """
+    windows = []
+    current_from = from_dt
+    while current_from < to_dt:
+        current_to = min(current_from + step, to_dt)
+        windows.append((current_from.strftime(TS_FMT), current_to.strftime(TS_FMT)))
+        current_from = current_to
+    return windows
+
+
+async def plan_sync_units(robot_from: Dict[str, datetime], to_dt: datetime) -> List[tuple]:
+    """
+    로봇별 시작 시점 ~ to_dt 를 (robot_id, from_ts, to_ts) 작업 단위로 분할
+    - ADAPTIVE_WINDOWS=true: 로봇별 최근 행 수로 window 크기 결정 (window_planner)
+    - 아니면 기존과 같이 1시간 단위
+    - 오래된 구간부터 처리되도록 from_ts 순 정렬
+    """
+    rates: Dict[str, float] = {}
+    if settings.ADAPTIVE_WINDOWS:
+        try:
+            rates = await window_planner.load_robot_rates(list(robot_from))
+        except Exception as e:
+            logger.warning(f"[WINDOW PLAN] 행 수 이력 조회 실패 → 1시간 단위 사용: {e}")
+
+    units = []
+    for robot_id, from_dt in robot_from.items():
+        step = window_planner.choose_step(rates.get(robot_id))
+        windows = window_planner.plan_windows(from_dt, to_dt, step)
+        logger.info(f"[WINDOW PLAN] robot_id={robot_id}, rate={rates.get(robot_id)}/h, step={step}, windows={len(windows)}")
+        units.extend((robot_id, f.strftime(TS_FMT), t.strftime(TS_FMT)) for f, t in windows)
+
+    return sorted(units, key=lambda u: u[1])
+
+
+async def run_sync_units(units: List[tuple], max_workers: int | None = None) -> List[Dict[str, Any]]:
+    """
+    (robot_id, from_ts, to_ts) 작업 단위를 고정 크기 worker pool 로 병렬 실행
+    - 전체 동시 실행 수: max_workers (기본 SYNC_MAX_WORKERS)
+    - host 단위 요청 수 / 초당 요청 수: m1ucs 요청 정책 (m1ucs_list / m1ucs_detail) 으로 별도 제한
+    - 한 작업이 실패해도 나머지 작업은 계속 진행
+    - 상세 조회 timeout 으로 실패한 작업은 구간을 반으로 나눠 다시 실행 (window_planner.split_window)
+    - 작업 단위별 rows / elapsed / error 반환 (입력 순서 유지, 나뉜 작업은 나뉜 구간별로)
+    """
+    if not units:
+        return []
+
+    max_workers = max_workers or settings.SYNC_MAX_WORKERS
+    queue: asyncio.Queue = asyncio.Queue()
+    for idx, unit in enumerate(units):
+        queue.put_nowait((idx, unit))
+
+    results: List[tuple] = []   # (입력 순서, from_ts, 결과)
+
+    async def worker():
+        while True:
+            try:
+                idx, (robot_id, from_ts, to_ts) = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            started = time.perf_counter()
+            result = {"robot_id": robot_id, "from_ts": from_ts, "to_ts": to_ts, "rows": 0, "error": None}
+            try:
+                result["rows"] = await sync_recent_telemetry(robot_id, from_ts, to_ts)
+            except httpx.TimeoutException as e:
+                halves = window_planner.split_window(datetime.strptime(from_ts, TS_FMT), datetime.strptime(to_ts, TS_FMT))
+                if halves:
+                    # 커밋된 msgId 는 체크포인트가 없으므로 나뉜 구간에서 다시 받음 (ON CONFLICT 로 중복 무시)
+                    window_planner.WINDOW_SPLITS.inc()
+                    logger.warning(f"[UNIT SPLIT] robot_id={robot_id}, range={from_ts} → {to_ts} timeout → {len(halves)}개로 나눠 재시도")
+                    for f, t in halves:
+                        queue.put_nowait((idx, (robot_id, f.strftime(TS_FMT), t.strftime(TS_FMT))))
+                    continue
+                logger.error(f"[UNIT ERROR] robot_id={robot_id}, range={from_ts} → {to_ts}, error={e!r}")
+                result["error"] = str(e) or type(e).__name__
+            except Exception as e:
+                logger.error(f"[UNIT ERROR] robot_id={robot_id}, range={from_ts} → {to_ts}, error={e}")
+                result["error"] = str(e) or type(e).__name__
+            result["elapsed"] = round(time.perf_counter() - started, 3)
+            results.append((idx, from_ts, result))
+
+    await asyncio.gather(*(worker() for _ in range(min(max_workers, len(units)))))
+    return [result for _, _, result in sorted(results, key=lambda r: (r[0], r[1]))]
+
+
 # ---------------------------------------------------------
 # 전체 로봇 telemetry 업데이트 실행
 # ---------------------------------------------------------
 async def run_full_update():
     """
-    전체 로봇 업데이트 실행 (1시간 단위로 분할):
+    전체 로봇 업데이트 실행:
     1. 최근 기록 가져오기
-    2. from_ts ~ to_ts 구간을 1시간씩 나눔
-    3. 각 구간마다 모든 로봇 telemetry_sync 실행
-    4. 이력 저장
+    2. 로봇별 watermark ~ 현재 구간을 로봇별 데이터 양에 맞는 window 로 나눔 (plan_sync_units)
+    3. (robot, window) 작업 단위를 worker pool 로 병렬 실행
+       (구간 내 msgId 단위 체크포인트가 있으면 건너뜀)
+    4. 로봇별 watermark / 이력 저장 (실패한 구간 시작점까지만 전진)
     """
     robot_list = await get_robot_ids()
     logger.info(f"[UPDATE] 로봇 목록 조회: {robot_list}")
 
     last = await get_last_update_history()
+    watermarks = await get_robot_watermarks()
 
     # 마지막 업데이트 시간 (없으면 현재 시각 - 1시간)
     if last:
-        from_dt = datetime.strptime(last["last_to_ts"], "%Y%m%d%H%M%S")
+        default_from_dt = datetime.strptime(last["last_to_ts"], TS_FMT)
     else:
-        from_dt = datetime.now() - timedelta(hours=1)
+        default_from_dt = datetime.now() - timedelta(hours=1)
 
     to_dt = datetime.now()
+
+    # --- 로봇별 watermark 부터 시작 (없으면 전체 이력 기준) ---
+    robot_from = {
+        robot_id: datetime.strptime(watermarks[robot_id], TS_FMT) if robot_id in watermarks else default_from_dt
+        for robot_id in robot_list
+    }
+    from_dt = min(robot_from.values(), default=default_from_dt)
     logger.info(f"[UPDATE] Full update from {from_dt} to {to_dt}")
 
-    total_rows = 0
+    # --- 📌 오래된 구간부터 처리되도록 window 우선 정렬 ---
+    units = await plan_sync_units(robot_from, to_dt)
+    logger.info(f"[UPDATE] {len(robot_list)} robots → {len(units)} units")
 
-    # --- 📌 1시간 단위로 반복 ---
-    current_from = from_dt
-    while current_from < to_dt:
-        current_to = current_from + timedelta(hours=1)
-        if current_to > to_dt:
-            current_to = to_dt
+    results = await run_sync_units(units)
 
-        # 문자열 변환
-        from_ts = current_from.strftime("%Y%m%d%H%M%S")
-        to_ts = current_to.strftime("%Y%m%d%H%M%S")
+    total_rows = sum(r["rows"] for r in results)
+    failed = [r for r in results if r["error"]]
 
-        logger.info(f"[UPDATE] Processing window: {from_ts} ~ {to_ts}")
+    # --- 로봇별 watermark: 처음 실패한 구간 직전까지 연속 성공한 구간만 전진 ---
+    by_robot = defaultdict(list)
+    for r in results:
+        by_robot[r["robot_id"]].append(r)
 
-        # --- 각 로봇 처리 ---
-        for robot_id in robot_list:
-            rows = await sync_recent_telemetry(robot_id, from_ts, to_ts)
-            total_rows += rows
+    for robot_id, robot_results in by_robot.items():
+        done_to = None
+        for r in sorted(robot_results, key=lambda r: r["from_ts"]):
+            if r["error"]:
+                break
+            done_to = r["to_ts"]
+        if done_to:
+            await save_robot_watermark(robot_id, done_to)
 
-        # 다음 구간으로 이동
-        current_from = current_to
+    # 실패 구간은 다음 실행에서 다시 처리되도록 이력을 그 시작점까지만 전진
+    done_to_ts = min((r["from_ts"] for r in failed), default=to_dt.strftime(TS_FMT))
+    if failed:
+        logger.warning(f"[UPDATE] {len(failed)}/{len(results)} units failed, history advanced to {done_to_ts}")
 
     # 저장
     await save_update_history(
-        from_dt.strftime("%Y%m%d%H%M%S"),
-        to_dt.strftime("%Y%m%d%H%M%S"),
+        from_dt.strftime(TS_FMT),
+        done_to_ts,
         total_rows
     )
 
     return {
-        "from_ts": from_dt.strftime("%Y%m%d%H%M%S"),
-        "to_ts": to_dt.strftime("%Y%m%d%H%M%S"),
-        "rows_upserted": total_rows
+        "from_ts": from_dt.strftime(TS_FMT),
+        "to_ts": done_to_ts,
+        "rows_upserted": total_rows,
+        "failed_units": len(failed),
+        "units": results,
     }
@@ -0,0 +1,93 @@
+# app/transcode.py
+#
+# 이미지 변환 함수 모음 - ProcessPoolExecutor 의 자식 프로세스에서 import 되므로
+# Pillow 외의 의존성(config, DB, MinIO 등)을 두지 않음
+
+import io
+
+from PIL import Image
+
+
+def _open(source: bytes | str) -> Image.Image:
+    """
+    source: 이미지 bytes 또는 파일 경로
+    """
+    if isinstance(source, str):
+        return Image.open(source)
+    return Image.open(io.BytesIO(source))
+
+
+def is_passthrough_jpeg(source: bytes | str, size: int, max_bytes: int, max_dimension: int) -> bool:
+    """
+    재인코딩 없이 그대로 저장해도 되는 JPEG 인지 헤더만 보고 판단
+    - baseline(progressive 아님) / RGB(YCbCr 3채널) / 크기 제한 이내
+    """
+    if size > max_bytes:
+        return False
+    try:
+        with _open(source) as img:   # lazy: 헤더만 파싱
+            if img.format != "JPEG" or img.mode != "RGB" or img.info.get("progressive"):
+                return False
+            if max_dimension and max(img.size) > max_dimension:
+                return False
+            return True
+    except Exception:
+        return False
+
+
+def _encode(img: Image.Image, quality: int) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def _fit(img: Image.Image, max_edge: int) -> Image.Image:
+    """
+    긴 변이 max_edge 를 넘으면 비율 유지 축소 (작으면 그대로)
+    """
+    w, h = img.size
+    scale = max_edge / max(w, h)
+    if scale >= 1:
+        return img
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def transcode_jpeg(source: bytes | str, quality: int = 90) -> bytes:
+    """
+    임의 포맷 → RGB baseline JPEG
+    """
+    with _open(source) as img:
+        rgb = img.convert("RGB")
+    return _encode(rgb, quality)
+
+
+def transcode_with_renditions(
+    source: bytes | str,
+    quality: int,
+    renditions: list[tuple[str, int]],
+    rendition_quality: int,
+    reencode: bool = True,
+) -> tuple[bytes | None, dict[str, bytes]]:
+    """
+    한 번의 decode 로 원본 JPEG 변환 + 축소본(rendition) 생성
+    - renditions: [(이름, 긴 변 최대 px), ...]
+    - reencode=False (원본을 그대로 저장하는 JPEG): 원본은 다시 만들지 않고,
+      가장 큰 rendition 에 필요한 해상도까지만 축소 decode (JPEG DCT scaling)
+    - rendition 은 큰 것부터 차례로 앞 단계 결과를 축소해 생성
+    반환: (원본 JPEG bytes 또는 None, {이름: JPEG bytes})
+    """
+    with _open(source) as img:
+        if not reencode and renditions and img.format == "JPEG":
+            edge = max(e for _, e in renditions)
+            img.draft("RGB", (edge, edge))
+        rgb = img.convert("RGB")
+
+    original = _encode(rgb, quality) if reencode else None
+
+    out: dict[str, bytes] = {}
+    current = rgb
+    for name, edge in sorted(renditions, key=lambda r: -r[1]):
+        current = _fit(current, edge)
+        out[name] = _encode(current, rendition_quality)
+    return original, out
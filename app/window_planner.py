@@ -0,0 +1,106 @@
+# app/window_planner.py
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+from . import metrics
+from .config import settings
+from .database import async_session
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SPLITS = metrics.counter("sync_window_splits_total", "timeout 으로 반으로 나눠 다시 시도한 구간 수")
+
+# ---------------------------------------------------------
+# 동기화 구간(window) 크기 결정
+# - 최근 체크포인트의 rows_copied 로 로봇별 시간당 행 수(msgId 하나 기준 최댓값) 추정
+# - 상세 조회 한 번이 WINDOW_TARGET_ROWS 정도가 되도록 window 크기 선택
+#   → 데이터가 적은 로봇: 여러 시간을 한 window 로 (목록/상세 호출 수 감소)
+#   → 데이터가 많은 로봇: 1시간보다 잘게 (상세 조회 timeout 방지)
+# - window 크기는 하루를 나누어 떨어지는 값만 사용하고 경계를 그 크기에 맞춤
+#   → 같은 구간을 다시 계획해도 같은 window 가 나와 체크포인트 재사용
+# - 이력이 없는 로봇은 기존과 같은 1시간
+#   (rows_copied 가 0/NULL 인 체크포인트는 "데이터 없음" 으로 보고 추정에서 제외
+#    → 아직 데이터가 없던 로봇이 가장 큰 window 로 한꺼번에 받게 되지 않도록)
+# ---------------------------------------------------------
+STEPS = [timedelta(minutes=m) for m in (5, 10, 15, 20, 30, 60, 120, 180, 240, 360, 480, 720, 1440)]
+DEFAULT_STEP = timedelta(hours=1)
+
+
+async def load_robot_rates(robot_ids: List[str]) -> Dict[str, float]:
+    """
+    {robot_id: 시간당 행 수} - 최근 WINDOW_RATE_LOOKBACK_HOURS 시간의 체크포인트 기준
+    (window 안 msgId 별 rows_copied 중 최댓값 / window 길이, 로봇별 최댓값)
+    - 행을 받은 체크포인트만 사용 → 모두 0 인 로봇은 결과에 없음 (choose_step 에서 기본 크기)
+    """
+    query = """
+        SELECT robot_id, window_from, window_to, MAX(rows_copied) AS rows
+        FROM shrc.telemetry_sync_checkpoint
+        WHERE robot_id = ANY(:robot_ids)
+          AND committed_at > NOW() - make_interval(hours => :hours)
+          AND rows_copied > 0
+        GROUP BY robot_id, window_from, window_to
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            text(query), {"robot_ids": list(robot_ids), "hours": settings.WINDOW_RATE_LOOKBACK_HOURS}
+        )
+        rows = result.fetchall()
+
+    rates: Dict[str, float] = {}
+    for robot_id, window_from, window_to, count in rows:
+        hours = (datetime.strptime(window_to, "%Y%m%d%H%M%S") - datetime.strptime(window_from, "%Y%m%d%H%M%S")).total_seconds() / 3600
+        if hours <= 0:
+            continue
+        rates[robot_id] = max(rates.get(robot_id, 0.0), count / hours)
+    return rates
+
+
+def choose_step(rate: float | None) -> timedelta:
+    """
+    시간당 행 수 → window 크기 (WINDOW_MIN_MINUTES ~ WINDOW_MAX_HOURS 사이의 STEPS 값)
+    - 이력 없음(None) / 0 이하는 데이터 없음으로 보고 DEFAULT_STEP
+    """
+    if rate is None or rate <= 0:
+        return DEFAULT_STEP
+
+    lo = timedelta(minutes=settings.WINDOW_MIN_MINUTES)
+    hi = timedelta(hours=settings.WINDOW_MAX_HOURS)
+    allowed = [s for s in STEPS if lo <= s <= hi] or [DEFAULT_STEP]
+
+    ideal = timedelta(hours=settings.WINDOW_TARGET_ROWS / rate)
+    fitting = [s for s in allowed if s <= ideal]
+    return fitting[-1] if fitting else allowed[0]
+
+
+def _align(dt: datetime, step: timedelta) -> datetime:
+    midnight = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + (dt - midnight) // step * step
+
+
+def plan_windows(from_dt: datetime, to_dt: datetime, step: timedelta) -> List[Tuple[datetime, datetime]]:
+    """
+    from_dt ~ to_dt 를 step 경계에 맞춰 분할 (첫/마지막 window 는 짧을 수 있음)
+    """
+    windows = []
+    current = from_dt
+    while current < to_dt:
+        boundary = _align(current, step) + step
+        end = min(boundary, to_dt)
+        windows.append((current, end))
+        current = end
+    return windows
+
+
+def split_window(from_dt: datetime, to_dt: datetime) -> List[Tuple[datetime, datetime]] | None:
+    """
+    timeout 난 window 를 반으로 나눔 (WINDOW_SPLIT_MIN_MINUTES 보다 작아지면 None)
+    """
+    half = (to_dt - from_dt) / 2
+    if half < timedelta(minutes=settings.WINDOW_SPLIT_MIN_MINUTES):
+        return None
+    mid = (from_dt + half).replace(microsecond=0)
+    return [(from_dt, mid), (mid, to_dt)]
@@ -0,0 +1,421 @@
+# benchmarks/bench_pipeline.py
+"""
+외부 서비스 없이 돌리는 수집 파이프라인 end-to-end benchmark
+- benchmarks.fake_services (m1ucs / MinIO / Redis / 사진 서버 대역) 를 띄우고
+  scenario 마다 별도 프로세스에서 앱 코드를 실행 (peak RSS 를 scenario 별로 측정)
+- scenario
+    photos       : POST /v1/drone/photos (JPEG 원본 → 재인코딩 없이 축소본만 생성)
+    photos_png   : POST /v1/drone/photos (PNG 원본 → JPEG 변환 포함)
+    photos_batch : POST /v1/drone/photos/batch
+    telemetry    : run_sync_units (robot × window) - 조회 / 스트리밍 파싱 / 인코딩 / 저장
+    full_update  : run_full_update (watermark / 이력 갱신 포함)
+- DB: 기본은 저장 단계를 비움 (COPY 대신 행 수만 집계, 체크포인트/watermark/이력 생략)
+      --real-db 이면 time_DB_* 환경변수의 DB 에 실제로 적재 (robot 은 shrc.robots 에서 선택)
+- Redis: 기본은 fake_services 의 최소 구현 (Lua 미지원 → 로봇 최신 상태 캐시 갱신은 실패로 집계)
+         --redis host:port 로 실제 Redis 사용
+- 앱 설정은 환경변수로 그대로 조정 가능 (예: SYNC_MAX_WORKERS=16, TRANSCODE_WORKERS=4)
+  m1ucs 요청 제한은 benchmark 에서는 기본으로 풀어 둠 (M1UCS_RATE_PER_SEC=1000, M1UCS_BURST=100)
+
+출력: scenario 별 처리량 (rows/s, photos/s), p50/p99 latency, peak RSS (자기 프로세스 / 변환 worker 중 최대)
+      latency 단위 - photos: 요청 1건, photos_batch: 배치 요청 1건, telemetry/full_update: (robot, window) 작업 1건
+
+실행:
+    python -m benchmarks.bench_pipeline --scenario photos telemetry --photos 200 --robots 4 --hours 2
+    python -m benchmarks.bench_pipeline --scenario all --latency-ms 20 --json result.json
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import orjson
+
+SCENARIOS = ["photos", "photos_png", "photos_batch", "telemetry", "full_update"]
+RESULT_PREFIX = "BENCH_RESULT "
+TS_FMT = "%Y%m%d%H%M%S"
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _max_rss_mb(who) -> float:
+    # Linux 는 KB 단위 (macOS 는 byte)
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ---------------------------------------------------------
+# scenario 실행 (worker 프로세스)
+# - 환경변수가 설정된 뒤에 app 을 import 해야 하므로 함수 안에서 import
+# ---------------------------------------------------------
+def install_null_sink(robot_ids, start_dt):
+    """
+    DB 를 쓰는 부분을 비움 - 인코딩까지는 그대로 실행, COPY 는 행 수만 집계
+    """
+    from app import copy_pool
+    from app import telemetry_service as ts
+    from app.robot_registry import UUID_TO_NUM
+
+    @asynccontextmanager
+    async def transaction():
+        yield None
+
+    async def copy_merge(conn, table, groups, merge_columns):
+        rows = sum(len(records) for _, records in groups)
+        copy_pool.COPY_ROWS.inc(rows)
+        return rows
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def no_checkpoints(robot_id, from_ts, to_ts):
+        return set()
+
+    async def payload_columns(table):
+        return []   # 테이블 컬럼 대신 payload 키 순서 사용
+
+    async def list_robot_ids():
+        return list(robot_ids)
+
+    async def last_update():
+        return {"last_to_ts": start_dt.strftime(TS_FMT)}
+
+    async def no_watermarks():
+        return {}
+
+    copy_pool.transaction = transaction
+    copy_pool.copy_merge = copy_merge
+    copy_pool.save_checkpoint = noop
+    ts.get_committed_msg_ids = no_checkpoints
+    ts.get_table_columns = payload_columns
+    ts.get_robot_ids = list_robot_ids
+    ts.get_last_update_history = last_update
+    ts.get_robot_watermarks = no_watermarks
+    ts.save_robot_watermark = noop
+    ts.save_update_history = noop
+    UUID_TO_NUM.update({robot_id: n for n, robot_id in enumerate(robot_ids, start=1)})
+
+
+async def _prepare_real_db(count: int):
+    from app import copy_pool, robot_registry
+    from app import telemetry_service as ts
+    from app.table_schema import load_table_columns
+
+    await robot_registry.refresh()
+    await ts.ensure_sync_tables()
+    await copy_pool.start()
+    await load_table_columns(list(ts.MSG_TABLE_MAP.values()))
+    robot_ids = (await ts.get_robot_ids())[:count]
+    if not robot_ids:
+        raise SystemExit("shrc.robots 에 대상 robot 이 없음")
+    return robot_ids
+
+
+async def run_photos(args, endpoints, scenario: str) -> dict:
+    import httpx
+    from app.main import app
+
+    image = "photo.png" if scenario == "photos_png" else "photo.jpg"
+    photo_url = f"{endpoints['images']}/images/{image}"
+
+    def item():
+        return {
+            "robot_id": "bench-robot-1",
+            "imageId": str(uuid.uuid4()),
+            "photo_Url": photo_url,
+            "position": {"latitude": 37.5665, "longitude": 126.978, "altitude": 52.0},
+            "capturedAt": "2025-08-05T05:42:33.390Z",
+        }
+
+    batch = scenario == "photos_batch"
+    latencies, errors = [], 0
+    # 배치 요청은 안에서 BATCH_INGEST_CONCURRENCY 장씩 동시에 처리 → 요청 자체의 동시 수는 따로
+    sem = asyncio.Semaphore(args.batch_concurrency if batch else args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one() -> int:
+            nonlocal errors
+            if batch:
+                url, body, n = "/v1/drone/photos/batch", {"data": [item() for _ in range(args.batch_size)]}, args.batch_size
+            else:
+                url, body, n = "/v1/drone/photos", {"data": item()}, 1
+            async with sem:
+                started = time.perf_counter()
+                resp = await client.post(url, json=body)
+                latencies.append(time.perf_counter() - started)
+            if resp.status_code != 200 or resp.json()["message"] != "success":
+                errors += 1
+            return n
+
+        # 변환 process pool 기동 / 연결 생성 비용은 측정에서 제외
+        await asyncio.gather(*(one() for _ in range(args.warmup)))
+        latencies.clear()
+        errors = 0
+
+        requests = max(1, args.photos // args.batch_size) if batch else args.photos
+        started = time.perf_counter()
+        items = sum(await asyncio.gather(*(one() for _ in range(requests))))
+        elapsed = time.perf_counter() - started
+
+    return {"unit": "photos", "items": items, "seconds": elapsed, "latencies": latencies, "errors": errors}
+
+
+async def run_telemetry(args, endpoints, scenario: str) -> dict:
+    from app import telemetry_service as ts
+
+    ts.API_BASE = endpoints["telemetry"]
+
+    if scenario == "full_update":
+        # run_full_update 는 현재 시각까지 동기화
+        start_dt = datetime.now().replace(microsecond=0) - timedelta(hours=args.hours)
+    else:
+        start_dt = datetime.strptime(args.start, TS_FMT)
+
+    if args.real_db:
+        robot_ids = await _prepare_real_db(args.robots)
+    else:
+        robot_ids = [f"bench-robot-{n}" for n in range(1, args.robots + 1)]
+        install_null_sink(robot_ids, start_dt)
+
+    started = time.perf_counter()
+    if scenario == "full_update":
+        # 작업 단위별 결과를 받기 위해 run_sync_units 를 감싸서 실행
+        captured = []
+        run_sync_units = ts.run_sync_units
+
+        async def capture(units, max_workers=None):
+            results = await run_sync_units(units, max_workers)
+            captured.extend(results)
+            return results
+
+        ts.run_sync_units = capture
+        await ts.run_full_update()
+        results = captured
+    else:
+        units = await ts.plan_sync_units(
+            {robot_id: start_dt for robot_id in robot_ids},
+            start_dt + timedelta(hours=args.hours),
+        )
+        results = await ts.run_sync_units(units)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "unit": "rows",
+        "items": sum(r["rows"] for r in results),
+        "seconds": elapsed,
+        "latencies": [r["elapsed"] for r in results if "elapsed" in r],
+        "errors": sum(1 for r in results if r["error"]),
+    }
+
+
+def stage_summary() -> dict:
+    """
+    metrics 의 stage_seconds{stage} 별 호출 수 / 평균 소요 시간
+    """
+    from app import metrics
+
+    stages = {}
+    for key, m in metrics.snapshot().items():
+        if not key.startswith("stage_seconds{"):
+            continue
+        value = m["value"]
+        if value["count"]:
+            name = key.split('"')[1]
+            stages[name] = {"count": value["count"], "mean_ms": round(value["sum"] / value["count"] * 1000, 2)}
+    return stages
+
+
+async def run_worker(args, endpoints) -> dict:
+    import logging
+
+    from app import http_clients, services
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if not args.redis:
+        # 최소 Redis 는 Lua 를 지원하지 않음 → 최신 상태 캐시 갱신 실패 경고가 배치마다 나옴
+        logging.getLogger("app.robot_state").setLevel(logging.ERROR)
+
+    try:
+        if args.worker.startswith("photos"):
+            result = await run_photos(args, endpoints, args.worker)
+        else:
+            result = await run_telemetry(args, endpoints, args.worker)
+        result["stages"] = stage_summary()
+    finally:
+        # 변환 worker 를 기다려 종료해야 RUSAGE_CHILDREN 에 반영됨
+        if services._transcode_pool is not None:
+            services._transcode_pool.shutdown(wait=True)
+            services._transcode_pool = None
+        await http_clients.close_clients()
+        if args.real_db:
+            from app import copy_pool
+            await copy_pool.close()
+
+    latencies = result.pop("latencies")
+    seconds = result["seconds"]
+    result.update({
+        "scenario": args.worker,
+        "seconds": round(seconds, 3),
+        "rate": round(result["items"] / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        "peak_rss_mb": _max_rss_mb(resource.RUSAGE_SELF),
+        "children_peak_rss_mb": _max_rss_mb(resource.RUSAGE_CHILDREN),
+    })
+    return result
+
+
+# ---------------------------------------------------------
+# 실행 (부모 프로세스)
+# ---------------------------------------------------------
+def start_fake_services(args):
+    cmd = [
+        sys.executable, "-m", "benchmarks.fake_services",
+        "--latency-ms", str(args.latency_ms),
+        "--error-rate", str(args.error_rate),
+        "--rate-scale", str(args.rate_scale),
+        "--image-width", str(args.image_width),
+        "--image-height", str(args.image_height),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line:
+        proc.wait()
+        raise SystemExit(f"fake_services 기동 실패 (exit={proc.returncode})")
+    return proc, orjson.loads(line)
+
+
+def worker_env(args, endpoints, metrics_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "MINIO_ENDPOINT": endpoints["s3"],
+        "MINIO_ACCESS_KEY": "bench",
+        "MINIO_SECRET_KEY": "bench-secret",
+        "MINIO_SECURE": "false",
+        "MINIO_BUCKET": "bench",
+        "METRICS_DIR": metrics_dir,
+        "SYNC_ENGINE_ENABLED": "false",
+    })
+    if args.redis:
+        host, _, port = args.redis.partition(":")
+        env.update({"REDIS_HOST": host, "REDIS_PORT": port or "6379"})
+    else:
+        env.update({"REDIS_HOST": "127.0.0.1", "REDIS_PORT": str(endpoints["redis"])})
+        env.pop("REDIS_PASSWORD", None)   # 최소 구현은 AUTH/HELLO 미지원
+    if not args.real_db:
+        # 연결하지 않지만 config 가 값을 요구함 / 행 수 이력 조회 없이 고정 window
+        for key, value in {"time_DB_HOST": "127.0.0.1", "time_DB_PORT": "5432", "time_DB_USER": "bench",
+                           "time_DB_PASSWORD": "bench", "time_DB_NAME": "bench"}.items():
+            env.setdefault(key, value)
+        env["ADAPTIVE_WINDOWS"] = "false"
+    env.setdefault("time_EXTERNAL_API_KEY", "bench")
+    env.setdefault("M1UCS_RATE_PER_SEC", "1000")
+    env.setdefault("M1UCS_BURST", "100")
+    return env
+
+
+def run_scenario(args, scenario: str, endpoints, env) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.bench_pipeline", "--worker", scenario,
+           "--endpoints", orjson.dumps(endpoints).decode()] + args.passthrough
+    proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return orjson.loads(line[len(RESULT_PREFIX):])
+    raise SystemExit(f"scenario {scenario} 실패 (exit={proc.returncode})")
+
+
+def print_results(results):
+    header = f"{'scenario':<14}{'items':>10} {'unit':<7}{'sec':>8}{'rate/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'errors':>7}{'rss MB':>8}{'child MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        def fmt(v):
+            return "-" if v is None else v
+        print(
+            f"{r['scenario']:<14}{r['items']:>10} {r['unit']:<7}{r['seconds']:>8}{r['rate']:>11}"
+            f"{fmt(r['p50_ms']):>9}{fmt(r['p99_ms']):>9}{r['errors']:>7}"
+            f"{r['peak_rss_mb']:>8}{r['children_peak_rss_mb']:>9}"
+        )
+    for r in results:
+        stages = ", ".join(f"{name} {s['count']}x {s['mean_ms']}ms" for name, s in sorted(r["stages"].items()))
+        print(f"  [{r['scenario']}] {stages}")
+
+
+def build_parser():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenario", nargs="+", default=["photos", "telemetry"], choices=SCENARIOS + ["all"])
+    ap.add_argument("--json", help="결과를 JSON 파일로 저장")
+    # fake_services
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0)
+    ap.add_argument("--rate-scale", type=float, default=1.0)
+    ap.add_argument("--image-width", type=int, default=4000)
+    ap.add_argument("--image-height", type=int, default=3000)
+    # scenario
+    ap.add_argument("--photos", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--batch-size", type=int, default=20)
+    ap.add_argument("--batch-concurrency", type=int, default=1, help="photos_batch 의 동시 배치 요청 수")
+    ap.add_argument("--warmup", type=int, default=4)
+    ap.add_argument("--robots", type=int, default=4)
+    ap.add_argument("--hours", type=int, default=1)
+    ap.add_argument("--start", default="20250805000000", help="telemetry 구간 시작 (YYYYMMDDhhmmss)")
+    ap.add_argument("--real-db", action="store_true")
+    ap.add_argument("--redis", help="실제 Redis host:port (없으면 fake_services 의 최소 구현)")
+    # 내부용 (scenario worker)
+    ap.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    ap.add_argument("--endpoints", help=argparse.SUPPRESS)
+    return ap
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.worker:
+        result = asyncio.run(run_worker(args, orjson.loads(args.endpoints)))
+        print(RESULT_PREFIX + orjson.dumps(result).decode(), flush=True)
+        return
+
+    scenarios = SCENARIOS if "all" in args.scenario else args.scenario
+    # worker 에 그대로 넘길 scenario 옵션
+    args.passthrough = [
+        "--photos", str(args.photos), "--concurrency", str(args.concurrency),
+        "--batch-size", str(args.batch_size), "--batch-concurrency", str(args.batch_concurrency),
+        "--warmup", str(args.warmup),
+        "--robots", str(args.robots), "--hours", str(args.hours), "--start", args.start,
+    ] + (["--real-db"] if args.real_db else []) + (["--redis", args.redis] if args.redis else [])
+
+    fakes, endpoints = start_fake_services(args)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-metrics-") as metrics_dir:
+            env = worker_env(args, endpoints, metrics_dir)
+            for scenario in scenarios:
+                print(f"[BENCH] {scenario} ...", flush=True)
+                results.append(run_scenario(args, scenario, endpoints, env))
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    print()
+    print_results(results)
+    if args.json:
+        with open(args.json, "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
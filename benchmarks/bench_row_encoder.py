@@ -0,0 +1,99 @@
+# benchmarks/bench_row_encoder.py
+"""
+COPY tuple 생성 micro-benchmark
+- legacy : flatten_payload + 행마다 컬럼 목록/robot 매핑/isoparse (기존 save_batch_copy_preprocessed 전처리)
+- encoder: app.row_encoder.encode_rows (컬럼 순서 캐시 + fromisoformat)
+
+실행:
+    python -m benchmarks.bench_row_encoder --rows 200000
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+
+from app.row_encoder import encode_rows
+
+
+def flatten_payload(payload):
+    # app.telemetry_service.flatten_payload 와 동일 (config 없이 실행하기 위해 복사)
+    row = {}
+    for key, value in payload.items():
+        if "[" in key and "]" in key:
+            base = key.split("[")[0]
+            idx = key.split("[")[1].replace("]", "")
+            row[f"{base}_{idx}"] = value
+        else:
+            row[key] = value
+    return row
+
+
+def legacy_preprocess(rows, robot_id, uuid_to_num):
+    batch_columns = None
+    batch_values = []
+    for payload in rows:
+        cols = ["time", "robot_id"] + [key.lower() for key in payload.keys() if key != "time"]
+        if batch_columns is None:
+            batch_columns = cols
+        dt = parser.isoparse(payload["time"])
+        mapped_robot_id = uuid_to_num.get(robot_id)
+        if mapped_robot_id is None:
+            raise ValueError(f"Unknown robot_id: {robot_id}")
+        row_values = [dt, mapped_robot_id]
+        for key, value in payload.items():
+            if key != "time":
+                row_values.append(value)
+        batch_values.append(tuple(row_values))
+    return batch_columns, batch_values
+
+
+def make_battery_rows(n: int):
+    """battery_status_147 과 비슷한 모양의 payload 생성"""
+    t0 = datetime(2025, 8, 5, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        ts = (t0 + timedelta(milliseconds=200 * i)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        p = {"time": ts, "id": 0, "battery_function": 0, "type": 1, "temperature": 3200}
+        for v in range(10):
+            p[f"voltages[{v}]"] = 4100 + v
+        p.update({"current_battery": -150, "current_consumed": 812, "energy_consumed": -1, "battery_remaining": 76})
+        rows.append(p)
+    return rows
+
+
+def bench(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    robot_id = "01fb056f-a3fb-4c38-9f97-ff11b9dea241"
+    uuid_to_num = {robot_id: 1}
+    rows = make_battery_rows(args.rows)
+
+    # 두 경로가 같은 결과를 내는지 먼저 확인
+    legacy_cols, legacy_vals = legacy_preprocess([flatten_payload(p) for p in rows], robot_id, uuid_to_num)
+    [(enc_cols, enc_vals, _)] = encode_rows("battery_status_147", rows, 1)
+    assert legacy_cols == enc_cols and legacy_vals == enc_vals
+
+    legacy = bench(lambda: legacy_preprocess([flatten_payload(p) for p in rows], robot_id, uuid_to_num), args.repeat)
+    encoder = bench(lambda: encode_rows("battery_status_147", rows, 1), args.repeat)
+
+    print(f"rows={args.rows}")
+    print(f"legacy : {legacy:.3f}s  ({args.rows / legacy:,.0f} rows/s)")
+    print(f"encoder: {encoder:.3f}s  ({args.rows / encoder:,.0f} rows/s)  x{legacy / encoder:.1f}")
+
+
+if __name__ == "__main__":
+    main()
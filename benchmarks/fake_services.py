@@ -0,0 +1,488 @@
+# benchmarks/fake_services.py
+"""
+benchmark 용 로컬 외부 서비스 (한 프로세스에서 모두 실행)
+- telemetry : api.m1ucs.com 대역 (목록 / 상세 조회, msgId 별 주기로 payload 생성, 스트리밍 응답)
+- s3        : MinIO 대역 (bucket 확인/생성, PutObject 만 - 받은 바이트는 버리고 크기만 기록)
+- images    : 사진 서버 (기동 시 Pillow 로 만든 JPEG/PNG 를 메모리에서 응답)
+- redis     : RESP2/RESP3 최소 구현 (앱이 쓰는 string / hash / list 명령, WATCH/MULTI/EXEC, 만료)
+              Lua 스크립트는 지원하지 않음 → robot_state 최신 상태 캐시 갱신은 실패(경고)로 처리됨
+
+기동 후 stdout 첫 줄에 접속 정보(JSON) 출력:
+    {"telemetry": "http://127.0.0.1:p1", "s3": "127.0.0.1:p2", "images": "http://127.0.0.1:p3", "redis": p4}
+
+실행:
+    python -m benchmarks.fake_services --latency-ms 20 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import socket
+import sys
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+
+import orjson
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from PIL import Image
+
+# ---------------------------------------------------------
+# telemetry API
+# - msgId 별 기본 주기(Hz) 와 payload 모양 (MAVLink 메시지와 비슷한 필드 구성)
+# - 목록 응답에는 저장 대상이 아닌 msgId(HEARTBEAT) 도 포함
+# ---------------------------------------------------------
+TS_FMT = "%Y%m%d%H%M%S"
+
+MESSAGES = {
+    24: ("GPS_RAW_INT", 5.0),
+    33: ("GLOBAL_POSITION_INT", 5.0),
+    74: ("VFR_HUD", 4.0),
+    141: ("ALTITUDE", 2.0),
+    147: ("BATTERY_STATUS", 1.0),
+    1101: ("UNKNOWN_1101", 1.0),
+    0: ("HEARTBEAT", 1.0),
+}
+
+
+def _payload(msg_id: int, ts: str, k: int) -> dict:
+    if msg_id == 24:
+        return {"time": ts, "time_usec": k * 200000, "fix_type": 3, "lat": 375665000 + k % 1000,
+                "lon": 1269780000 + k % 1000, "alt": 52000, "eph": 120, "epv": 180, "vel": 35,
+                "cog": 9000, "satellites_visible": 14}
+    if msg_id == 33:
+        return {"time": ts, "time_boot_ms": k * 200, "lat": 375665000 + k % 1000, "lon": 1269780000 + k % 1000,
+                "alt": 52000, "relative_alt": 1500, "vx": 12, "vy": -3, "vz": 0, "hdg": 27000}
+    if msg_id == 74:
+        return {"time": ts, "airspeed": 0.4, "groundspeed": 0.35, "heading": 270, "throttle": 21,
+                "alt": 52.0, "climb": 0.0}
+    if msg_id == 141:
+        return {"time": ts, "altitude_monotonic": 52.1, "altitude_amsl": 52.0, "altitude_local": 1.5,
+                "altitude_relative": 1.5, "altitude_terrain": -1.0, "bottom_clearance": -1.0}
+    if msg_id == 147:
+        p = {"time": ts, "id": 0, "battery_function": 0, "type": 1, "temperature": 3200}
+        for v in range(10):
+            p[f"voltages[{v}]"] = 4100 + v
+        p.update({"current_battery": -150, "current_consumed": 812 + k, "energy_consumed": -1,
+                  "battery_remaining": 76})
+        return p
+    return {"time": ts, "value_0": k, "value_1": k * 0.5, "status": 1}
+
+
+def telemetry_app(args) -> FastAPI:
+    app = FastAPI()
+    chunk_rows = 1000
+
+    async def delay_or_fail():
+        if args.latency_ms:
+            await asyncio.sleep(args.latency_ms / 1000)
+        if args.error_rate and random.random() < args.error_rate:
+            return Response(status_code=503)
+        return None
+
+    @app.get("/ext/robots/{robot_id}/telemetries")
+    async def message_list(robot_id: str):
+        failed = await delay_or_fail()
+        if failed is not None:
+            return failed
+        return [{"msgId": msg_id, "msgName": name} for msg_id, (name, _) in MESSAGES.items()]
+
+    @app.get("/ext/robots/{robot_id}/telemetries/{msg_id}")
+    async def message_detail(robot_id: str, msg_id: int, request: Request):
+        failed = await delay_or_fail()
+        if failed is not None:
+            return failed
+
+        start = datetime.strptime(request.query_params["from"], TS_FMT).replace(tzinfo=timezone.utc).timestamp()
+        end = datetime.strptime(request.query_params["to"], TS_FMT).replace(tzinfo=timezone.utc).timestamp()
+        rate = MESSAGES.get(msg_id, ("", 1.0))[1] * args.rate_scale
+        count = max(0, int((end - start) * rate))
+        # 로봇마다 샘플 시각이 겹치지 않도록 위상만 다르게
+        phase = (zlib.crc32(robot_id.encode()) % 1000) / 1000 / rate if rate else 0
+
+        def rows():
+            yield b"["
+            for offset in range(0, count, chunk_rows):
+                batch = []
+                for k in range(offset, min(count, offset + chunk_rows)):
+                    ts = datetime.fromtimestamp(start + phase + k / rate, timezone.utc)
+                    batch.append(_payload(msg_id, ts.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts.microsecond // 1000:03d}Z", k))
+                body = orjson.dumps(batch)[1:-1]
+                yield body if offset == 0 else b"," + body
+            yield b"]"
+
+        return StreamingResponse(rows(), media_type="application/json")
+
+    return app
+
+
+# ---------------------------------------------------------
+# S3 (MinIO client 가 쓰는 요청만)
+# ---------------------------------------------------------
+LOCATION_XML = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></LocationConstraint>'
+)
+
+
+def s3_app(stats: dict) -> FastAPI:
+    app = FastAPI()
+    buckets = set()
+
+    @app.api_route("/{bucket}", methods=["GET", "HEAD", "PUT"])
+    async def bucket_ops(bucket: str, request: Request):
+        if request.method == "PUT":
+            buckets.add(bucket)
+            return Response(status_code=200)
+        if request.method == "HEAD":
+            return Response(status_code=200 if bucket in buckets else 404)
+        if "location" in request.query_params:
+            return Response(LOCATION_XML, media_type="application/xml")
+        return Response(status_code=501)
+
+    @app.put("/{bucket}/{key:path}")
+    async def put_object(bucket: str, key: str, request: Request):
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        stats["objects"] += 1
+        stats["bytes"] += size
+        return Response(status_code=200, headers={"ETag": f'"{stats["objects"]:032x}"'})
+
+    return app
+
+
+# ---------------------------------------------------------
+# 사진 서버
+# - /images/photo.jpg : baseline RGB JPEG (재인코딩 없이 통과 → 축소본만 생성)
+# - /images/photo.png : PNG (JPEG 변환 필요)
+# - 같은 URL 이어도 imageId 가 다르면 앱은 별도 사진으로 처리
+# ---------------------------------------------------------
+def _make_image(width: int, height: int, fmt: str) -> bytes:
+    # 단색 이미지는 압축률이 비현실적으로 높으므로 노이즈를 섞음
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img = Image.blend(noise, gradient, 0.5)
+    out = io.BytesIO()
+    img.save(out, format=fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+    return out.getvalue()
+
+
+def images_app(args) -> FastAPI:
+    app = FastAPI()
+    images = {
+        "photo.jpg": (_make_image(args.image_width, args.image_height, "JPEG"), "image/jpeg"),
+        "photo.png": (_make_image(args.image_width, args.image_height, "PNG"), "image/png"),
+    }
+
+    @app.get("/images/{name}")
+    async def image(name: str):
+        if args.latency_ms:
+            await asyncio.sleep(args.latency_ms / 1000)
+        data, media_type = images[name]
+        return Response(data, media_type=media_type)
+
+    return app
+
+
+# ---------------------------------------------------------
+# Redis (RESP2 / HELLO 3 이후 RESP3)
+# ---------------------------------------------------------
+class RespError(Exception):
+    pass
+
+
+class MiniRedis:
+    # 쓰기 명령 → 바뀌는 key (WATCH 충돌 확인용)
+    WRITES = {
+        "set": lambda a: a[:1], "del": lambda a: a, "expire": lambda a: a[:1], "hset": lambda a: a[:1],
+        "lpush": lambda a: a[:1], "lrem": lambda a: a[:1], "rpoplpush": lambda a: a[:2],
+    }
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.versions = {}  # key → 쓰기 횟수
+
+    def _get(self, key, kind):
+        exp = self.expires.get(key)
+        if exp is not None and exp <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+            self.versions[key] = self.versions.get(key, 0) + 1
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, kind):
+            raise RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _set(self, key, value):
+        self.data[key] = value
+        self.expires.pop(key, None)
+
+    def execute(self, cmd: str, args: list):
+        handler = getattr(self, f"cmd_{cmd}", None)
+        if handler is None:
+            raise RespError(f"ERR unknown command '{cmd}'")
+        for key in self.WRITES.get(cmd, lambda a: ())(args):
+            self.versions[key] = self.versions.get(key, 0) + 1
+        return handler(*args)
+
+    def version(self, key) -> int:
+        self._get(key, object)   # 만료된 key 정리 (만료도 변경으로 셈)
+        return self.versions.get(key, 0)
+
+    # --- connection ---
+    def cmd_ping(self, *args):
+        return b"+PONG"
+
+    def cmd_client(self, *args):
+        return b"+OK"
+
+    def cmd_select(self, db):
+        return b"+OK"
+
+    # --- keys ---
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._get(key, object) is not None:
+                removed += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def cmd_expire(self, key, seconds):
+        if self._get(key, object) is None:
+            return 0
+        self.expires[key] = time.monotonic() + int(seconds)
+        return 1
+
+    # --- string ---
+    def cmd_get(self, key):
+        return self._get(key, bytes)
+
+    def cmd_set(self, key, value, *opts):
+        opts = [o.lower() for o in opts]
+        if b"nx" in opts and self._get(key, object) is not None:
+            return None
+        self._set(key, value)
+        for name in (b"ex", b"px"):
+            if name in opts:
+                amount = int(opts[opts.index(name) + 1])
+                self.expires[key] = time.monotonic() + (amount if name == b"ex" else amount / 1000)
+        return b"+OK"
+
+    # --- hash ---
+    def cmd_hset(self, key, *pairs):
+        h = self._get(key, dict)
+        if h is None:
+            h = {}
+            self.data[key] = h
+        added = sum(1 for f in pairs[0::2] if f not in h)
+        h.update(zip(pairs[0::2], pairs[1::2]))
+        return added
+
+    def cmd_hget(self, key, field):
+        return (self._get(key, dict) or {}).get(field)
+
+    def cmd_hgetall(self, key):
+        return dict(self._get(key, dict) or {})
+
+    # --- list ---
+    def _list(self, key):
+        lst = self._get(key, deque)
+        if lst is None:
+            lst = deque()
+            self.data[key] = lst
+        return lst
+
+    def cmd_lpush(self, key, *values):
+        lst = self._list(key)
+        lst.extendleft(values)
+        return len(lst)
+
+    def cmd_llen(self, key):
+        return len(self._get(key, deque) or ())
+
+    def cmd_lrange(self, key, start, stop):
+        items = list(self._get(key, deque) or ())
+        start, stop = int(start), int(stop)
+        return items[start:(None if stop == -1 else stop + 1)]
+
+    def cmd_lrem(self, key, count, value):
+        lst = self._get(key, deque)
+        if not lst:
+            return 0
+        try:
+            lst.remove(value)
+            return 1
+        except ValueError:
+            return 0
+
+    def cmd_rpoplpush(self, src, dst):
+        lst = self._get(src, deque)
+        if not lst:
+            return None
+        value = lst.pop()
+        self._list(dst).appendleft(value)
+        return value
+
+
+def _encode(value, resp3: bool = False) -> bytes:
+    if value is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(value, bytes) and value.startswith(b"+"):
+        return value + b"\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, RespError):
+        return b"-" + str(value).encode() + b"\r\n"
+    if isinstance(value, dict):
+        if resp3:
+            return b"%%%d\r\n" % len(value) + b"".join(
+                _encode(k, resp3) + _encode(v, resp3) for k, v in value.items()
+            )
+        value = [x for pair in value.items() for x in pair]
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(v, resp3) for v in value)
+    raise TypeError(type(value))
+
+
+async def _read_command(reader: asyncio.StreamReader) -> list | None:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()   # inline 명령 (redis-cli 등)
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def serve_redis(store: MiniRedis, sock: socket.socket):
+    async def handle(reader, writer):
+        queued = None   # MULTI 이후 EXEC 전까지 쌓인 명령
+        watched = {}    # WATCH 한 key → 그때의 version (EXEC 시 바뀌었으면 실행하지 않음)
+        resp3 = False   # HELLO 3 이후 RESP3 응답 (redis-py 기본값)
+        try:
+            while True:
+                args = await _read_command(reader)
+                if args is None:
+                    break
+                cmd = args[0].decode().lower()
+
+                if cmd == "hello":
+                    resp3 = len(args) > 1 and args[1] == b"3"
+                    writer.write(_encode({b"server": b"redis", b"version": b"7.0.0",
+                                          b"proto": 3 if resp3 else 2, b"mode": b"standalone"}, resp3))
+                elif cmd == "watch" and queued is None:
+                    watched.update((key, store.version(key)) for key in args[1:])
+                    writer.write(b"+OK\r\n")
+                elif cmd == "unwatch":
+                    watched = {}
+                    writer.write(b"+OK\r\n")
+                elif cmd == "multi":
+                    queued = []
+                    writer.write(b"+OK\r\n")
+                elif cmd == "discard" and queued is not None:
+                    queued, watched = None, {}
+                    writer.write(b"+OK\r\n")
+                elif cmd == "exec" and queued is not None:
+                    if any(store.version(key) != v for key, v in watched.items()):
+                        results = None   # WATCH 한 key 가 바뀜 → 실행 안 함 (nil)
+                    else:
+                        results = []
+                        for c, a in queued:
+                            try:
+                                results.append(store.execute(c, a))
+                            except RespError as e:
+                                results.append(e)
+                    queued, watched = None, {}
+                    writer.write(_encode(results, resp3))
+                elif cmd == "brpoplpush":
+                    # 대기하지 않고 바로 반환 (없으면 잠깐 쉬고 nil)
+                    value = store.execute("rpoplpush", args[1:3])
+                    if value is None:
+                        await asyncio.sleep(min(float(args[3]), 0.1))
+                    writer.write(_encode(value, resp3))
+                elif queued is not None:
+                    queued.append((cmd, args[1:]))
+                    writer.write(b"+QUEUED\r\n")
+                else:
+                    try:
+                        writer.write(_encode(store.execute(cmd, args[1:]), resp3))
+                    except (RespError, TypeError, ValueError, IndexError) as e:
+                        writer.write(_encode(e if isinstance(e, RespError) else RespError(f"ERR {e}")))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, sock=sock)
+    async with server:
+        await server.serve_forever()
+
+
+# ---------------------------------------------------------
+# 실행
+# ---------------------------------------------------------
+def _listen(host: str) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+async def main_async(args):
+    stats = {"objects": 0, "bytes": 0}
+    apps = {
+        "telemetry": telemetry_app(args),
+        "s3": s3_app(stats),
+        "images": images_app(args),
+    }
+    socks = {name: _listen(args.host) for name in list(apps) + ["redis"]}
+    ports = {name: s.getsockname()[1] for name, s in socks.items()}
+
+    servers = []
+    for name, app in apps.items():
+        config = uvicorn.Config(app, log_level="warning", access_log=False, lifespan="off")
+        servers.append(uvicorn.Server(config).serve(sockets=[socks[name]]))
+
+    print(orjson.dumps({
+        "telemetry": f"http://{args.host}:{ports['telemetry']}",
+        "s3": f"{args.host}:{ports['s3']}",
+        "images": f"http://{args.host}:{ports['images']}",
+        "redis": ports["redis"],
+    }).decode(), flush=True)
+
+    await asyncio.gather(*servers, serve_redis(MiniRedis(), socks["redis"]))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--latency-ms", type=float, default=0, help="telemetry/사진 응답 전 지연")
+    ap.add_argument("--error-rate", type=float, default=0, help="telemetry 요청 중 503 으로 실패시킬 비율")
+    ap.add_argument("--rate-scale", type=float, default=1.0, help="msgId 별 기본 주기(Hz) 배율")
+    ap.add_argument("--image-width", type=int, default=4000)
+    ap.add_argument("--image-height", type=int, default=3000)
+    args = ap.parse_args()
+    try:
+        asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
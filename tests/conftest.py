@@ -0,0 +1,19 @@
+# tests/conftest.py
+
+import os
+
+# app.config 는 import 시 필수 환경 변수를 읽음 → 단위 테스트용 더미 값 (실제 연결은 하지 않음)
+for key, value in {
+    "MINIO_ENDPOINT": "localhost:9000",
+    "MINIO_ACCESS_KEY": "test",
+    "MINIO_SECRET_KEY": "test",
+    "MINIO_SECURE": "false",
+    "MINIO_BUCKET": "test",
+    "time_DB_HOST": "localhost",
+    "time_DB_PORT": "5432",
+    "time_DB_USER": "test",
+    "time_DB_PASSWORD": "test",
+    "time_DB_NAME": "test",
+    "time_EXTERNAL_API_KEY": "test",
+}.items():
+    os.environ.setdefault(key, value)
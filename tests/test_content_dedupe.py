@@ -0,0 +1,79 @@
+# tests/test_content_dedupe.py
+# 내용(sha256) 중복 제거 - 실패한 업로드가 hash 를 차지하지 않는지 확인
+
+import asyncio
+import types
+import uuid
+
+import fakeredis
+import pytest
+
+from app import ingest_jobs as ij
+from app.schemas import DataPayload
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(ij, "ar", r)
+    monkeypatch.setattr(ij.settings, "INGEST_DEDUPE_CONTENT_HASH", True)
+    return r
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """
+    process_photo 대체 - 다운로드(on_fetched) 후 fail 목록에 있는 imageId 는 업로드 실패
+    """
+    state = types.SimpleNamespace(uploaded=[], fail=set())
+
+    async def fake_process_photo(p, on_stage=None, on_fetched=None):
+        image_id = str(p.imageId)
+        existing = await on_fetched(types.SimpleNamespace(sha256="same-content"))
+        if existing is not None:
+            return existing
+        if image_id in state.fail:
+            raise RuntimeError("upload failed")
+        state.uploaded.append(image_id)
+        return f"photos/{image_id}.webp"
+
+    monkeypatch.setattr(ij, "process_photo", fake_process_photo)
+    monkeypatch.setattr(ij, "producer", lambda *a: asyncio.sleep(0))
+    return state
+
+
+def _payload() -> DataPayload:
+    return DataPayload(
+        robot_id="r1",
+        imageId=uuid.uuid4(),
+        photo_Url="http://example.com/a.jpg",
+        position={"latitude": 1, "longitude": 2},
+        capturedAt="2025-08-05T05:42:33.390Z",
+    )
+
+
+def test_second_upload_of_same_content_is_deduplicated(redis, uploads):
+    first, second = _payload(), _payload()
+
+    async def run():
+        return await ij.ingest_once(first), await ij.ingest_once(second)
+
+    path_a, path_b = asyncio.run(run())
+    assert path_a == path_b == f"photos/{first.imageId}.webp"
+    assert uploads.uploaded == [str(first.imageId)]
+
+
+def test_failed_upload_does_not_hold_the_hash(redis, uploads):
+    failed, retried, duplicate = _payload(), _payload(), _payload()
+    uploads.fail.add(str(failed.imageId))
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await ij.ingest_once(failed)
+        return await ij.ingest_once(retried), await ij.ingest_once(duplicate)
+
+    path_retried, path_duplicate = asyncio.run(run())
+    assert path_retried == f"photos/{retried.imageId}.webp"
+    assert path_duplicate == path_retried
+    assert uploads.uploaded == [str(retried.imageId)]
+    assert asyncio.run(redis.get(ij._hash_key("same-content"))) == str(retried.imageId)
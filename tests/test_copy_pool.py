@@ -0,0 +1,52 @@
+# tests/test_copy_pool.py
+# COPY pool 세션 설정 - 반납 시 RESET ALL 뒤에도 유지되도록 연결 시작 파라미터로 지정하는지 확인
+
+import asyncio
+
+import pytest
+
+from app import copy_pool
+
+
+class FakeConn:
+    def __init__(self):
+        self.executed = []
+        self.prepared = []
+
+    async def execute(self, sql, *args):
+        self.executed.append(sql)
+
+    async def checkpoint_statement(self):
+        self.prepared.append(copy_pool.CHECKPOINT_SQL)
+
+
+@pytest.fixture
+def created(monkeypatch):
+    calls = []
+
+    async def fake_create_pool(**kwargs):
+        calls.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(copy_pool.asyncpg, "create_pool", fake_create_pool)
+    monkeypatch.setattr(copy_pool, "_pool", None)
+    monkeypatch.setattr(copy_pool, "_pool_lock", asyncio.Lock())
+    return calls
+
+
+def test_jit_off_is_a_startup_parameter(created):
+    asyncio.run(copy_pool.start())
+
+    [kwargs] = created
+    assert kwargs["server_settings"]["jit"] == "off"
+    assert kwargs["server_settings"]["application_name"] == "shrc-copy"
+    assert kwargs["init"] is copy_pool._init_connection
+
+
+def test_init_does_not_set_session_settings():
+    # init 에서 SET 한 값은 첫 반납 시 Pool.release 의 RESET ALL 로 사라짐
+    conn = FakeConn()
+    asyncio.run(copy_pool._init_connection(conn))
+
+    assert not [sql for sql in conn.executed if sql.strip().upper().startswith("SET ")]
+    assert conn.prepared == [copy_pool.CHECKPOINT_SQL]
@@ -0,0 +1,78 @@
+# tests/test_host_limits.py
+
+import asyncio
+
+import pytest
+
+from app import http_clients
+from app.http_clients import host_semaphore
+
+
+@pytest.fixture(autouse=True)
+def small_map(monkeypatch):
+    monkeypatch.setattr(http_clients.settings, "HTTP_HOST_LIMITS_MAX", 2)
+    http_clients._host_limits.clear()
+    yield
+    http_clients._host_limits.clear()
+
+
+def _hosts():
+    return [host for host, _ in http_clients._host_limits]
+
+
+def test_same_host_shares_one_limit():
+    assert host_semaphore("http://a/x.jpg", 4) is host_semaphore("http://a/y.jpg", 4)
+
+
+def test_least_recently_used_idle_host_is_evicted():
+    host_semaphore("http://a/", 4)
+    host_semaphore("http://b/", 4)
+    host_semaphore("http://a/", 4)      # a 를 최근으로
+    host_semaphore("http://c/", 4)
+    assert _hosts() == ["a", "c"]
+
+
+def test_host_in_use_is_not_evicted():
+    async def run():
+        async with host_semaphore("http://busy/", 1) as busy:
+            host_semaphore("http://b/", 1)
+            host_semaphore("http://c/", 1)
+            assert "busy" in _hosts()
+            # 사용 중인 entry 는 그대로 → 같은 semaphore 로 계속 제한
+            assert host_semaphore("http://busy/", 1) is busy
+
+    asyncio.run(run())
+
+
+def test_limit_bounds_concurrency():
+    running, peak = 0, 0
+
+    async def fetch():
+        nonlocal running, peak
+        async with host_semaphore("http://a/", 2):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def run():
+        await asyncio.gather(*(fetch() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert http_clients._host_limits[("a", 2)].users == 0
+
+
+def test_cancelled_waiter_releases_its_slot():
+    async def run():
+        limit = host_semaphore("http://a/", 1)
+        async with limit:
+            waiter = asyncio.create_task(limit.__aenter__())
+            await asyncio.sleep(0)
+            assert limit.users == 2
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            assert limit.users == 1
+        assert limit.users == 0
+
+    asyncio.run(run())
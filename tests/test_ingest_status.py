@@ -0,0 +1,85 @@
+# tests/test_ingest_status.py
+# 상태 조회 - sync/batch 로 처리한 imageId 도 seen-set 값으로 응답하는지 확인
+
+import asyncio
+import uuid
+
+import fakeredis
+import pytest
+
+from app import ingest_jobs as ij
+from app.schemas import DataPayload, IngestJobStatus
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(ij, "ar", r)
+    return r
+
+
+def _payload(image_id: str) -> DataPayload:
+    return DataPayload(
+        robot_id="r1",
+        imageId=image_id,
+        photo_Url="http://example.com/a.jpg",
+        position={"latitude": 1, "longitude": 2},
+        capturedAt="2025-08-05T05:42:33.390Z",
+    )
+
+
+def test_unknown_image_id_has_no_status(redis):
+    assert asyncio.run(ij.get_status(str(uuid.uuid4()))) is None
+
+
+def test_sync_claim_then_async_submit_is_visible(redis):
+    # sync 요청이 처리 중일 때 async 재요청 → 응답 상태와 조회 결과가 같아야 함 (404 아님)
+    image_id = str(uuid.uuid4())
+
+    async def run():
+        assert await ij.claim(image_id)
+        submitted = await ij.submit_job(_payload(image_id))
+        return submitted, await ij.get_status(image_id)
+
+    submitted, status = asyncio.run(run())
+    assert submitted["status"] == "processing"
+    assert status["status"] == "processing"
+    IngestJobStatus.model_validate(status)
+
+
+def test_sync_done_reports_object_path(redis):
+    image_id = str(uuid.uuid4())
+
+    async def run():
+        await ij.claim(image_id)
+        await ij.mark_done([(image_id, "photos/r1/a.webp")])
+        return await ij.get_status(image_id)
+
+    status = asyncio.run(run())
+    assert status == {"imageId": image_id, "status": "done", "object_path": "photos/r1/a.webp"}
+    IngestJobStatus.model_validate(status)
+
+
+def test_released_sync_claim_is_not_found(redis):
+    image_id = str(uuid.uuid4())
+
+    async def run():
+        await ij.claim(image_id)
+        await ij.release(image_id)
+        return await ij.get_status(image_id)
+
+    assert asyncio.run(run()) is None
+
+
+def test_async_job_record_wins_over_seen_value(redis):
+    image_id = str(uuid.uuid4())
+
+    async def run():
+        record = await ij.submit_job(_payload(image_id))
+        return record, await ij.get_status(image_id)
+
+    record, status = asyncio.run(run())
+    assert record["status"] == "accepted"
+    assert status["status"] == "accepted"
+    assert "request" not in status
+    IngestJobStatus.model_validate(status)
@@ -0,0 +1,133 @@
+# tests/test_job_producer.py
+
+import asyncio
+import json
+
+import pytest
+
+from app import job_producer as jp
+from app.job_producer import JobProducer
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def lpush(self, queue, *values):
+        self._ops.append((queue, values))
+
+    async def execute(self):
+        if self._client.down:
+            raise ConnectionError("redis down")
+        lengths = []
+        for queue, values in self._ops:
+            self._client.lists.setdefault(queue, [])[:0] = reversed(values)
+            lengths.append(len(self._client.lists[queue]))
+        self._client.executes += 1
+        return lengths
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lists = {}
+        self.down = False
+        self.executes = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def values(self, queue):
+        # LPUSH → 먼저 넣은 작업이 오른쪽 끝 (RPOP 순서 = push 순서)
+        return [json.loads(v) for v in reversed(self.lists.get(queue, []))]
+
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(jp.settings, "REDIS_SPILL_RETRY_INTERVAL", 0.05)
+
+
+def test_push_batches_into_one_pipeline():
+    client = FakeRedis()
+    producer = JobProducer(client, flush_interval=0.01, max_batch=100, spill_limit=10)
+
+    async def run():
+        await asyncio.gather(*(producer.push("q", {"n": i}) for i in range(20)))
+        await producer.stop()
+
+    asyncio.run(run())
+    assert client.values("q") == [{"n": i} for i in range(20)]
+    assert client.executes == 1
+
+
+def test_max_batch_flushes_without_waiting_interval():
+    client = FakeRedis()
+    producer = JobProducer(client, flush_interval=10, max_batch=5, spill_limit=10)
+
+    async def run():
+        await asyncio.wait_for(producer.push_many("q", [{"n": i} for i in range(5)]), timeout=1)
+        await producer.stop()
+
+    asyncio.run(run())
+    assert len(client.values("q")) == 5
+
+
+def test_redis_down_spills_then_flushes_in_order():
+    client = FakeRedis()
+    client.down = True
+    producer = JobProducer(client, flush_interval=0.001, max_batch=100, spill_limit=10)
+
+    async def run():
+        # Redis 장애 중에도 push 는 spill 에 보관되면 반환
+        await producer.push_many("q", [{"n": 0}, {"n": 1}])
+        assert len(producer._spill) == 2
+        await producer.push("q", {"n": 2})
+        assert len(producer._spill) == 3
+        assert client.values("q") == []
+
+        # 복구 후 재시도 주기에 spill 된 작업부터 전송
+        client.down = False
+        for _ in range(100):
+            if not producer._spill:
+                break
+            await asyncio.sleep(0.01)
+        await producer.push("q", {"n": 3})
+        await producer.stop()
+
+    asyncio.run(run())
+    assert client.values("q") == [{"n": i} for i in range(4)]
+
+
+def test_spill_overflow_fails_push():
+    client = FakeRedis()
+    client.down = True
+    producer = JobProducer(client, flush_interval=0.001, max_batch=100, spill_limit=2)
+
+    async def run():
+        await producer.push_many("q", [{"n": 0}, {"n": 1}])
+        with pytest.raises(RuntimeError):
+            await producer.push("q", {"n": 2})
+        await producer.stop()
+
+    asyncio.run(run())
+    assert list(v for _, v, _ in producer._spill) == [json.dumps({"n": 0}), json.dumps({"n": 1})]
+
+
+def test_stop_flushes_pending():
+    client = FakeRedis()
+    producer = JobProducer(client, flush_interval=10, max_batch=100, spill_limit=10)
+
+    async def run():
+        task = asyncio.create_task(producer.push("q", {"n": 1}))
+        await asyncio.sleep(0)
+        await producer.stop()
+        await task
+
+    asyncio.run(run())
+    assert client.values("q") == [{"n": 1}]
@@ -0,0 +1,65 @@
+# tests/test_json_stream.py
+
+import orjson
+import pytest
+
+from app.json_stream import JsonArrayStream
+
+
+def _decode(data: bytes, chunk_size: int) -> list:
+    stream = JsonArrayStream()
+    out = []
+    for i in range(0, len(data), chunk_size):
+        out += stream.feed(data[i:i + chunk_size])
+    out += stream.close()
+    return out
+
+
+ITEMS = [
+    {"time": "2025-08-05T05:42:33.390Z", "lat": 37.5, "alt": -1},
+    {"text": 'quote " and brackets [ ] { }', "nested": {"a": [1, [2, 3]]}},
+    {"escaped": "back\\slash\\", "tail": "\\\"", "unicode": "한글 ✓"},
+    [1, {"x": "]"}],
+    {},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_array_elements_survive_any_chunk_boundary(chunk_size):
+    data = b"  \n" + orjson.dumps(ITEMS, option=orjson.OPT_INDENT_2)
+    assert _decode(data, chunk_size) == ITEMS
+
+
+def test_elements_are_returned_as_soon_as_complete():
+    stream = JsonArrayStream()
+    assert stream.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    assert stream.feed(b': "}"}') == [{"b": "}"}]
+    assert stream.feed(b"]") == []
+    assert stream.close() == []
+
+
+def test_completed_elements_are_dropped_from_buffer():
+    stream = JsonArrayStream()
+    stream.feed(b'[{"a": "' + b"x" * 1000 + b'"}, {"b"')
+    assert len(stream._buf) < 10
+
+
+def test_single_object_root():
+    data = orjson.dumps({"msgId": 24, "values": [1, 2], "s": "}"})
+    assert _decode(data, 3) == [{"msgId": 24, "values": [1, 2], "s": "}"}]
+
+
+def test_empty_array_and_empty_body():
+    assert _decode(b"[]", 1) == []
+    assert _decode(b"", 1) == []
+
+
+def test_scalar_root():
+    assert _decode(b"null", 2) == [None]
+
+
+def test_truncated_response_raises():
+    stream = JsonArrayStream()
+    stream.feed(b'[{"a": 1}, {"b": "unterminated')
+    with pytest.raises(ValueError):
+        stream.close()
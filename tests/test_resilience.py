@@ -0,0 +1,225 @@
+# tests/test_resilience.py
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from app import resilience
+from app.resilience import CircuitBreaker, CircuitOpenError, ResilientClient, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+# ---------------------------------------------------------
+# CircuitBreaker
+# ---------------------------------------------------------
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test-open", failure_threshold=3, reset_timeout=10)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("test-reset", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker("test-probe", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    clock.now += 9.9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 0.2
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test-reopen", failure_threshold=5, reset_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+# ---------------------------------------------------------
+# half-open probe 취소
+# (clock fixture 가 asyncio 시간도 멈추므로 timer 대신 Event 로 진행)
+# ---------------------------------------------------------
+class FakeUpstream:
+    """
+    hang=True 면 응답 없이 멈춤 (취소될 때까지), 아니면 200
+    """
+
+    def __init__(self, hang: bool):
+        self.hang = hang
+        self.started = asyncio.Event()
+
+    @asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        self.started.set()
+        if self.hang:
+            await asyncio.Event().wait()
+        yield httpx.Response(200, content=b"ok", request=httpx.Request(method, url))
+
+
+def _client(monkeypatch, breaker, upstream) -> ResilientClient:
+    monkeypatch.setattr(resilience.http_clients, "get_client", lambda name: upstream)
+    return ResilientClient(
+        "test", TokenBucket(rate=1000, burst=10), breaker,
+        max_retries=0, timeout_retries=0, base_delay=0, max_delay=0, concurrency=4,
+    )
+
+
+async def _cancel_in_flight(client: ResilientClient, upstream: FakeUpstream):
+    task = asyncio.create_task(client.request("GET", "http://upstream.test/a"))
+    await upstream.started.wait()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_cancelled_probe_lets_next_request_probe(clock, monkeypatch):
+    breaker = CircuitBreaker("test-cancel-probe", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+
+    upstream = FakeUpstream(hang=True)
+    client = _client(monkeypatch, breaker, upstream)
+    asyncio.run(_cancel_in_flight(client, upstream))
+
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is True     # 다음 요청이 probe
+
+
+def test_cancelled_probe_then_successful_probe_closes(clock, monkeypatch):
+    breaker = CircuitBreaker("test-cancel-then-close", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+
+    hanging = FakeUpstream(hang=True)
+    asyncio.run(_cancel_in_flight(_client(monkeypatch, breaker, hanging), hanging))
+
+    res = asyncio.run(_client(monkeypatch, breaker, FakeUpstream(hang=False)).request("GET", "http://upstream.test/a"))
+    assert res.status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_cancelled_non_probe_keeps_other_probe(clock, monkeypatch):
+    # closed 상태에서 시작한 요청이 취소돼도 그 사이 시작된 다른 요청의 probe 는 유지
+    breaker = CircuitBreaker("test-cancel-other", failure_threshold=1, reset_timeout=10)
+    upstream = FakeUpstream(hang=True)
+    client = _client(monkeypatch, breaker, upstream)
+
+    async def run():
+        task = asyncio.create_task(client.request("GET", "http://upstream.test/a"))
+        await upstream.started.wait()
+
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.before_call() is True     # 다른 요청의 probe
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+# ---------------------------------------------------------
+# TokenBucket (실제 시간 사용 - rate 를 크게 잡아 짧게)
+# ---------------------------------------------------------
+def _elapsed(coro) -> float:
+    async def run():
+        started = time.monotonic()
+        await coro()
+        return time.monotonic() - started
+    return asyncio.run(run())
+
+
+def test_bucket_burst_is_immediate():
+    bucket = TokenBucket(rate=1, burst=5)
+
+    async def take():
+        for _ in range(5):
+            await bucket.acquire()
+
+    assert _elapsed(take) < 0.05
+
+
+def test_bucket_waits_for_refill():
+    bucket = TokenBucket(rate=50, burst=1)
+
+    async def take():
+        for _ in range(4):
+            await bucket.acquire()
+
+    # 첫 토큰은 burst, 나머지 3개는 1/50 초씩
+    assert _elapsed(take) >= 0.05
+
+
+def test_bucket_tokens_capped_at_burst():
+    bucket = TokenBucket(rate=1000, burst=2)
+
+    async def take():
+        await asyncio.sleep(0.05)   # 50개 분량이 지나도 2개까지만 쌓임
+        for _ in range(2):
+            await bucket.acquire()
+        assert bucket._tokens < 1
+
+    asyncio.run(take())
+
+
+def test_bucket_pause_blocks_until_deadline():
+    bucket = TokenBucket(rate=1000, burst=10)
+
+    async def take():
+        bucket.pause(0.1)
+        await bucket.acquire()
+
+    assert _elapsed(take) >= 0.09
@@ -0,0 +1,99 @@
+# tests/test_rollup_views.py
+# 롤업 생성/정책 단계가 실패해도 이미 있는 뷰는 _VIEWS 에 등록되는지 확인
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+import pytest
+
+from app import telemetry_rollups as tr
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+
+class FakeConn:
+    """
+    views: 이미 있는 롤업 뷰 / fail_on: 이 문자열이 들어간 SQL 은 예외
+    """
+
+    def __init__(self, views=(), fail_on=()):
+        self.views = set(views)
+        self.fail_on = fail_on
+
+    async def execution_options(self, **kwargs):
+        return self
+
+    async def execute(self, clause, params=None):
+        sql = " ".join(str(clause).split())
+        if any(f in sql for f in self.fail_on):
+            raise RuntimeError(f"failed: {sql[:40]}")
+        if "timescaledb_information.hypertables" in sql:
+            return FakeResult([(1,)])
+        if "timescaledb_information.continuous_aggregates" in sql:
+            return FakeResult([(1,)] if params["view"] in self.views else [])
+        if sql.startswith("CREATE MATERIALIZED VIEW"):
+            self.views.add(sql.split(f"{tr.SCHEMA}.")[1].split()[0])
+        return FakeResult([])
+
+
+class FakeEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self.conn
+
+
+@pytest.fixture
+def rollups(monkeypatch):
+    async def fake_column_types(table):
+        return {"time": "timestamp with time zone", "robot_id": "integer", "lat": "integer"}
+
+    monkeypatch.setattr(tr, "get_column_types", fake_column_types)
+    monkeypatch.setattr(tr.settings, "TELEMETRY_ROLLUPS_ENABLED", True)
+    monkeypatch.setattr(tr.settings, "ROLLUP_INTERVALS", "1m,1h")
+    monkeypatch.setattr(tr, "_VIEWS", {})
+
+    def install(conn):
+        monkeypatch.setattr(tr, "engine", FakeEngine(conn))
+        return conn
+
+    return install
+
+
+def test_policy_failure_keeps_created_views(rollups):
+    rollups(FakeConn(fail_on=("add_continuous_aggregate_policy",)))
+    asyncio.run(tr.ensure_rollups(["gps_24"]))
+
+    assert tr._VIEWS["gps_24"] == [("gps_24_1m", timedelta(minutes=1)), ("gps_24_1h", timedelta(hours=1))]
+
+
+def test_failed_create_registers_only_existing_views(rollups):
+    rollups(FakeConn(views={"gps_24_1m"}, fail_on=("CREATE MATERIALIZED VIEW",)))
+    asyncio.run(tr.ensure_rollups(["gps_24"]))
+
+    assert tr._VIEWS["gps_24"] == [("gps_24_1m", timedelta(minutes=1))]
+
+
+def test_compression_failure_keeps_views(rollups, monkeypatch):
+    monkeypatch.setattr(tr.settings, "TELEMETRY_COMPRESS_AFTER_DAYS", 7)
+    rollups(FakeConn(fail_on=("timescaledb.compress",)))
+    asyncio.run(tr.ensure_rollups(["gps_24"]))
+
+    assert [v for v, _ in tr._VIEWS["gps_24"]] == ["gps_24_1m", "gps_24_1h"]
+
+
+def test_no_views_means_raw_queries(rollups):
+    rollups(FakeConn(fail_on=("CREATE MATERIALIZED VIEW",)))
+    asyncio.run(tr.ensure_rollups(["gps_24"]))
+
+    assert "gps_24" not in tr._VIEWS
+    assert tr.pick_rollup("gps_24", timedelta(hours=1), None, None) is None
@@ -0,0 +1,68 @@
+# tests/test_row_encoder.py
+
+from datetime import datetime, timezone
+
+from app.row_encoder import encode_rows, flatten_key, parse_ts_fast
+from app.telemetry_service import flatten_payload
+
+ROBOT_NUM = 7
+
+
+def _legacy_row(payload: dict) -> dict:
+    """
+    기존 경로 (flatten_payload → save_message_to_table) 가 INSERT 하던 값
+    """
+    row = {"time": parse_ts_fast(payload["time"]), "robot_id": ROBOT_NUM}
+    row.update((k, v) for k, v in flatten_payload(payload).items() if k != "time")
+    return row
+
+
+def _rows(groups) -> list:
+    return [dict(zip(columns, record)) for columns, records, _ in groups for record in records]
+
+
+def test_parse_ts_fast_matches_isoparse():
+    assert parse_ts_fast("2025-08-05T05:42:33.390Z") == datetime(2025, 8, 5, 5, 42, 33, 390000, tzinfo=timezone.utc)
+    assert parse_ts_fast("2025-08-05T05:42:33+09:00").utcoffset().total_seconds() == 9 * 3600
+    # fromisoformat 이 못 읽는 형식은 dateutil fallback
+    assert parse_ts_fast("20250805T054233Z") == datetime(2025, 8, 5, 5, 42, 33, tzinfo=timezone.utc)
+
+
+def test_flatten_key_matches_flatten_payload():
+    for key in ("voltages[0]", "cell[12]", "lat", "time"):
+        assert list(flatten_payload({key: 1})) == [flatten_key(key)]
+
+
+def test_encode_rows_matches_legacy_path():
+    payloads = [
+        {"time": "2025-08-05T05:42:33.390Z", "lat": 1.5, "voltages[0]": 11, "voltages[1]": 12},
+        {"time": "2025-08-05T05:42:34.390Z", "lat": 1.6, "voltages[0]": 13, "voltages[1]": 14},
+        # 키 구성이 바뀌면 새 그룹
+        {"time": "2025-08-05T05:42:35.390Z", "lat": 1.7},
+        {"time": "2025-08-05T05:42:36.390Z", "lat": 1.8, "voltages[0]": 15, "voltages[1]": 16},
+    ]
+    groups = encode_rows("battery", payloads, ROBOT_NUM)
+
+    assert [len(records) for _, records, _ in groups] == [2, 1, 1]
+    assert _rows(groups) == [_legacy_row(p) for p in payloads]
+
+
+def test_encode_rows_orders_by_table_columns_and_splits_unknown():
+    payloads = [{"lat": 1.0, "time": "2025-08-05T05:42:33Z", "extra": "x", "voltages[0]": 3}]
+    table_columns = ("time", "robot_id", "voltages_0", "lat", "alt")
+
+    [(columns, records, unknown)] = encode_rows("battery", payloads, ROBOT_NUM, table_columns)
+
+    assert columns == ["time", "robot_id", "voltages_0", "lat"]
+    assert records == [(datetime(2025, 8, 5, 5, 42, 33, tzinfo=timezone.utc), ROBOT_NUM, 3, 1.0)]
+    assert unknown == ("extra",)
+
+
+def test_encode_rows_time_only_payload():
+    [(columns, records, _)] = encode_rows("heartbeat", [{"time": "2025-08-05T05:42:33Z"}], ROBOT_NUM)
+    assert columns == ["time", "robot_id"]
+    assert records == [(datetime(2025, 8, 5, 5, 42, 33, tzinfo=timezone.utc), ROBOT_NUM)]
+
+
+def test_encode_rows_empty():
+    assert encode_rows("battery", [], ROBOT_NUM) == []
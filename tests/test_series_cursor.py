@@ -0,0 +1,87 @@
+# tests/test_series_cursor.py
+# 시계열 조회 cursor (URL-safe) 와 요청 오류별 400 메시지
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app import telemetry_query as tq
+from app.router import router
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    async def fake_robot_num(robot_id):
+        return 1 if robot_id == "r1" else None
+
+    async def fake_column_types(table):
+        return {"time": "timestamp with time zone", "robot_id": "integer", "lat": "integer", "mode": "text"}
+
+    monkeypatch.setattr(tq, "get_robot_num", fake_robot_num)
+    monkeypatch.setattr(tq, "get_column_types", fake_column_types)
+    monkeypatch.setattr(tq, "pick_rollup", lambda *a: None)
+
+
+@pytest.fixture
+def client(catalog):
+    app = FastAPI()
+    app.include_router(router, prefix="/v1")
+    return TestClient(app)
+
+
+def test_cursor_round_trip_is_url_safe():
+    # '+09:00' 같은 offset 이 그대로 들어가면 query string 에서 '+' 가 공백이 됨
+    last_time = datetime(2025, 8, 5, 14, 42, 33, 390000, tzinfo=timezone(timedelta(hours=9)))
+    cursor = tq.encode_cursor(last_time)
+
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+    assert tq.decode_cursor(cursor) == last_time.astimezone(timezone.utc)
+
+
+@pytest.mark.parametrize("cursor", ["@@@", "aGVsbG8", "2025-08-05T05:00:00+00:00"])
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        tq.decode_cursor(cursor)
+    assert e.value.status_code == 400
+    assert "Invalid cursor" in e.value.detail
+
+
+def test_cursor_sets_keyset_bound(catalog):
+    last_time = datetime(2025, 8, 5, 5, 0, tzinfo=timezone.utc)
+    start, end = datetime(2025, 8, 5), datetime(2025, 8, 6)
+
+    _, params, _ = asyncio.run(tq.build_series_query(
+        "gps_raw_int_24", "r1", start, end, ["lat"], None, "avg", 10, tq.encode_cursor(last_time),
+    ))
+    assert params["after"] == last_time
+
+    _, params, _ = asyncio.run(tq.build_series_query(
+        "gps_raw_int_24", "r1", start, end, ["lat"], timedelta(minutes=1), "avg", 10, tq.encode_cursor(last_time),
+    ))
+    assert params["start"] == last_time + timedelta(minutes=1)
+
+
+def _series(client, **query):
+    params = {"robot_id": "r1", "from_ts": "20250805000000", "to_ts": "20250806000000", **query}
+    return client.get("/v1/telemetry/gps_raw_int_24/series", params=params)
+
+
+def test_column_and_agg_errors_are_not_reported_as_cursor_errors(client):
+    r = _series(client, columns="nope")
+    assert r.status_code == 400
+    assert "Unknown columns" in r.json()["detail"]
+
+    r = _series(client, bucket="1m", agg="median")
+    assert r.status_code == 400
+    assert "Invalid agg" in r.json()["detail"]
+
+    r = _series(client, bucket="1m", columns="mode")
+    assert r.status_code == 400
+    assert "needs numeric columns" in r.json()["detail"]
+
+    r = _series(client, cursor="@@@")
+    assert r.status_code == 400
+    assert "Invalid cursor" in r.json()["detail"]
@@ -0,0 +1,101 @@
+# tests/test_stale_requeue.py
+# 처리 중 큐에 남은 stale 작업을 대기 큐로 되돌리는 주기 복구 테스트
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from app import ingest_jobs as ij
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(ij, "ar", r)
+    monkeypatch.setattr(ij.settings, "INGEST_JOB_STALE_SEC", 60)
+    return r
+
+
+async def _put_processing(r, image_id, updated_at):
+    await r.hset(ij._job_key(image_id), mapping={"imageId": image_id, "status": "fetching", "updated_at": updated_at})
+    await r.lpush(ij.PROCESSING_QUEUE, image_id)
+
+
+def test_requeue_moves_only_stale_jobs(redis):
+    async def run():
+        await _put_processing(redis, "stale", time.time() - 120)
+        await _put_processing(redis, "fresh", time.time())
+        await redis.lpush(ij.PROCESSING_QUEUE, "expired")   # 작업 레코드 만료
+
+        await ij.requeue_stale_jobs()
+        return await redis.lrange(ij.PENDING_QUEUE, 0, -1), await redis.lrange(ij.PROCESSING_QUEUE, 0, -1)
+
+    pending, processing = asyncio.run(run())
+    assert sorted(pending) == ["expired", "stale"]
+    assert processing == ["fresh"]
+
+
+def test_sweeper_requeues_jobs_that_go_stale_after_startup(redis, monkeypatch):
+    # 첫 복구 시점엔 정상이던 작업이 이후 stale 이 되어도 주기 복구가 되돌려야 함
+    monkeypatch.setattr(ij.settings, "INGEST_JOB_STALE_SEC", 0.05)
+
+    async def run():
+        await _put_processing(redis, "a", time.time())
+        task = asyncio.create_task(ij._stale_sweeper(0.02))
+        await asyncio.sleep(0.01)
+        first = await redis.lrange(ij.PENDING_QUEUE, 0, -1)
+        try:
+            for _ in range(100):
+                if await redis.lrange(ij.PENDING_QUEUE, 0, -1):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return first, await redis.lrange(ij.PENDING_QUEUE, 0, -1)
+
+    first, pending = asyncio.run(run())
+    assert first == []
+    assert pending == ["a"]
+
+
+def test_sweeper_survives_redis_errors(redis, monkeypatch):
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ij.RedisConnectionError("down")
+
+    monkeypatch.setattr(ij, "requeue_stale_jobs", flaky)
+
+    async def run():
+        task = asyncio.create_task(ij._stale_sweeper(0.01))
+        for _ in range(100):
+            if calls >= 2:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert calls >= 2
+
+
+def test_requeued_job_already_done_is_skipped(redis, monkeypatch):
+    executed = []
+
+    async def fake_execute(p):
+        executed.append(p)
+
+    monkeypatch.setattr(ij, "execute_job", fake_execute)
+
+    async def run():
+        await redis.hset(ij._job_key("x"), mapping={"status": "done", "request": "{}", "created_at": time.time()})
+        await ij._run_job("x")
+
+    asyncio.run(run())
+    assert executed == []
@@ -0,0 +1,67 @@
+# tests/test_stream_copy.py
+
+import asyncio
+
+import pytest
+
+from app import telemetry_service as ts
+
+MSG_ID = next(iter(ts.MSG_TABLE_MAP))
+
+
+@pytest.fixture
+def fake_copy(monkeypatch):
+    """
+    상세 조회 스트림과 COPY 저장을 가짜로 바꿔 청크 / 체크포인트만 기록
+    """
+    saved = []
+    state = {"payloads": 0, "fail_at": None}
+
+    async def stream_message_detail(robot_id, msg_id, from_ts, to_ts):
+        for i in range(state["payloads"]):
+            yield {"time": f"2025-01-01T00:00:{i % 60:02d}Z", "v": i}
+
+    async def save_batch_copy_preprocessed(table, rows, robot_id, checkpoint=None):
+        if state["fail_at"] is not None and len(saved) == state["fail_at"]:
+            raise RuntimeError("copy failed")
+        saved.append((len(rows), checkpoint))
+        return 0    # 재동기화: 새로 들어간 행 없음
+
+    monkeypatch.setattr(ts, "stream_message_detail", stream_message_detail)
+    monkeypatch.setattr(ts, "save_batch_copy_preprocessed", save_batch_copy_preprocessed)
+    monkeypatch.setattr(ts.settings, "COPY_CHUNK_ROWS", 5)
+    return state, saved
+
+
+def test_checkpoint_records_rows_received_for_whole_window(fake_copy):
+    state, saved = fake_copy
+    state["payloads"] = 12
+
+    inserted = asyncio.run(ts._sync_message_stream("robot", MSG_ID, "20250101000000", "20250101010000"))
+
+    assert inserted == 0
+    assert saved == [
+        (5, None),
+        (5, None),
+        (2, (MSG_ID, "20250101000000", "20250101010000", 12)),
+    ]
+
+
+def test_exact_chunk_multiple_still_writes_checkpoint(fake_copy):
+    state, saved = fake_copy
+    state["payloads"] = 10
+
+    asyncio.run(ts._sync_message_stream("robot", MSG_ID, "20250101000000", "20250101010000"))
+
+    assert saved[-1] == (0, (MSG_ID, "20250101000000", "20250101010000", 10))
+
+
+def test_writer_failure_skips_checkpoint(fake_copy):
+    state, saved = fake_copy
+    state["payloads"] = 40
+    state["fail_at"] = 1
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ts._sync_message_stream("robot", MSG_ID, "20250101000000", "20250101010000"))
+
+    assert all(checkpoint is None for _, checkpoint in saved)
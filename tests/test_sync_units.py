@@ -0,0 +1,81 @@
+# tests/test_sync_units.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from app import telemetry_service as ts
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    """
+    msgId 별 결과를 지정하는 가짜 목록/상세 조회 (DB / m1ucs 호출 없음)
+    - outcomes[msg_id]: 반환할 행 수 또는 발생시킬 예외, delays[msg_id]: 끝나기까지 대기(초)
+    """
+    outcomes, delays, calls = {}, {}, []
+
+    async def fetch_message_list(robot_id, from_ts, to_ts):
+        return [{"msgId": msg_id} for msg_id in outcomes]
+
+    async def get_committed_msg_ids(robot_id, from_ts, to_ts):
+        return set()
+
+    async def sync_message_stream(robot_id, msg_id, from_ts, to_ts):
+        calls.append((msg_id, from_ts, to_ts))
+        await asyncio.sleep(delays.get(msg_id, 0))
+        outcome = outcomes[msg_id]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(ts, "fetch_message_list", fetch_message_list)
+    monkeypatch.setattr(ts, "get_committed_msg_ids", get_committed_msg_ids)
+    monkeypatch.setattr(ts, "_sync_message_stream", sync_message_stream)
+    return outcomes, delays, calls
+
+
+def _msg_ids(n):
+    return list(ts.MSG_TABLE_MAP)[:n]
+
+
+def test_timeout_wins_over_earlier_error(fake_upstream):
+    outcomes, delays, _ = fake_upstream
+    fails_fast, times_out = _msg_ids(2)
+    outcomes[fails_fast] = RuntimeError("bad payload")
+    outcomes[times_out] = httpx.ReadTimeout("detail timeout")
+    delays[times_out] = 0.01
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(ts.sync_recent_telemetry("robot", "20250101000000", "20250101010000"))
+
+
+def test_non_timeout_error_is_raised_as_is(fake_upstream):
+    outcomes, _, _ = fake_upstream
+    ok, bad = _msg_ids(2)
+    outcomes[ok] = 10
+    outcomes[bad] = RuntimeError("bad payload")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ts.sync_recent_telemetry("robot", "20250101000000", "20250101010000"))
+
+
+def test_mixed_failure_with_timeout_splits_window(fake_upstream, monkeypatch):
+    outcomes, delays, calls = fake_upstream
+    fails_fast, times_out = _msg_ids(2)
+    outcomes[fails_fast] = RuntimeError("bad payload")
+    outcomes[times_out] = httpx.ReadTimeout("detail timeout")
+    delays[times_out] = 0.01
+    monkeypatch.setattr(ts.window_planner.settings, "WINDOW_SPLIT_MIN_MINUTES", 30)
+
+    [first, second] = asyncio.run(ts.run_sync_units([("robot", "20250101000000", "20250101010000")]))
+
+    assert (first["from_ts"], first["to_ts"]) == ("20250101000000", "20250101003000")
+    assert (second["from_ts"], second["to_ts"]) == ("20250101003000", "20250101010000")
+    assert first["error"] and second["error"]
+    assert {(f, t) for _, f, t in calls} == {
+        ("20250101000000", "20250101010000"),
+        ("20250101000000", "20250101003000"),
+        ("20250101003000", "20250101010000"),
+    }
@@ -0,0 +1,115 @@
+# tests/test_unique_index.py
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app import telemetry_service as ts
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def scalar(self):
+        return self._rows[0][0] if self._rows else None
+
+
+class FakeConn:
+    """
+    실행한 SQL 을 기록하고 정해 둔 결과를 돌려주는 연결
+    - indexed: 유니크 인덱스가 있는 테이블, duplicates: 중복 행이 있는 테이블
+    """
+
+    def __init__(self, indexed=(), duplicates=(), hypertables=(), locked=True):
+        self.indexed = set(indexed)
+        self.duplicates = set(duplicates)
+        self.hypertables = set(hypertables)
+        self.locked = locked
+        self.sql = []
+
+    async def execution_options(self, **kwargs):
+        return self
+
+    async def execute(self, clause, params=None):
+        sql = " ".join(str(clause).split())
+        self.sql.append(sql)
+        if "FROM pg_index" in sql:
+            return FakeResult([(t,) for t in params["tables"] if t in self.indexed])
+        if "pg_try_advisory_lock" in sql:
+            return FakeResult([(self.locked,)])
+        if "timescaledb_information.hypertables" in sql:
+            return FakeResult([(1,)] if params["table"] in self.hypertables else [])
+        if "HAVING count(*) > 1" in sql:
+            table = sql.split("FROM shrc.")[1].split()[0]
+            return FakeResult([("robot", "2025-01-01")] if table in self.duplicates else [])
+        if sql.startswith("CREATE UNIQUE INDEX"):
+            self.indexed.add(sql.split("ON shrc.")[1].split()[0])
+        return FakeResult([])
+
+    def created(self):
+        return [s for s in self.sql if s.startswith("CREATE UNIQUE INDEX")]
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    holder = {}
+
+    class FakeEngine:
+        @asynccontextmanager
+        async def connect(self):
+            yield holder["conn"]
+
+    monkeypatch.setattr(ts, "engine", FakeEngine())
+
+    def use(**kwargs):
+        holder["conn"] = FakeConn(**kwargs)
+        return holder["conn"]
+    return use
+
+
+def test_missing_index_is_reported_not_created_by_default(conn, monkeypatch, caplog):
+    monkeypatch.setattr(ts.settings, "TELEMETRY_CREATE_UNIQUE_INDEX", False)
+    c = conn(indexed={"a"})
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(ts.check_unique_indexes(["a", "b"]))
+
+    assert c.created() == []
+    assert "shrc.b 에 (robot_id, time) 유니크 인덱스 없음" in caplog.text
+    assert "shrc.a" not in caplog.text
+
+
+def test_opt_in_creates_after_duplicate_check(conn, monkeypatch, caplog):
+    monkeypatch.setattr(ts.settings, "TELEMETRY_CREATE_UNIQUE_INDEX", True)
+    c = conn(duplicates={"dup"}, hypertables={"hyper"})
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(ts.check_unique_indexes(["hyper", "plain", "dup"]))
+
+    assert c.created() == [
+        "CREATE UNIQUE INDEX IF NOT EXISTS hyper_robot_time_uq ON shrc.hyper (robot_id, time) "
+        "WITH (timescaledb.transaction_per_chunk)",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS plain_robot_time_uq ON shrc.plain (robot_id, time)",
+    ]
+    assert "shrc.dup 에 중복 (robot_id, time) 행이 있어" in caplog.text
+    assert "shrc.dup 에 (robot_id, time) 유니크 인덱스 없음" in caplog.text
+    assert any("pg_advisory_unlock" in s for s in c.sql)
+
+
+def test_opt_in_skips_when_another_worker_holds_lock(conn, monkeypatch):
+    monkeypatch.setattr(ts.settings, "TELEMETRY_CREATE_UNIQUE_INDEX", True)
+    c = conn(locked=False)
+
+    asyncio.run(ts.check_unique_indexes(["a"]))
+
+    assert c.created() == []
+    assert not any("HAVING" in s for s in c.sql)
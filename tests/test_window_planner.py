@@ -0,0 +1,64 @@
+# tests/test_window_planner.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import window_planner
+from app.window_planner import DEFAULT_STEP, choose_step, plan_windows, split_window
+
+
+@pytest.fixture(autouse=True)
+def planner_settings(monkeypatch):
+    monkeypatch.setattr(window_planner.settings, "WINDOW_TARGET_ROWS", 50000)
+    monkeypatch.setattr(window_planner.settings, "WINDOW_MIN_MINUTES", 10)
+    monkeypatch.setattr(window_planner.settings, "WINDOW_MAX_HOURS", 24)
+    monkeypatch.setattr(window_planner.settings, "WINDOW_SPLIT_MIN_MINUTES", 1)
+
+
+@pytest.mark.parametrize("rate", [None, 0, 0.0, -5])
+def test_choose_step_without_data_uses_default(rate):
+    assert choose_step(rate) == DEFAULT_STEP
+
+
+@pytest.mark.parametrize("rate, expected", [
+    (50000, timedelta(hours=1)),            # 1시간에 목표 행 수
+    (25000, timedelta(hours=2)),
+    (10, timedelta(hours=24)),              # 적은 데이터 → 최대 크기
+    (50000 * 4, timedelta(minutes=15)),
+    (10 ** 9, timedelta(minutes=10)),       # 아주 많아도 최소 크기 아래로는 안 내려감
+])
+def test_choose_step_targets_rows_per_window(rate, expected):
+    assert choose_step(rate) == expected
+
+
+def test_choose_step_respects_bounds(monkeypatch):
+    monkeypatch.setattr(window_planner.settings, "WINDOW_MAX_HOURS", 4)
+    assert choose_step(1) == timedelta(hours=4)
+
+
+def test_plan_windows_aligns_to_step_boundaries():
+    windows = plan_windows(datetime(2025, 1, 1, 0, 50), datetime(2025, 1, 1, 3, 10), timedelta(hours=1))
+    assert windows == [
+        (datetime(2025, 1, 1, 0, 50), datetime(2025, 1, 1, 1, 0)),
+        (datetime(2025, 1, 1, 1, 0), datetime(2025, 1, 1, 2, 0)),
+        (datetime(2025, 1, 1, 2, 0), datetime(2025, 1, 1, 3, 0)),
+        (datetime(2025, 1, 1, 3, 0), datetime(2025, 1, 1, 3, 10)),
+    ]
+
+
+def test_split_window_halves():
+    start, end = datetime(2025, 1, 1, 0, 0), datetime(2025, 1, 1, 1, 0)
+    assert split_window(start, end) == [(start, datetime(2025, 1, 1, 0, 30)), (datetime(2025, 1, 1, 0, 30), end)]
+
+
+def test_split_window_drops_microseconds():
+    start, end = datetime(2025, 1, 1, 0, 0, 0), datetime(2025, 1, 1, 0, 3, 1)
+    [(_, mid), _] = split_window(start, end)
+    assert mid == datetime(2025, 1, 1, 0, 1, 30)
+
+
+def test_split_window_stops_at_minimum():
+    start = datetime(2025, 1, 1)
+    assert split_window(start, start + timedelta(minutes=2)) is not None
+    assert split_window(start, start + timedelta(seconds=119)) is None